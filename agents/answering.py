@@ -1,88 +1,32 @@
-from core.llm import llm_service
+from core.llm import llm_service, response_text, SYSTEM_PROMPT, LLMUnavailableError
+from core.context import context_packer, estimate_tokens
+from core.cache import normalize_query, content_hash
+from core.config import config
 from langchain_core.prompts import PromptTemplate
 import logging
 
 logger = logging.getLogger(__name__)
 
+# The mandatory answer format of SYSTEM_PROMPT, one (heading, instructions) per section,
+# for ANSWER_MODE=sections
+SECTIONS = [
+    ("**A. Summary**", "2–4 bullet points with the direct answer and its key figures."),
+    ("**B. Detailed Explanation**", "Concepts, Regulations and Examples (Indian context first), "
+                                    "citing the retrieved documents. Do not repeat the summary."),
+    ("**C. Insights from Latest News**", "Only recent news from the retrieved documents that is relevant to the "
+                                         "question, summarised crisply. If there is none, say so in one line."),
+    ("**D. Final Verdict / Personal Note / TL;DR**", "1–2 lines."),
+]
+
+# Token counts that add up when an answer takes several LLM calls
+SUMMED_USAGE = ("llm_input_tokens", "llm_output_tokens", "llm_cached_tokens", "llm_prefill_tokens", "attempts")
+
 class AnsweringAgent:
     def __init__(self):
-        self.llm = llm_service.get_llm()
+        # Only the per-request part; the static instructions are core.llm.SYSTEM_PROMPT
         self.prompt_template = PromptTemplate(
             input_variables=["context", "question"],
-            template="""You are FinanceRAG — a domain-restricted financial AI assistant.
-
-Your responsibilities and restrictions are as follows:
-
-1. DOMAIN RESTRICTION
-   - You must answer ONLY finance-related queries.
-   - If the user asks anything outside finance, respond:
-     "I can answer only finance-related questions as I am FinanceRAG."
-   - Do not engage in personal, medical, entertainment, or unrelated topics.
-
-2. DEFAULT GEOGRAPHY: INDIA
-   - All answers MUST default to the Indian financial context:
-       * RBI, SEBI, IRDAI, MoF, GST, ITR, NBFC, banking rules
-       * Indian credit, collections, risk, lending, fintech
-       * Indian capital markets and macroeconomics
-   - Provide global/western/worldwide information only when the user explicitly asks.
-
-3. RAG-FIRST REQUIREMENT
-   - ALWAYS rely on retrieved documents first (vector search results, PDF chunks, websites).
-   - Cite retrieved chunks when used.
-   - If retrieval returns no relevant evidence, say:
-     "No relevant documents were retrieved; giving general financial knowledge."
-   - Never hallucinate circulars, regulatory numbers, or financial data.
-
-4. INCLUDE LATEST NEWS
-   - Whenever answering, also search for and include the **latest verified financial news** 
-     relevant to the user's question (e.g., RBI policy updates, SEBI circulars, market news).
-   - Summarize news crisply and clearly.
-   - Only include news that is actually relevant.
-
-5. FORMATTED OUTPUT (MANDATORY)
-   - Structure every answer using this format:
-
-     **A. Summary (2–4 bullet points)**  
-     **B. Detailed Explanation**  
-        - Concepts  
-        - Regulations  
-        - Examples (Indian context first)  
-     **C. Insights from Latest News**  
-     **D. Final Verdict / Personal Note / TL;DR (1–2 lines)**  
-
-   - Use clean bullet points, tables, and headings when needed.
-   - No long paragraphs. Be precise and analytical.
-
-6. STYLE RULES
-   - Professional, concise, factual.
-   - Clearly differentiate:
-       * Regulatory requirement
-       * Industry practice
-       * General knowledge
-   - Avoid emotional tone except in the final personal note.
-
-7. WHAT TO DO WHEN ANSWER ISN'T POSSIBLE
-   - If the query is unclear, ask a clarification.
-   - If the query is outside finance, politely refuse.
-   - If data/retrieval is missing, state assumptions explicitly.
-
-8. ABSOLUTELY NO HALLUCINATIONS
-   - Do not invent laws, circulars, statistics, or timelines.
-   - If unsure, say so directly.
-
-Your goal is to be:
-- Accurate  
-- India-default  
-- RAG-grounded  
-- Well-formatted  
-- News-aware  
-- Easy to read (TL;DR at end)
-
-Always follow this behavior with zero deviation.
-
----
-
-Context (Retrieved Documents):
+            template="""Context (Retrieved Documents):
 {context}
 
 Question:
@@ -90,40 +34,113 @@ Question:
 
 Answer (following the mandatory format above):"""
         )
+        # ANSWER_MODE=sections: same context and question, one section per call
+        self.section_template = PromptTemplate(
+            input_variables=["context", "question", "heading", "instructions"],
+            template="""Context (Retrieved Documents):
+{context}
+
+Question:
+{question}
+
+Write ONLY section {heading} of the mandatory format: {instructions}
+The other sections are written separately, so do not include them. Start with the heading."""
+        )
+        # Part of the response cache key: editing a template invalidates cached answers
+        self.template_version = content_hash(self.prompt_template.template)[:16]
+        self.section_template_version = content_hash(self.section_template.template)[:16]
 
     def generate_answer(self, query: str, context_docs: list):
         """
         Generates an answer based on the query and context documents.
         """
+        return self.answer(query, context_docs)[0]
+
+    def answer(self, query: str, context_docs: list, mode: str = None):
+        """
+        Generates an answer and reports the request's token usage: the packed context,
+        the whole prompt, and the LLM's own input/output counts when it returns them.
+
+        In "sections" mode (ANSWER_MODE) the four sections of the answer format are
+        generated by concurrent calls over the same packed context and joined in order,
+        so generation takes as long as the longest section instead of all of them.
+        """
+        mode = (mode or config.ANSWER_MODE).lower()
+        sections = SECTIONS if mode == "sections" else [None]
         logger.info(f"Generating answer for: {query}")
+        usage = {}
         try:
-            # Format context
-            context_text = "\n\n".join([f"Source: {doc.metadata.get('title', 'Unknown')}\nContent: {doc.page_content}" for doc in context_docs])
-            
-            prompt = self.prompt_template.format(context=context_text, question=query)
-            response = self.llm.invoke(prompt)
-            
-            # Handle different response formats
-            if hasattr(response, 'content'):
-                content = response.content
-                
-                # If content is a list (new Gemini format), extract text
-                if isinstance(content, list):
-                    text_parts = []
-                    for part in content:
-                        if isinstance(part, dict) and part.get('type') == 'text':
-                            text_parts.append(part.get('text', ''))
-                        elif isinstance(part, str):
-                            text_parts.append(part)
-                    return '\n'.join(text_parts)
-                
-                # If content is a string, return it directly
-                return content
+            fingerprints = [self.fingerprint(query, context_docs, section) for section in sections]
+            cached = [llm_service.cached_response(fingerprint) for fingerprint in fingerprints]
+            if all(entry is not None for entry in cached):
+                logger.info("Answer served from the response cache")
+                usage = self.merge_usage([entry[1] for entry in cached])
+                return self.assemble(sections, [entry[0] for entry in cached]), {**usage, "response_cached": True}
+
+            # Deduplicated, query-focused context within CONTEXT_TOKEN_BUDGET
+            context_text, usage = context_packer.pack(query, context_docs)
             
-            # Fallback for other response types
-            return str(response)
+            prompts = [self.prompt(context_text, query, section) for section in sections]
+            usage["prompt_tokens"] = sum(estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt) for prompt in prompts)
+            logger.info(f"Prompt: ~{usage['prompt_tokens']} tokens in {len(prompts)} call(s), "
+                        f"context {usage['context_tokens']} of {usage['context_tokens_before']}")
+            results = llm_service.generate_all(prompts, fingerprints=fingerprints)
+            usage.update(self.merge_usage([llm_usage for _, llm_usage in results]))
+            return self.assemble(sections, [self.response_text(response) for response, _ in results]), usage
+        except LLMUnavailableError:
+            # Every provider failed or timed out; the caller reports it (503 from the API)
+            raise
         except Exception as e:
             logger.error(f"Answer generation failed: {e}")
-            return "Sorry, I encountered an error while generating the answer."
+            return "Sorry, I encountered an error while generating the answer.", usage
+
+    def prompt(self, context_text: str, query: str, section=None) -> str:
+        if section is None:
+            return self.prompt_template.format(context=context_text, question=query)
+        heading, instructions = section
+        return self.section_template.format(context=context_text, question=query,
+                                            heading=heading, instructions=instructions)
+
+    def assemble(self, sections: list, texts: list) -> str:
+        """Joins section answers in format order, adding a heading the model left out"""
+        if sections == [None]:
+            return texts[0]
+        parts = []
+        for (heading, _), text in zip(sections, texts):
+            text = text.strip()
+            if not text.lstrip("*# ").startswith(heading.strip("*")[:2]):  # e.g. "A."
+                text = f"{heading}\n{text}"
+            parts.append(text)
+        return "\n\n".join(parts)
+
+    def merge_usage(self, usages: list) -> dict:
+        if len(usages) == 1:
+            return usages[0]
+        merged = {key: sum(usage.get(key) or 0 for usage in usages) for key in SUMMED_USAGE}
+        merged["llm_calls"] = len(usages)
+        merged["provider"] = ", ".join(sorted({usage.get("provider") for usage in usages if usage.get("provider")}))
+        merged["prefix_cached"] = all(usage.get("prefix_cached") for usage in usages)
+        merged["fallback"] = any(usage.get("fallback") for usage in usages)
+        merged["response_cached"] = all(usage.get("response_cached") for usage in usages)
+        return merged
+
+    def fingerprint(self, query: str, context_docs: list, section=None) -> list:
+        """
+        Identifies an answer request: template version, context budget, normalized question and
+        the ordered hashes of the context chunks (plus the section, in sections mode). The packed
+        context is derived from these.
+        """
+        fingerprint = [self.template_version, str(config.CONTEXT_TOKEN_BUDGET), normalize_query(query),
+                       *(content_hash(doc.page_content) for doc in context_docs)]
+        if section is not None:
+            fingerprint[0] = self.section_template_version
+            fingerprint.append(section[0])
+        return fingerprint
+
+    def response_text(self, response) -> str:
+        """
+        Extracts the answer text from the different LLM response formats.
+        """
+        return response_text(response)
 
 answering_agent = AnsweringAgent()
@@ -1,4 +1,9 @@
-from core.database import db_service
+from core.database import db_service, chunk_id
+from core.index_writer import index_writer
+from core.lexical import lexical_index
+from core.vector_index import EphemeralVectorIndex
+from core.routing import category_router
+from core.config import config
 from langchain_core.documents import Document
 import logging
 from typing import List
@@ -7,20 +12,40 @@ logger = logging.getLogger(__name__)
 
 class EmbeddingIndexingAgent:
     def __init__(self):
-        self.vector_store = db_service.get_vector_store()
+        if config.INDEX_ASYNC or config.INDEX_WRITER_MODE == "service":
+            index_writer.start()
 
     def index_documents(self, documents: List[Document]):
         """
-        Embeds and indexes documents into the vector store.
+        Embeds documents and indexes them into the vector store.
+        With INDEX_ASYNC the chunks are searchable immediately and persisted in the background;
+        the writer adds them to the BM25 index once they are written.
+        Returns an in-memory index over just these chunks for the current request (or None).
         """
         logger.info(f"Indexing {len(documents)} documents")
         try:
             if not documents:
-                return
+                return None
             
-            self.vector_store.add_documents(documents)
-            logger.info("Indexing complete")
+            ids = [chunk_id(doc) for doc in documents]
+            embeddings = db_service.embedding_function.embed_documents([doc.page_content for doc in documents])
+            if config.CATEGORY_PARTITIONING:
+                # Only partitioning reads the tag; classifying every chunk is wasted work otherwise
+                for doc, category in zip(documents, category_router.tag(embeddings)):
+                    doc.metadata["category"] = category
+
+            if config.INDEX_ASYNC or config.INDEX_WRITER_MODE == "service":
+                index_writer.submit(ids, documents, embeddings)
+                logger.info("Indexing queued for background persistence")
+            else:
+                db_service.upsert(ids, documents, embeddings)
+                # Only after the write, so BM25 never returns ids the vector store lacks
+                lexical_index.get().add(ids, documents)
+                logger.info("Indexing complete")
+
+            return EphemeralVectorIndex(ids, documents, embeddings)
         except Exception as e:
             logger.error(f"Indexing failed: {e}")
+            return None
 
 indexing_agent = EmbeddingIndexingAgent()
@@ -1,18 +1,145 @@
-from sentence_transformers import CrossEncoder
 from core.config import config
+from core.resources import LazyResource
+from core.cache import rerank_score_cache, query_embedding_cache
+from core.batching import MicroBatchedCrossEncoder
+from core.lexical import tokenize
+from core.vector_index import normalize_rows
+from collections import Counter
+import numpy as np
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
-class RerankerAgent:
-    def __init__(self):
-        # Load model only when needed or at startup? Startup is better.
-        # Using a small model for speed.
+def load_cross_encoder(backend: str = None):
+    """
+    Loads the cross-encoder for the configured backend ("pytorch" or "onnx"), falling
+    back to PyTorch if the ONNX model cannot be loaded. Pairs are truncated to
+    RERANKER_MAX_LENGTH tokens either way.
+    """
+    backend = (backend or config.RERANKER_BACKEND).lower()
+    if config.INFERENCE_MODE == "sidecar":
+        from core.inference_server import RemoteCrossEncoder, sidecar_available
+        if sidecar_available():
+            return RemoteCrossEncoder()
+        logger.warning(f"Inference server not reachable at {config.INFERENCE_SOCKET}. Loading reranker locally.")
+
+    if backend == "onnx":
         try:
-            self.model = CrossEncoder(config.RERANKER_MODEL_NAME)
+            from core.onnx_models import OnnxCrossEncoder
+            return OnnxCrossEncoder(
+                model_name=config.RERANKER_MODEL_NAME,
+                cache_dir=config.ONNX_MODEL_DIR,
+                num_threads=config.RERANKER_NUM_THREADS,
+                batch_size=config.RERANKER_BATCH_SIZE,
+                max_batch_tokens=config.RERANKER_MAX_BATCH_TOKENS,
+                max_length=config.RERANKER_MAX_LENGTH,
+                quantize=config.RERANKER_QUANTIZE
+            )
         except Exception as e:
-            logger.warning(f"Could not load reranker model: {e}. Reranking will be skipped.")
-            self.model = None
+            logger.warning(f"Could not load ONNX reranker backend: {e}. Falling back to PyTorch.")
+
+    # Using a small model for speed.
+    try:
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(config.RERANKER_MODEL_NAME, max_length=config.RERANKER_MAX_LENGTH)
+    except Exception as e:
+        logger.warning(f"Could not load reranker model: {e}. Reranking will be skipped.")
+        return None
+
+def lexical_scores(query: str, docs: list) -> np.ndarray:
+    """
+    BM25-style term overlap of each document with the query, with document frequencies
+    taken from the candidates themselves.
+    """
+    terms = set(tokenize(query))
+    counts = [Counter(tokenize(doc.page_content)) for doc in docs]
+    df = {term: sum(1 for c in counts if term in c) for term in terms}
+    return np.array([
+        sum(math.log(1 + len(docs) / df[term]) * c[term] / (c[term] + 1.2) for term in terms if term in c)
+        for c in counts
+    ], dtype=np.float32)
+
+def cosine_scores(query: str, docs: list) -> np.ndarray:
+    """
+    Bi-encoder similarity, from the candidates' stored embeddings and the cached query embedding.
+    """
+    from agents.retrieval import retrieval_agent
+    embeddings = normalize_rows(retrieval_agent.candidate_embeddings(docs))
+    return embeddings @ normalize_rows(query_embedding_cache.embed_query(query))
+
+def adaptive_cutoff(scores, max_k: int) -> int:
+    """
+    How many of the (descending) cross-encoder scores to keep: at least RERANK_MIN_K, at
+    most max_k, stopping before the first score under RERANK_MIN_SCORE or after a drop
+    larger than RERANK_SCORE_GAP.
+    """
+    k = min(max_k, len(scores))
+    for i in range(min(config.RERANK_MIN_K, k), k):
+        if scores[i] < config.RERANK_MIN_SCORE or scores[i - 1] - scores[i] > config.RERANK_SCORE_GAP:
+            return i
+    return k
+
+FIRST_STAGES = {"cosine": cosine_scores, "lexical": lexical_scores}
+
+def create_reranker_model():
+    """
+    The cross-encoder, micro-batched across concurrent requests unless it already runs
+    in the (batching) inference server.
+    """
+    model = load_cross_encoder()
+    if model is None or not config.RERANK_MICRO_BATCH:
+        return model
+    from core.inference_server import RemoteCrossEncoder
+    if isinstance(model, RemoteCrossEncoder):
+        return model
+    return MicroBatchedCrossEncoder(model, config.RERANK_MICRO_BATCH_MAX, config.RERANK_MICRO_BATCH_WAIT_MS)
+
+class RerankerAgent:
+    def __init__(self):
+        # Loaded on first use or by the start-up warm-up
+        self._model = LazyResource(
+            "reranker", create_reranker_model,
+            warm=lambda model: model is not None and model.predict([["warm up", "warm up"]]),
+            required=False
+        )
+
+    @property
+    def model(self):
+        return self._model.get()
+
+    def cascade(self, query: str, docs: list, top_k: int = 5):
+        """
+        Multi-stage reranking. A cheap first stage (RERANK_FIRST_STAGE) keeps the best
+        RERANK_FIRST_STAGE_K candidates; the cross-encoder scores them in batches of
+        RERANK_BATCH, in first-stage order, and stops early once RERANK_MIN_K of them
+        reach RERANK_CONFIDENT_SCORE; finally up to top_k are kept by adaptive_cutoff().
+        Returns (documents, details of what each stage did).
+        """
+        info = {"candidates": len(docs), "first_stage": len(docs), "pairs": 0, "early_exit": False}
+        first_stage = FIRST_STAGES.get(config.RERANK_FIRST_STAGE)
+        if first_stage is not None and len(docs) > config.RERANK_FIRST_STAGE_K:
+            cheap = first_stage(query, docs)
+            docs = [docs[i] for i in np.argsort(-cheap, kind="stable")[:config.RERANK_FIRST_STAGE_K]]
+            info["first_stage"] = len(docs)
+
+        batch_size = config.RERANK_BATCH or len(docs)
+        scored = []
+        for start in range(0, len(docs), batch_size):
+            batch = docs[start:start + batch_size]
+            scores = rerank_score_cache.score(query, [doc.page_content for doc in batch], self.model.predict)
+            scored.extend(zip(batch, scores))
+            info["pairs"] += len(batch)
+            confident = sum(1 for _, score in scored if score >= config.RERANK_CONFIDENT_SCORE)
+            if confident >= config.RERANK_MIN_K and start + batch_size < len(docs):
+                info["early_exit"] = True
+                break
+
+        scored.sort(key=lambda x: x[1], reverse=True)
+        k = adaptive_cutoff([score for _, score in scored], top_k)
+        info["k"] = k
+        info["scores"] = [float(score) for _, score in scored[:k]]
+        return [doc for doc, _ in scored[:k]], info
 
     def rerank(self, query: str, docs: list, top_k: int = 5):
         """
@@ -23,9 +150,14 @@ class RerankerAgent:
         
         logger.info(f"Reranking {len(docs)} documents")
         try:
-            # Prepare pairs [query, doc_text]
-            pairs = [[query, doc.page_content] for doc in docs]
-            scores = self.model.predict(pairs)
+            if config.RERANK_CASCADE:
+                reranked_docs, info = self.cascade(query, docs, top_k)
+                logger.info(f"Cascade kept {info['first_stage']} of {info['candidates']}, scored {info['pairs']} "
+                            f"pairs{' (early exit)' if info['early_exit'] else ''}, returned {info['k']}")
+                return reranked_docs
+
+            # Only [query, doc_text] pairs not scored before go to the model
+            scores = rerank_score_cache.score(query, [doc.page_content for doc in docs], self.model.predict)
             
             # Combine docs with scores
             doc_score_pairs = list(zip(docs, scores))
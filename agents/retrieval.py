@@ -1,20 +1,119 @@
 from core.database import db_service
+from core.index_writer import index_writer
+from core.maintenance import index_maintenance
+from core.lexical import lexical_index
+from core.partitions import recency_periods
+from core.routing import category_router
+from core.cache import query_embedding_cache
+from core.vector_index import mmr_select
 from core.config import config
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 logger = logging.getLogger(__name__)
 
+def reciprocal_rank_fusion(rankings, k: int = 60):
+    """
+    Fuses several ranked document lists: score(d) = sum over lists of 1 / (k + rank).
+    """
+    scores, docs = {}, {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            scores[doc.id] = scores.get(doc.id, 0.0) + 1.0 / (k + rank)
+            docs.setdefault(doc.id, doc)
+    return [docs[doc_id] for doc_id in sorted(scores, key=scores.get, reverse=True)]
+
 class RetrievalAgent:
     def __init__(self):
-        self.retriever = db_service.get_retriever(k=config.SEARCH_RESULTS_LIMIT * 2) # Retrieve more for reranking
+        self.k = config.SEARCH_RESULTS_LIMIT * 2 # Retrieve more for reranking
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
 
-    def retrieve(self, query: str):
+    def dense_search(self, query: str, k: int, fresh_index=None):
+        """
+        Vector search over the persistent store and chunks still waiting to be persisted.
+        When the request's freshly scraped chunks are given, they are searched exactly in
+        memory and only a smaller top-k is taken from the persistent store. With monthly
+        partitions, recency-sensitive queries only search the latest partitions; with
+        category partitions, only the one or two categories the query is routed to.
         """
-        Retrieves relevant documents for a query.
+        query_embedding = query_embedding_cache.embed_query(query)
+        periods, categories = None, None
+        if config.INDEX_PARTITIONING == "month":
+            periods = recency_periods(query, config.RECENCY_MONTHS)
+        if config.CATEGORY_PARTITIONING:
+            categories = category_router.route(query_embedding)
+        hits = []
+        persistent_k = k
+        if fresh_index is not None and len(fresh_index):
+            hits.extend(fresh_index.search(query_embedding, k))
+            persistent_k = min(k, config.PERSISTENT_TOP_K_WITH_FRESH)
+        hits.extend(db_service.similarity_search_by_vector(query_embedding, persistent_k, periods, categories))
+        hits.extend(index_writer.search_pending(query_embedding, persistent_k))
+
+        # Merge by similarity, keeping one copy of chunks found in both places
+        best = {}
+        for doc, score in hits:
+            if doc.id not in best or score > best[doc.id][1]:
+                best[doc.id] = (doc, score)
+        ranked = sorted(best.values(), key=lambda x: x[1], reverse=True)[:k]
+        return [doc for doc, _ in ranked]
+
+    def candidate_embeddings(self, docs, fresh_index=None):
+        """
+        Embeddings of the candidates, taken from wherever they are already stored: the
+        request's fresh chunks, chunks waiting to be persisted, then the vector store.
+        Only chunks found in none of them (none, normally) are embedded again.
+        """
+        ids = [doc.id for doc in docs]
+        found = fresh_index.embeddings_for(ids) if fresh_index is not None else {}
+        for lookup in (index_writer.pending_embeddings, db_service.get_embeddings):
+            missing = [doc_id for doc_id in ids if doc_id not in found]
+            if not missing:
+                break
+            found.update(lookup(missing))
+        missing = [doc for doc in docs if doc.id not in found]
+        if missing:
+            vectors = db_service.embedding_function.embed_documents([doc.page_content for doc in missing])
+            found.update(zip([doc.id for doc in missing], vectors))
+        return [found[doc_id] for doc_id in ids]
+
+    def diversify(self, query: str, docs, fresh_index=None):
+        """
+        Maximal marginal relevance over the candidates, capped at MMR_MAX_PER_SOURCE chunks
+        per page. Overlapping chunks of one page mostly say the same thing; dropping them
+        here means fewer cross-encoder pairs and more distinct sources in the context.
+        """
+        if len(docs) <= config.MMR_TOP_K:
+            return docs
+        selected = mmr_select(
+            query_embedding_cache.embed_query(query),
+            self.candidate_embeddings(docs, fresh_index),
+            config.MMR_TOP_K,
+            config.MMR_LAMBDA,
+            groups=[doc.metadata.get("source", doc.id) for doc in docs],
+            max_per_group=config.MMR_MAX_PER_SOURCE
+        )
+        return [docs[i] for i in selected]
+
+    def retrieve(self, query: str, fresh_index=None):
+        """
+        Retrieves relevant documents for a query. In hybrid mode BM25 and vector search
+        run in parallel and are fused with reciprocal rank fusion. The candidates are then
+        thinned out with MMR before they reach the reranker.
         """
         logger.info(f"Retrieving documents for: {query}")
         try:
-            docs = self.retriever.invoke(query)
+            if config.RETRIEVAL_MODE == "hybrid":
+                dense = self.executor.submit(self.dense_search, query, config.HYBRID_DEPTH, fresh_index)
+                lexical = self.executor.submit(lexical_index.get().search, query, config.HYBRID_DEPTH)
+                lexical_docs = [doc for doc, _ in lexical.result()]
+                docs = reciprocal_rank_fusion([dense.result(), lexical_docs], config.RRF_K)[:config.HYBRID_TOP_K]
+            else:
+                docs = self.dense_search(query, self.k, fresh_index)
+            if config.MMR_ENABLED:
+                docs = self.diversify(query, docs, fresh_index)
+
+            index_maintenance.record_access([doc.id for doc in docs])
             logger.info(f"Retrieved {len(docs)} documents")
             return docs
         except Exception as e:
@@ -1,10 +1,29 @@
 import requests
 from bs4 import BeautifulSoup
+from urllib.parse import urlparse
 import logging
+import time
 import re
 
 logger = logging.getLogger(__name__)
 
+REGULATORY_DOMAINS = ("rbi.org.in", "sebi.gov.in", "irdai.gov.in", "incometax.gov.in", "gst.gov.in",
+                      "mca.gov.in", "finmin.nic.in", "npci.org.in", "nseindia.com", "bseindia.com")
+NEWS_DOMAINS = ("economictimes.indiatimes.com", "moneycontrol.com", "livemint.com", "business-standard.com",
+                "financialexpress.com", "thehindubusinessline.com", "reuters.com", "ndtvprofit.com",
+                "cnbctv18.com", "bloomberg.com", "businesstoday.in", "zeebiz.com")
+
+def classify_source(url: str) -> str:
+    """
+    Classifies a URL as "regulatory", "news" or "web"; retention policies are set per type.
+    """
+    host = urlparse(url).netloc.lower().split(":")[0]
+    if host.endswith(".gov.in") or any(host == d or host.endswith("." + d) for d in REGULATORY_DOMAINS):
+        return "regulatory"
+    if any(host == d or host.endswith("." + d) for d in NEWS_DOMAINS):
+        return "news"
+    return "web"
+
 class WebScraperAgent:
     def __init__(self):
         self.headers = {
@@ -35,7 +54,9 @@ class WebScraperAgent:
             
             metadata = {
                 "source": url,
-                "title": soup.title.string if soup.title else "No Title"
+                "title": soup.title.string if soup.title else "No Title",
+                "source_type": classify_source(url),
+                "scraped_at": int(time.time())
             }
             
             return {"text": clean_text, "metadata": metadata}
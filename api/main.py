@@ -1,10 +1,16 @@
 from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr
 from core.pipeline import pipeline
 from core.auth import get_current_user, get_current_admin_user, auth_service, get_current_user_optional
 from core.database_auth import db_auth_service
+from core.maintenance import index_maintenance
+from core.resources import warm_up
+from core.cache import query_embedding_cache, rerank_score_cache, response_cache
+from core.llm import llm_service, LLMUnavailableError
+from fastapi.concurrency import run_in_threadpool
 from core.config import config
 from datetime import timedelta
 import logging
@@ -33,6 +39,7 @@ class QueryResponse(BaseModel):
     answer: str
     sources: list
     evaluation: dict
+    usage: dict = {}
 
 class UserRegister(BaseModel):
     email: EmailStr
@@ -55,6 +62,17 @@ class Token(BaseModel):
     token_type: str
     user: UserResponse
 
+@app.on_event("startup")
+async def start_warm_up():
+    """Load models, the vector store and MongoDB in the background"""
+    if config.WARMUP_ON_STARTUP:
+        warm_up.start()
+
+@app.on_event("startup")
+async def start_index_maintenance():
+    """Start scheduled index maintenance if configured"""
+    index_maintenance.start_scheduler()
+
 # Initialize first admin user on startup
 @app.on_event("startup")
 async def create_admin_user():
@@ -253,6 +271,31 @@ async def get_stats(current_user: dict = Depends(get_current_admin_user)):
     stats = db_auth_service.get_query_stats()
     return stats
 
+@app.get("/admin/index/stats")
+async def index_stats(current_user: dict = Depends(get_current_admin_user)):
+    """Vector store size and memory footprint (admin only)"""
+    return await run_in_threadpool(index_maintenance.stats)
+
+@app.post("/admin/index/maintenance")
+async def run_index_maintenance(compact: bool = False, current_user: dict = Depends(get_current_admin_user)):
+    """Expire old chunks, enforce the size cap and optionally compact the index (admin only)"""
+    try:
+        return await run_in_threadpool(index_maintenance.run, compact)
+    except Exception as e:
+        logger.error(f"Index maintenance failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/admin/cache/stats")
+async def cache_stats(current_user: dict = Depends(get_current_admin_user)):
+    """Hit rates of the in-process and shared caches (admin only)"""
+    return {"query_embeddings": query_embedding_cache.stats(), "rerank_scores": rerank_score_cache.stats(),
+            "llm_responses": response_cache.stats()}
+
+@app.get("/admin/llm/stats")
+async def llm_stats(current_user: dict = Depends(get_current_admin_user)):
+    """Calls, errors, answers and circuit state per LLM provider, and hedged calls (admin only)"""
+    return llm_service.gateway.stats()
+
 # Main application endpoints
 @app.post("/ask", response_model=QueryResponse)
 async def ask_question(request: QueryRequest, current_user: dict = Depends(get_current_user)):
@@ -262,7 +305,8 @@ async def ask_question(request: QueryRequest, current_user: dict = Depends(get_c
     start_time = time.time()
     
     try:
-        result = pipeline.run(request.query)
+        # The pipeline blocks (models, vector store, LLM); keep it off the event loop
+        result = await run_in_threadpool(pipeline.run, request.query)
         
         response_time = time.time() - start_time
         
@@ -279,8 +323,13 @@ async def ask_question(request: QueryRequest, current_user: dict = Depends(get_c
         return QueryResponse(
             answer=result["answer"],
             sources=result["sources"],
-            evaluation=result["evaluation"]
+            evaluation=result["evaluation"],
+            usage=result.get("usage", {})
         )
+    except LLMUnavailableError as e:
+        logger.error(f"No LLM provider answered: {e}")
+        raise HTTPException(status_code=503, detail="The language model is unavailable, please retry shortly",
+                            headers={"Retry-After": str(int(config.LLM_BREAKER_COOLDOWN_S))})
     except Exception as e:
         logger.error(f"Error processing query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -295,3 +344,9 @@ async def get_history(limit: int = 50, current_user: dict = Depends(get_current_
 async def health_check():
     """Health check endpoint (public)"""
     return {"status": "healthy", "auth_enabled": config.ENABLE_AUTH}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe (public): 503 until models and stores are loaded"""
+    readiness = warm_up.readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
@@ -0,0 +1,122 @@
+"""
+ANN recall/latency benchmark for Chroma HNSW settings.
+
+Usage (from the repository root):
+    python -m benchmarks.ann_recall --sizes 10000,100000 --search-ef 10,32,64,128
+    python -m benchmarks.ann_recall --corpus recorded --sizes 10000,100000,1000000 --M 32
+
+For every corpus size it builds a collection in a temporary directory and reports build
+time, resident memory growth, and for each search ef the recall@k against exact
+(brute-force) search and query latency percentiles. Chroma keeps the ef it loaded the
+index with, so before each ef the collection is reconfigured, reopened from a fresh
+client and the live value checked, so that every row measures the ef it reports.
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+import chromadb
+from chromadb.api.client import SharedSystemClient
+from core.config import config
+from core.vector_backends import apply_search_ef, create_engine, live_search_ef
+from core.vector_index import normalize_rows
+
+def rss_bytes() -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+def synthetic_corpus(size: int, dim: int, rng) -> np.ndarray:
+    """Clustered unit vectors, which behave more like text embeddings than uniform noise."""
+    centers = rng.standard_normal((max(size // 500, 8), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size)
+    return normalize_rows(centers[labels] + 0.6 * rng.standard_normal((size, dim)).astype(np.float32))
+
+def recorded_corpus(size: int, rng) -> np.ndarray:
+    """Real embeddings from the vector store, resampled with small noise up to the target size."""
+    base = np.asarray(create_engine().open(config.COLLECTION_NAME).get(include_embeddings=True)["embeddings"],
+                      dtype=np.float32)
+    if len(base) == 0:
+        raise SystemExit("Recorded corpus is empty; index some queries first or use --corpus synthetic")
+    picks = rng.integers(0, len(base), size)
+    return normalize_rows(base[picks] + 0.05 * rng.standard_normal((size, base.shape[1])).astype(np.float32))
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int, block: int = 100000) -> np.ndarray:
+    """Brute-force cosine top-k ids, computed in blocks so 1M x 384 fits in memory."""
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), k), dtype=np.int64)
+    for start in range(0, len(corpus), block):
+        block_scores = queries @ corpus[start:start + block].T
+        block_ids = np.broadcast_to(np.arange(start, start + block_scores.shape[1]), block_scores.shape)
+        scores = np.concatenate([best_scores, block_scores], axis=1)
+        ids = np.concatenate([best_ids, block_ids], axis=1)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_ids = np.take_along_axis(ids, top, axis=1)
+    return best_ids
+
+def run(size: int, corpus: np.ndarray, args, rng):
+    queries = normalize_rows(corpus[rng.integers(0, size, args.queries)]
+                             + 0.1 * rng.standard_normal((args.queries, corpus.shape[1])).astype(np.float32))
+    truth = exact_top_k(corpus, queries, args.k)
+
+    path = tempfile.mkdtemp(prefix="ann_bench_")
+    client = chromadb.PersistentClient(path=path)
+    collection = client.create_collection("bench", metadata={
+        "hnsw:space": args.space, "hnsw:M": args.M,
+        "hnsw:construction_ef": args.construction_ef, "hnsw:search_ef": args.search_ef[0],
+    })
+
+    batch = client.get_max_batch_size() if hasattr(client, "get_max_batch_size") else 5000
+    rss_before = rss_bytes()
+    started = time.perf_counter()
+    for start in range(0, size, batch):
+        stop = min(start + batch, size)
+        collection.add(ids=[str(i) for i in range(start, stop)], embeddings=corpus[start:stop].tolist())
+    build_seconds = time.perf_counter() - started
+    memory_mb = (rss_bytes() - rss_before) / 1e6
+
+    print(f"\n== {size:,} chunks: build {build_seconds:.1f}s ({size / build_seconds:,.0f}/s), "
+          f"+{memory_mb:,.0f} MB RSS, M={args.M}, construction_ef={args.construction_ef}, space={args.space}")
+    print(f"{'search_ef':>9} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+    for search_ef in args.search_ef:
+        apply_search_ef(collection, search_ef)
+        SharedSystemClient.clear_system_cache()
+        client = chromadb.PersistentClient(path=path)
+        collection = client.get_collection("bench")
+        if live_search_ef(collection) != search_ef:
+            raise SystemExit(f"Chroma still searches with ef={live_search_ef(collection)}, not {search_ef}")
+        collection.query(query_embeddings=[queries[0].tolist()], n_results=args.k, include=[])  # loads the index
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            t0 = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=args.k, include=[])
+            latencies.append((time.perf_counter() - t0) * 1000)
+            hits += len({int(i) for i in result["ids"][0]} & set(expected.tolist()))
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"{search_ef:>9} {hits / truth.size:>10.4f} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", choices=["synthetic", "recorded"], default="synthetic")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=384, help="Vector size for the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--space", default=config.CHROMA_HNSW_SPACE)
+    parser.add_argument("--M", type=int, default=config.CHROMA_HNSW_M)
+    parser.add_argument("--construction-ef", type=int, default=config.CHROMA_HNSW_CONSTRUCTION_EF)
+    parser.add_argument("--search-ef", default="10,32,64,128", help="Comma-separated search ef values to sweep")
+    args = parser.parse_args()
+    args.search_ef = [int(x) for x in args.search_ef.split(",")]
+
+    rng = np.random.default_rng(42)
+    for size in (int(x) for x in args.sizes.split(",")):
+        corpus = synthetic_corpus(size, args.dim, rng) if args.corpus == "synthetic" else recorded_corpus(size, rng)
+        run(size, corpus, args, rng)
+
+if __name__ == "__main__":
+    main()
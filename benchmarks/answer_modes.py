@@ -0,0 +1,91 @@
+"""
+Latency and quality of single-call answers versus concurrent per-section generation.
+
+Usage (from the repository root):
+    python -m benchmarks.answer_modes --queries 20
+    python -m benchmarks.answer_modes --provider gemini --queries 5
+
+Answers labelled finance questions over the same retrieved context in both
+ANSWER_MODE settings. The default "fake" provider runs offline and simulates
+--prefill-ms-per-token and --decode-ms-per-token of latency, so only the latency
+columns are meaningful for it; use a real provider to compare quality. Reported per
+mode: p50/p95 answer latency, LLM calls, input and output tokens, format compliance
+(all four section headings, in order, once each), the share of sentences repeated
+across sections, and the mean EvaluationAgent score. The response cache is disabled.
+"""
+import os
+os.environ["RESPONSE_CACHE_SIZE"] = "0"
+os.environ["RESPONSE_CACHE_DB"] = ""
+
+import argparse
+import re
+import time
+import numpy as np
+from langchain_core.documents import Document
+from core.config import config
+from core.context import split_sentences, normalize_sentence
+from core.llm import llm_service
+from benchmarks.fake_llm import FakeProvider
+from core.llm_gateway import LLMGateway
+from core.resources import LazyResource
+from agents.answering import answering_agent, SECTIONS
+from agents.evaluation import evaluation_agent
+from benchmarks.category_routing import LABELLED_QUERIES
+
+CONTEXT_DOCS = [
+    Document(id="rbi", metadata={"title": "RBI Monetary Policy Statement", "source": "rbi"}, page_content=(
+        "The Monetary Policy Committee kept the policy repo rate unchanged at 6.50 per cent. "
+        "The standing deposit facility rate remains at 6.25 per cent and the marginal standing facility rate at 6.75 per cent. "
+        "The committee retained its stance of withdrawal of accommodation to align inflation with the target.")),
+    Document(id="sebi", metadata={"title": "SEBI circular on mutual fund expense ratios", "source": "sebi"}, page_content=(
+        "SEBI revised the total expense ratio limits for mutual fund schemes. "
+        "Asset management companies must disclose the changes to investors before they take effect.")),
+    Document(id="news", metadata={"title": "Markets news", "source": "news"}, page_content=(
+        "Bank stocks rose after the policy announcement as analysts expect stable lending rates. "
+        "Economists expect a rate cut only once CPI inflation moves durably towards 4 per cent.")),
+]
+
+HEADING = re.compile(r"\*\*([A-D])\.")
+
+def format_ok(answer: str) -> bool:
+    return HEADING.findall(answer) == [heading.strip("*")[0] for heading, _ in SECTIONS]
+
+def repeated_share(answer: str) -> float:
+    sentences = [normalize_sentence(s) for s in split_sentences(answer) if not s.lstrip().startswith("**")]
+    return 1 - len(set(sentences)) / len(sentences) if sentences else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", default="fake")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.05, help="Simulated cost (fake provider)")
+    parser.add_argument("--decode-ms-per-token", type=float, default=5.0, help="Simulated cost (fake provider)")
+    args = parser.parse_args()
+
+    if args.provider == "fake":
+        fake = FakeProvider(prefill_ms_per_token=args.prefill_ms_per_token, decode_ms_per_token=args.decode_ms_per_token)
+        llm_service.gateway = LLMGateway(LazyResource("benchmark-llm", lambda: fake))
+    else:
+        config.LLM_PROVIDER = args.provider
+    queries = [q for qs in LABELLED_QUERIES.values() for q in qs][:args.queries]
+
+    print(f"{'mode':>9} {'p50 ms':>8} {'p95 ms':>8} {'calls':>6} {'input tok':>10} {'output tok':>11} "
+          f"{'format ok':>9} {'repeated':>8} {'eval':>5}")
+    for mode in ("single", "sections"):
+        latencies, calls, input_tokens, output_tokens, formats, repeats, scores = [], [], [], [], [], [], []
+        for query in queries:
+            started = time.perf_counter()
+            answer, usage = answering_agent.answer(query, CONTEXT_DOCS, mode=mode)
+            latencies.append((time.perf_counter() - started) * 1000)
+            calls.append(usage.get("llm_calls", 1))
+            input_tokens.append(usage.get("llm_input_tokens") or 0)
+            output_tokens.append(usage.get("llm_output_tokens") or 0)
+            formats.append(format_ok(answer))
+            repeats.append(repeated_share(answer))
+            scores.append(evaluation_agent.evaluate(query, answer, CONTEXT_DOCS)["score"])
+        print(f"{mode:>9} {np.percentile(latencies, 50):>8.0f} {np.percentile(latencies, 95):>8.0f} "
+              f"{np.mean(calls):>6.1f} {np.mean(input_tokens):>10.0f} {np.mean(output_tokens):>11.0f} "
+              f"{np.mean(formats):>9.0%} {np.mean(repeats):>8.1%} {np.mean(scores):>5.2f}")
+
+if __name__ == "__main__":
+    main()
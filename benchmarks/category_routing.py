@@ -0,0 +1,142 @@
+"""
+Routing accuracy and latency of the category router against the single-collection baseline.
+
+Usage (from the repository root):
+    python -m benchmarks.category_routing --k 20
+
+Part 1 classifies labelled finance questions and reports top-1 accuracy, how often the
+routed partitions contain the right category, and classifier latency.
+Part 2 (needs indexed chunks) copies the recorded corpus into one collection and into
+per-category collections, then compares search latency, overlap with the baseline
+top-k, and how many off-topic candidates the routing removes before reranking.
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+import chromadb
+from core.database import db_service
+from core.routing import category_router
+
+LABELLED_QUERIES = {
+    "banking": [
+        "What is the current RBI repo rate?",
+        "Explain the difference between NEFT and RTGS",
+        "What are the latest RBI guidelines on digital lending?",
+        "How is the interest on a fixed deposit calculated?",
+        "What happens if I miss an EMI on my home loan?",
+        "What is the minimum balance rule for SBI savings accounts?",
+    ],
+    "markets": [
+        "What is SEBI's role in the stock market?",
+        "Explain the concept of mutual funds in India",
+        "What are the latest changes in IPO regulations?",
+        "Why did the Nifty fall today?",
+        "How are F&O contracts settled on NSE?",
+        "What is the yield on the 10-year government bond?",
+    ],
+    "taxation": [
+        "What is GST and how does it work in India?",
+        "Explain the income tax slabs for FY 2024-25",
+        "What are the tax benefits of investing in ELSS?",
+        "How is long-term capital gains tax calculated on shares?",
+        "What is the due date for filing ITR this year?",
+        "Can I claim HRA and a home loan deduction together?",
+    ],
+    "corporate": [
+        "What is the Companies Act 2013?",
+        "Explain the concept of NBFC in India",
+        "What are the latest SEBI regulations for listed companies?",
+        "How does the insolvency process under IBC work?",
+        "What are CSR spending obligations for companies?",
+        "What did Infosys report in its quarterly results?",
+    ],
+}
+
+def percentiles(values):
+    return "p50={:.3f}ms p95={:.3f}ms".format(*np.percentile(values, [50, 95]))
+
+def routing_accuracy():
+    queries = [(label, q) for label, qs in LABELLED_QUERIES.items() for q in qs]
+    embeddings = [db_service.embedding_function.embed_query(q) for _, q in queries]
+
+    correct, covered, partitions, latencies = 0, 0, 0, []
+    for (label, query), embedding in zip(queries, embeddings):
+        t0 = time.perf_counter()
+        routed = category_router.route(embedding)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        correct += routed[0] == label
+        covered += label in routed
+        partitions += len(routed)
+        if routed[0] != label:
+            print(f"  miss: [{label}] {query} -> {routed}")
+
+    n = len(queries)
+    print(f"Routing: top-1 accuracy {correct / n:.2%}, routed set contains label {covered / n:.2%}, "
+          f"{partitions / n:.2f} partitions/query, classifier {percentiles(latencies)}")
+    return queries, embeddings
+
+def search_comparison(queries, embeddings, k: int):
+    ids, vectors, texts = [], [], []
+    for name, _ in db_service.list_partitions():
+        page = db_service.get_partition(name).get(include_embeddings=True)
+        ids.extend(page["ids"])
+        vectors.extend(page["embeddings"])
+        texts.extend(page["documents"])
+    if not ids:
+        print("No indexed chunks; skipping the search comparison")
+        return
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    categories = category_router.tag(vectors)
+    category_of = dict(zip(ids, categories))
+    print(f"Corpus: {len(ids)} chunks, " + ", ".join(f"{c}={categories.count(c)}" for c in sorted(set(categories))))
+
+    client = chromadb.PersistentClient(path=tempfile.mkdtemp(prefix="routing_bench_"))
+    single = client.create_collection("single")
+    single.add(ids=ids, embeddings=vectors.tolist())
+    partitions = {}
+    for category in set(categories):
+        rows = [i for i, c in enumerate(categories) if c == category]
+        partitions[category] = client.create_collection(f"part_{category}")
+        partitions[category].add(ids=[ids[i] for i in rows], embeddings=vectors[rows].tolist())
+
+    def search(collection, embedding):
+        n = min(k, collection.count())
+        return collection.query(query_embeddings=[embedding], n_results=n, include=["distances"]) if n else None
+
+    single_ms, routed_ms, overlap, off_topic_single, off_topic_routed = [], [], [], [], []
+    for (label, _), embedding in zip(queries, embeddings):
+        t0 = time.perf_counter()
+        baseline = search(single, embedding)["ids"][0]
+        single_ms.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        routed = category_router.route(embedding)
+        hits = []
+        for category in routed:
+            if category in partitions:
+                result = search(partitions[category], embedding)
+                if result:
+                    hits.extend(zip(result["ids"][0], result["distances"][0]))
+        routed_ids = [doc_id for doc_id, _ in sorted(hits, key=lambda x: x[1])[:k]]
+        routed_ms.append((time.perf_counter() - t0) * 1000)
+
+        overlap.append(len(set(baseline) & set(routed_ids)) / max(len(baseline), 1))
+        off_topic_single.append(np.mean([category_of[i] != label for i in baseline]))
+        off_topic_routed.append(np.mean([category_of[i] != label for i in routed_ids]) if routed_ids else 0.0)
+
+    print(f"Single collection: {percentiles(single_ms)}, off-topic candidates {np.mean(off_topic_single):.2%}")
+    print(f"Routed partitions: {percentiles(routed_ms)}, off-topic candidates {np.mean(off_topic_routed):.2%}, "
+          f"overlap with baseline top-{k} {np.mean(overlap):.2%}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    queries, embeddings = routing_accuracy()
+    search_comparison(queries, embeddings, args.k)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Accuracy and latency of the domain guard, and margin tuning from its decision log.
+
+Usage (from the repository root):
+    python -m benchmarks.domain_guard
+    python -m benchmarks.domain_guard --margins 0,0.05,0.1,0.15 --log domain_guard.jsonl
+
+Checks the labelled finance questions, hard finance questions that use health,
+travel, family or sports words, and a set of off-topic questions, and reports, per
+DOMAIN_GUARD_MARGIN, the share of each finance set let through and of off-topic
+questions refused, plus the guard's latency with a cold and a warm query embedding.
+Calibrate on the hard set: a refused finance question gets no answer at all.
+With --log, it also shows how many of the logged production decisions each margin
+would refuse, and the logged queries closest to the boundary.
+"""
+import os
+os.environ["DOMAIN_GUARD_LOG"] = ""
+
+import argparse
+import json
+import time
+import numpy as np
+from core.routing import DomainGuard
+from benchmarks.category_routing import LABELLED_QUERIES
+
+# Finance questions worded like the off-topic groups
+HARD_FINANCE_QUERIES = [
+    "Which health insurance plan gives the best 80D deduction for senior citizens?",
+    "Is travel insurance worth buying for a Europe trip?",
+    "How much should I save every month for my child's education?",
+    "Does mediclaim cover dengue hospitalisation and how do I file the claim?",
+    "Should I buy a forex card or carry cash for my holiday in Thailand?",
+    "How much does a cricket IPL franchise earn from media rights?",
+    "How do I plan the budget for my wedding?",
+    "Can I claim medical expenses for my parents under section 80D?",
+    "Is a term plan better than an endowment policy for a new parent?",
+    "What is the tax on prize money from a reality TV show?",
+]
+
+OFF_TOPIC_QUERIES = [
+    "Who won the IPL final last night?",
+    "Suggest a good Bollywood movie to watch this weekend",
+    "What are the symptoms of dengue fever?",
+    "How do I make butter chicken at home?",
+    "What will the weather be like in Mumbai tomorrow?",
+    "Write a poem about the monsoon",
+    "How do I fix a null pointer exception in Java?",
+    "Who was the first Mughal emperor?",
+    "What is the best diet to lose weight fast?",
+    "Recommend some places to visit in Kerala",
+    "Tell me a joke",
+    "How can I improve my sleep?",
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--margins", default="-0.05,0,0.05,0.1,0.15,0.2")
+    parser.add_argument("--log", default="", help="Decision log (DOMAIN_GUARD_LOG) to replay")
+    args = parser.parse_args()
+
+    guard = DomainGuard(log_path="")
+    finance = [q for qs in LABELLED_QUERIES.values() for q in qs]
+    queries = ([(q, True) for q in finance] + [(q, True) for q in HARD_FINANCE_QUERIES]
+               + [(q, False) for q in OFF_TOPIC_QUERIES])
+
+    cold, warm, gaps = [], [], []
+    for query, _ in queries:
+        started = time.perf_counter()
+        decision = guard.check(query)
+        cold.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        guard.check(query)
+        warm.append((time.perf_counter() - started) * 1000)
+        gaps.append(decision["off_topic_score"] - decision["finance_score"])
+    gaps = np.array(gaps)
+    is_finance = np.array([label for _, label in queries])
+    is_hard = np.array([query in HARD_FINANCE_QUERIES for query, _ in queries])
+    is_labelled = is_finance & ~is_hard
+
+    print(f"Queries: {is_labelled.sum()} finance, {is_hard.sum()} hard finance, {(~is_finance).sum()} off-topic")
+    print(f"Latency: cold p50={np.percentile(cold, 50):.2f}ms, warm (cached embedding) p50={np.percentile(warm, 50):.3f}ms")
+    print(f"{'margin':>7} {'finance allowed':>15} {'hard finance allowed':>20} {'off-topic refused':>17}")
+    for margin in (float(m) for m in args.margins.split(",")):
+        refused = gaps > margin
+        print(f"{margin:>7.2f} {np.mean(~refused[is_labelled]):>15.0%} {np.mean(~refused[is_hard]):>20.0%} "
+              f"{np.mean(refused[~is_finance]):>17.0%}")
+    for (query, label), gap in zip(queries, gaps):
+        wrong = (gap > guard.margin) == label
+        if wrong:
+            print(f"  misclassified at margin {guard.margin}: {query!r} (gap {gap:+.3f})")
+
+    if args.log:
+        with open(args.log, encoding="utf-8") as f:
+            decisions = [json.loads(line) for line in f if line.strip()]
+        decisions = [d for d in decisions if "finance_score" in d]
+        logged = np.array([d["off_topic_score"] - d["finance_score"] for d in decisions])
+        print(f"\nLogged decisions: {len(decisions)}")
+        for margin in (float(m) for m in args.margins.split(",")):
+            print(f"{margin:>7.2f} would refuse {np.mean(logged > margin):.1%}")
+        print("Closest to the boundary:")
+        for i in np.argsort(np.abs(logged - guard.margin))[:10]:
+            print(f"  {logged[i]:+.3f} {decisions[i]['query']!r}")
+
+if __name__ == "__main__":
+    main()
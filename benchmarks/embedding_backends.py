@@ -0,0 +1,88 @@
+"""
+Accuracy-parity check and throughput benchmark for the embedding backends.
+
+Usage (from the repository root):
+    python -m benchmarks.embedding_backends --limit 2000
+
+Embeds the same chunks with the HuggingFace (PyTorch) path and the ONNX path,
+reports chunks/sec for each, and compares the vectors. Exits non-zero if the
+ONNX vectors drift below --min-cosine from the reference, or if either backend did
+not load as itself (the ONNX path silently falls back to PyTorch in production).
+"""
+import argparse
+import sys
+import time
+import numpy as np
+import chromadb
+from core.config import config
+from core.embeddings import create_embedding_function
+from core.onnx_models import OnnxEmbeddings
+
+SAMPLE_TEXTS = [
+    "The RBI kept the repo rate unchanged at 6.50% in its latest monetary policy review.",
+    "Section 80C allows a deduction of up to Rs 1.5 lakh for ELSS, PPF and life insurance premiums.",
+    "SEBI circular SEBI/HO/MRD/2023/12 revises the framework for algorithmic trading by retail investors.",
+    "NBFCs must maintain a capital adequacy ratio of at least 15% under the scale-based regulation.",
+    "GST on financial services is levied at 18% and input tax credit is available subject to conditions.",
+    "The Nifty 50 closed higher on Friday led by gains in banking and IT stocks.",
+]
+
+def load_corpus(limit: int):
+    """Loads recorded chunks from the persistent collection, or synthetic text if it is empty."""
+    try:
+        client = chromadb.PersistentClient(path=config.CHROMA_DB_DIR)
+        collection = client.get_collection(config.COLLECTION_NAME)
+        texts = collection.get(limit=limit, include=["documents"])["documents"]
+        if texts:
+            return texts
+    except Exception as e:
+        print(f"Could not read recorded corpus ({e}); using synthetic text")
+    return [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] * (1 + i % 4) for i in range(limit)]
+
+def measure(embeddings, texts):
+    embeddings.embed_documents(texts[:8])  # warm-up
+    start = time.perf_counter()
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    elapsed = time.perf_counter() - start
+    return vectors, len(texts) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=1000, help="Number of chunks to embed")
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="Parity threshold per vector")
+    args = parser.parse_args()
+
+    config.INFERENCE_MODE = "local"
+    texts = load_corpus(args.limit)
+    print(f"Corpus: {len(texts)} chunks")
+
+    onnx = create_embedding_function("onnx")
+    if not isinstance(onnx, OnnxEmbeddings):
+        print(f"ONNX backend did not load (got {type(onnx).__name__}, see the warning above); nothing to compare")
+        sys.exit(1)
+    reference, reference_rate = measure(create_embedding_function("huggingface"), texts)
+    candidate, candidate_rate = measure(onnx, texts)
+
+    def normalize(m):
+        return m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-12, None)
+
+    cosine = (normalize(reference) * normalize(candidate)).sum(axis=1)
+
+    # Retrieval parity: does the ONNX path return the same top-10 neighbours?
+    queries = normalize(reference[:50])
+    top_ref = np.argsort(-(queries @ normalize(reference).T), axis=1)[:, :10]
+    top_onnx = np.argsort(-(normalize(candidate[:50]) @ normalize(candidate).T), axis=1)[:, :10]
+    overlap = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(top_ref, top_onnx)])
+
+    print(f"huggingface: {reference_rate:8.1f} chunks/sec")
+    print(f"onnx:        {candidate_rate:8.1f} chunks/sec  ({candidate_rate / reference_rate:.2f}x)")
+    print(f"cosine to reference: mean={cosine.mean():.4f} min={cosine.min():.4f}")
+    print(f"top-10 neighbour overlap: {overlap:.3f}")
+
+    if cosine.min() < args.min_cosine:
+        print(f"PARITY FAILED: min cosine {cosine.min():.4f} < {args.min_cosine}")
+        sys.exit(1)
+    print("Parity OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Offline LLM provider shared by the LLM benchmarks (prefix_cache, answer_modes and
+llm_gateway). It is not registered in core.llm.PROVIDERS, so it can never be
+selected with LLM_PROVIDER.
+"""
+from core.config import config
+from core.context import estimate_tokens
+from core.llm import LLMProvider, prefix_key
+import threading
+import random
+import time
+import re
+
+class FakeProvider(LLMProvider):
+    """
+    Offline LLM provider for the benchmarks; pass it to an LLMGateway. It models a prefix
+    cache: a system prompt it has seen before costs no prefill, everything else is
+    counted in prefill_tokens. prefill_ms_per_token and decode_ms_per_token (per output
+    token) add matching simulated latency. latency_ms (a fixed delay per call) and
+    error_rate (the fraction of calls that raise) stand in for a slow or failing backend
+    when testing the gateway. Asked for a single answer section, it writes only that one.
+    """
+    name = "fake"
+    SECTIONS = {
+        "A": "**A. Summary**\n- Fake answer to: {question}\n- Based on [Source 1].",
+        "B": "**B. Detailed Explanation**\n" + "- Concepts and regulations from [Source 1], Indian context first.\n" * 8,
+        "C": "**C. Insights from Latest News**\n" + "- A relevant development reported in [Source 2].\n" * 3,
+        "D": "**D. Final Verdict / Personal Note / TL;DR**\n- Offline test response.",
+    }
+    SECTION_REQUEST = re.compile(r"Write ONLY section \*\*([A-D])\.")
+
+    def __init__(self, model: str = None, prefix_cache: bool = None, prefill_ms_per_token: float = 0.0,
+                 latency_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0, decode_ms_per_token: float = 0.0):
+        super().__init__(model)
+        self.llm = self
+        self.prefix_cache = config.LLM_PREFIX_CACHE if prefix_cache is None else prefix_cache
+        self.prefill_ms_per_token = prefill_ms_per_token
+        self.decode_ms_per_token = decode_ms_per_token
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.cached_prefixes = set()
+        self.prefill_tokens = 0
+        self.cached_tokens = 0
+        self.active = 0
+        self.peak_active = 0  # most calls running at once, as the backend would see them
+
+    def generate(self, system_prompt, prompt):
+        with self.lock:
+            failed = self.random.random() < self.error_rate
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            return self._generate(system_prompt, prompt, failed)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def _generate(self, system_prompt, prompt, failed):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if failed:
+            raise RuntimeError("fake provider error")
+
+        key = prefix_key(system_prompt, self.model)
+        prefix_tokens, prompt_tokens = estimate_tokens(system_prompt), estimate_tokens(prompt)
+        with self.lock:
+            cached = self.prefix_cache and key in self.cached_prefixes
+            if self.prefix_cache:
+                self.cached_prefixes.add(key)
+            prefill = prompt_tokens + (0 if cached else prefix_tokens)
+            self.calls += 1
+            self.prefix_hits += cached
+            self.prefill_tokens += prefill
+            self.cached_tokens += prefix_tokens if cached else 0
+        if self.prefill_ms_per_token:
+            time.sleep(prefill * self.prefill_ms_per_token / 1000)
+
+        lines = [line.strip() for line in prompt.splitlines() if line.strip()]
+        question = lines[lines.index("Question:") + 1] if "Question:" in lines[:-1] else prompt
+        requested = self.SECTION_REQUEST.search(prompt)
+        sections = [requested.group(1)] if requested else list(self.SECTIONS)
+        text = "\n\n".join(self.SECTIONS[name].format(question=question).strip() for name in sections)
+        output_tokens = estimate_tokens(text)
+        if self.decode_ms_per_token:
+            time.sleep(output_tokens * self.decode_ms_per_token / 1000)
+        return text, {"prefix_cached": cached, "llm_input_tokens": prefix_tokens + prompt_tokens,
+                      "llm_output_tokens": output_tokens, "llm_cached_tokens": prefix_tokens if cached else 0,
+                      "llm_prefill_tokens": prefill}
+
+    def stats(self) -> dict:
+        return {**super().stats(), "prefill_tokens": self.prefill_tokens, "cached_tokens": self.cached_tokens,
+                "peak_active": self.peak_active}
@@ -0,0 +1,137 @@
+"""
+Write throughput with several API workers: direct writes versus the indexer service.
+
+Usage (from the repository root):
+    python -m benchmarks.indexer_throughput --workers 1,4,8 --batches 20 --batch-size 64
+
+"direct" mode has every worker process open the same Chroma directory and upsert its
+own batches, as uvicorn workers do with INDEX_WRITER_MODE=local. "service" mode starts
+core/indexer_service.py on a fresh store and the workers only submit batches to it.
+For each worker count it reports chunks/sec until every chunk is persisted, failed
+batches, and whether the final store count matches what was submitted.
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing.managers import BaseManager
+import numpy as np
+
+AUTHKEY = b"indexer-benchmark"
+
+class BenchmarkClient(BaseManager):
+    pass
+
+BenchmarkClient.register("indexer")
+
+def connect(address: str):
+    client = BenchmarkClient(address=address, authkey=AUTHKEY)
+    client.connect()
+    return client.indexer()
+
+def make_batch(worker: int, batch: int, size: int, dim: int):
+    rng = np.random.default_rng(worker * 100003 + batch)
+    ids = [f"w{worker}-b{batch}-{i}" for i in range(size)]
+    texts = [f"chunk {doc_id}" for doc_id in ids]
+    metadatas = [{"source": f"https://example.com/{worker}/{batch}", "scraped_at": int(time.time())} for _ in ids]
+    embeddings = rng.standard_normal((size, dim)).astype(np.float32)
+    return ids, texts, metadatas, embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+def direct_worker(path: str, worker: int, batches: int, size: int, dim: int):
+    from core.vector_backends import ChromaEngine
+    collection = ChromaEngine(path).open("finance_rag")
+    failed = 0
+    for batch in range(batches):
+        ids, texts, metadatas, embeddings = make_batch(worker, batch, size, dim)
+        try:
+            collection.upsert(ids, texts, metadatas, embeddings.tolist())
+        except Exception:
+            failed += 1
+    return failed
+
+def service_worker(address: str, worker: int, batches: int, size: int, dim: int):
+    indexer = connect(address)
+    failed = 0
+    for batch in range(batches):
+        try:
+            indexer.submit(*make_batch(worker, batch, size, dim))
+        except Exception:
+            failed += 1
+    return failed
+
+def start_service(root: str, dim: int):
+    address = os.path.join(root, "indexer.sock")
+    env = dict(os.environ,
+               CHROMA_DB_DIR=os.path.join(root, "chroma"),
+               INDEX_SPOOL_DIR=os.path.join(root, "spool"),
+               INDEX_GENERATION_FILE=os.path.join(root, "generation.json"),
+               INDEX_SERVICE_ADDRESS=address,
+               INDEX_SERVICE_AUTHKEY=AUTHKEY.decode(),
+               VECTOR_BACKEND="chroma",
+               INDEX_PARTITIONING="none",
+               CATEGORY_PARTITIONING="false",
+               INDEX_MAINTENANCE_INTERVAL_MINUTES="0")
+    process = subprocess.Popen([sys.executable, "-m", "core.indexer_service"], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 300  # the service loads the embedding model on start-up
+    while True:
+        try:
+            connect(address).status()
+            return process, address
+        except (FileNotFoundError, ConnectionError, EOFError, OSError):
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise SystemExit("Indexer service did not start")
+            time.sleep(0.5)
+
+def stored_count(path: str) -> int:
+    from core.vector_backends import ChromaEngine
+    return ChromaEngine(path).open("finance_rag").count()
+
+def run(mode: str, workers: int, args) -> str:
+    root = tempfile.mkdtemp(prefix=f"indexer_bench_{mode}_")
+    context = multiprocessing.get_context("spawn")
+    process = None
+    if mode == "service":
+        process, target = start_service(root, args.dim)
+    else:
+        target = os.path.join(root, "chroma")
+        stored_count(target)  # create the collection up front so workers don't race on it
+    worker = service_worker if mode == "service" else direct_worker
+
+    try:
+        with context.Pool(workers) as pool:
+            started = time.perf_counter()
+            failed = sum(pool.starmap(worker, [(target, w, args.batches, args.batch_size, args.dim)
+                                               for w in range(workers)]))
+            if mode == "service":
+                connect(target).flush()
+            elapsed = time.perf_counter() - started
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    submitted = workers * args.batches * args.batch_size
+    stored = stored_count(os.path.join(root, "chroma"))
+    return (f"{mode:>8} {workers:>7} {submitted / elapsed:>12,.0f} {failed:>7} "
+            f"{stored:>8}/{submitted:<8} {'ok' if stored == submitted else 'MISSING'}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,4,8")
+    parser.add_argument("--modes", default="direct,service")
+    parser.add_argument("--batches", type=int, default=20, help="Batches per worker")
+    parser.add_argument("--batch-size", type=int, default=64, help="Chunks per batch (one scraped request)")
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'workers':>7} {'chunks/sec':>12} {'failed':>7} {'stored':>17}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        for mode in args.modes.split(","):
+            print(run(mode, workers, args))
+
+if __name__ == "__main__":
+    main()
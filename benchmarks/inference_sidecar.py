@@ -0,0 +1,106 @@
+"""
+Memory and throughput of per-worker models versus the shared inference server.
+
+Usage (from the repository root, Linux):
+    python -m benchmarks.inference_sidecar --workers 1,4,8 --requests 50 --candidates 20
+
+Each worker process stands in for an API worker: it loads the embedding function and
+the cross-encoder the way the API does, then answers --requests queries, each one a
+query embedding plus a rerank of --candidates passages. "local" loads both models in
+every worker (INFERENCE_MODE=local); "sidecar" starts core/inference_server.py once
+and the workers only hold socket clients. It reports requests/sec across all workers
+and the resident memory of the workers plus the server.
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+QUERIES = [
+    "What is the current repo rate set by the RBI?",
+    "How did Nifty 50 perform this quarter?",
+    "What are the new GST rates on insurance premiums?",
+    "Which banks reported the highest net interest margin?",
+    "What are the SEBI rules for SME IPOs?",
+]
+
+PASSAGE = ("The Reserve Bank of India kept the policy repo rate unchanged while banks reported "
+           "steady credit growth and markets priced in {n} basis points of easing over the year.")
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def worker(mode: str, socket_path: str, requests: int, candidates: int, start_barrier):
+    os.environ["INFERENCE_MODE"] = mode
+    os.environ["INFERENCE_SOCKET"] = socket_path
+    from core.embeddings import create_embedding_function
+    from agents.reranker import load_cross_encoder
+    embeddings = create_embedding_function()
+    cross_encoder = load_cross_encoder()
+    passages = [PASSAGE.format(n=n) for n in range(candidates)]
+    cross_encoder.predict([[QUERIES[0], passages[0]]])  # warm up before timing
+
+    start_barrier.wait()
+    started = time.perf_counter()
+    for i in range(requests):
+        query = QUERIES[i % len(QUERIES)]
+        embeddings.embed_query(query)
+        cross_encoder.predict([[query, passage] for passage in passages])
+    return time.perf_counter() - started, rss_mb(os.getpid())
+
+def start_server(socket_path: str, args):
+    env = dict(os.environ, INFERENCE_MODE="local", INFERENCE_SOCKET=socket_path,
+               INFERENCE_MAX_BATCH=str(args.max_batch), INFERENCE_MAX_WAIT_MS=str(args.max_wait_ms))
+    process = subprocess.Popen([sys.executable, "-m", "core.inference_server"], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 300  # the server loads both models before listening
+    while not os.path.exists(socket_path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise SystemExit("Inference server did not start")
+        time.sleep(0.5)
+    return process
+
+def run(mode: str, workers: int, args) -> str:
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="inference_bench_"), "inference.sock")
+    server = start_server(socket_path, args) if mode == "sidecar" else None
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Manager().Barrier(workers)
+    try:
+        with context.Pool(workers) as pool:
+            results = pool.starmap(worker, [(mode, socket_path, args.requests, args.candidates, barrier)
+                                            for _ in range(workers)])
+        server_rss = rss_mb(server.pid) if server is not None else 0.0
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    elapsed = max(seconds for seconds, _ in results)
+    workers_rss = sum(rss for _, rss in results)
+    return (f"{mode:>8} {workers:>7} {workers * args.requests / elapsed:>10.1f} "
+            f"{workers_rss:>11,.0f} {server_rss:>10,.0f} {workers_rss + server_rss:>10,.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,4,8")
+    parser.add_argument("--modes", default="local,sidecar")
+    parser.add_argument("--requests", type=int, default=50, help="Queries per worker")
+    parser.add_argument("--candidates", type=int, default=20, help="Passages reranked per query")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'workers':>7} {'req/sec':>10} {'workers MB':>11} {'server MB':>10} {'total MB':>10}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        for mode in args.modes.split(","):
+            print(run(mode, workers, args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Latency and availability of LLM calls through the gateway when the primary provider
+is healthy, slow, flaky or down.
+
+Usage (from the repository root):
+    python -m benchmarks.llm_gateway
+    python -m benchmarks.llm_gateway --requests 200 --concurrency 16 --hedge-after-s 0.5
+
+Runs offline against fake providers (benchmarks/fake_llm.py, with injected latency and
+errors): a fast primary and a slower local fallback. Every scenario gets a fresh
+LLMGateway, so circuit-breaker state does not carry over. It reports answered and
+failed requests (LLMUnavailableError), p50/p95/max latency, the share answered by
+the fallback, hedged calls and primary calls including retries.
+
+It also checks the gateway's guarantees and exits non-zero if one is broken: no
+request waits longer than --timeout-s, and no provider ever sees more concurrent
+calls than its limit. The "hung" scenario, a primary that never answers within the
+deadline, is the case these guarantees exist for.
+"""
+import argparse
+import logging
+import sys
+import threading
+import time
+import numpy as np
+from core.config import config
+from core.llm import SYSTEM_PROMPT
+from benchmarks.fake_llm import FakeProvider
+from core.llm_gateway import LLMGateway, LLMUnavailableError
+from core.resources import LazyResource
+
+# name: (primary latency ms, primary error rate, fallback latency ms, fallback error rate)
+SCENARIOS = {
+    "healthy": (200, 0.0, 600, 0.0),
+    "slow": (3000, 0.0, 600, 0.0),
+    "flaky": (200, 0.3, 600, 0.0),
+    "down": (50, 1.0, 600, 0.0),
+    "hung": (10000, 0.0, 50, 0.0),
+    "all down": (50, 1.0, 50, 1.0),
+}
+
+def run(gateway, requests: int, concurrency: int):
+    latencies, failures = [], 0
+    lock = threading.Lock()
+
+    def client(count):
+        nonlocal failures
+        for i in range(count):
+            started = time.perf_counter()
+            try:
+                gateway.generate(SYSTEM_PROMPT, f"Question:\nWhat is the repo rate? ({i})\n\nAnswer:")
+            except LLMUnavailableError:
+                with lock:
+                    failures += 1
+                continue
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=client, args=(len(range(i, requests, concurrency)),))
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--hedge-after-s", type=float, default=1.0)
+    parser.add_argument("--attempt-timeout-s", type=float, default=2.0)
+    parser.add_argument("--timeout-s", type=float, default=6.0)
+    parser.add_argument("--fallback-concurrency", type=int, default=config.LLM_FALLBACK_MAX_CONCURRENCY)
+    args = parser.parse_args()
+
+    logging.getLogger("core.llm_gateway").setLevel(logging.ERROR)  # injected failures are expected
+    config.LLM_HEDGE_AFTER_S = args.hedge_after_s
+    config.LLM_ATTEMPT_TIMEOUT_S = args.attempt_timeout_s
+    config.LLM_TIMEOUT_S = args.timeout_s
+    config.LLM_RETRY_BASE_MS = 50
+    config.LLM_FALLBACK_MAX_CONCURRENCY = args.fallback_concurrency
+
+    print(f"{'scenario':>10} {'answered':>8} {'failed':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} "
+          f"{'fallback':>8} {'hedged':>6} {'primary calls':>13}")
+    violations = []
+    for name, (latency, errors, fallback_latency, fallback_errors) in SCENARIOS.items():
+        primary = LazyResource(f"benchmark-primary-{name}", lambda: FakeProvider(latency_ms=latency, error_rate=errors))
+        fallback = LazyResource(f"benchmark-fallback-{name}",
+                                lambda: FakeProvider(latency_ms=fallback_latency, error_rate=fallback_errors, seed=1))
+        gateway = LLMGateway(primary, fallback)
+        latencies, failures = run(gateway, args.requests, args.concurrency)
+        stats = gateway.stats()
+        answered_by_fallback = stats["providers"][fallback.name]["answered"]
+        percentiles = np.percentile(latencies, [50, 95, 100]) if latencies else [np.nan] * 3
+        print(f"{name:>10} {len(latencies):>8} {failures:>6} {percentiles[0]:>8.0f} {percentiles[1]:>8.0f} "
+              f"{percentiles[2]:>8.0f} {answered_by_fallback / max(len(latencies), 1):>8.0%} "
+              f"{stats['hedged']:>6} {stats['providers'][primary.name]['calls']:>13}")
+
+        if latencies and max(latencies) > args.timeout_s * 1000 + 250:
+            violations.append(f"{name}: a request took {max(latencies):.0f}ms, over the {args.timeout_s}s deadline")
+        for resource, limit in ((primary, config.LLM_MAX_CONCURRENCY), (fallback, args.fallback_concurrency)):
+            if resource.loaded and resource.value.peak_active > limit:
+                violations.append(f"{name}: {resource.name} had {resource.value.peak_active} calls in flight, limit {limit}")
+
+    for violation in violations:
+        print(f"FAILED {violation}")
+    if violations:
+        sys.exit(1)
+    print("Deadline and concurrency limits held")
+
+if __name__ == "__main__":
+    main()
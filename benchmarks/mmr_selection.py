@@ -0,0 +1,74 @@
+"""
+Cross-encoder work and source diversity with and without MMR candidate selection.
+
+Usage (from the repository root, needs indexed chunks):
+    python -m benchmarks.mmr_selection --top-k 5
+    python -m benchmarks.mmr_selection --mmr-top-k 8,12,16 --lambdas 0.5,0.7
+
+For every labelled finance question it retrieves candidates once (MMR off), then
+reranks either all of them or only the MMR selection. It reports cross-encoder pairs
+and latency per query, the number of distinct source pages in the final top-k, and
+how many of the full-rerank top-k the MMR path still returns.
+"""
+import argparse
+import time
+import numpy as np
+from core.config import config
+from agents.retrieval import retrieval_agent
+from agents.reranker import reranker_agent
+from benchmarks.category_routing import LABELLED_QUERIES
+
+def sources(docs):
+    return len({doc.metadata.get("source", doc.id) for doc in docs})
+
+def rerank_timed(query, docs, top_k):
+    started = time.perf_counter()
+    result = reranker_agent.rerank(query, docs, top_k)
+    return result, (time.perf_counter() - started) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=5, help="Chunks kept by the reranker")
+    parser.add_argument("--mmr-top-k", default=str(config.MMR_TOP_K))
+    parser.add_argument("--lambdas", default=str(config.MMR_LAMBDA))
+    parser.add_argument("--max-per-source", type=int, default=config.MMR_MAX_PER_SOURCE)
+    args = parser.parse_args()
+
+    config.MMR_ENABLED = False
+    queries = [q for qs in LABELLED_QUERIES.values() for q in qs]
+    candidates = {q: retrieval_agent.retrieve(q) for q in queries}
+    if not any(candidates.values()):
+        raise SystemExit("No chunks retrieved; index some documents first.")
+    reranker_agent.rerank(queries[0], candidates[queries[0]][:2])  # load the model before timing
+
+    baseline = {}
+    pairs, latency, diversity = [], [], []
+    for q in queries:
+        baseline[q], ms = rerank_timed(q, candidates[q], args.top_k)
+        pairs.append(len(candidates[q]))
+        latency.append(ms)
+        diversity.append(sources(baseline[q]))
+
+    print(f"{'variant':>18} {'pairs/query':>12} {'rerank ms p50':>14} {'sources@k':>10} {'overlap@k':>10}")
+    print(f"{'full rerank':>18} {np.mean(pairs):>12.1f} {np.median(latency):>14.1f} "
+          f"{np.mean(diversity):>10.2f} {1.0:>10.2f}")
+
+    config.MMR_MAX_PER_SOURCE = args.max_per_source
+    for mmr_top_k in (int(v) for v in args.mmr_top_k.split(",")):
+        for lambda_mult in (float(v) for v in args.lambdas.split(",")):
+            config.MMR_TOP_K, config.MMR_LAMBDA = mmr_top_k, lambda_mult
+            pairs, latency, diversity, overlap = [], [], [], []
+            for q in queries:
+                selected = retrieval_agent.diversify(q, candidates[q])
+                reranked, ms = rerank_timed(q, selected, args.top_k)
+                pairs.append(len(selected))
+                latency.append(ms)
+                diversity.append(sources(reranked))
+                expected = {doc.id for doc in baseline[q]}
+                overlap.append(len(expected & {doc.id for doc in reranked}) / max(len(expected), 1))
+            label = f"mmr k={mmr_top_k} l={lambda_mult}"
+            print(f"{label:>18} {np.mean(pairs):>12.1f} {np.median(latency):>14.1f} "
+                  f"{np.mean(diversity):>10.2f} {np.mean(overlap):>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Prefill work and latency of answer generation with and without prompt-prefix caching.
+
+Usage (from the repository root):
+    python -m benchmarks.prefix_cache --requests 50
+    python -m benchmarks.prefix_cache --provider gemini --requests 5
+
+Sends --requests answer prompts (static system prompt + a varying context and
+question) through a provider twice, with LLM_PREFIX_CACHE off and on. The default
+"fake" provider runs offline: it counts prefill tokens and simulates
+--prefill-ms-per-token of latency. Real providers report latency and, where the API
+returns them, input and cached token counts.
+"""
+import argparse
+import time
+import numpy as np
+from core.config import config
+from core.llm import SYSTEM_PROMPT, create_provider
+from benchmarks.fake_llm import FakeProvider
+from agents.answering import answering_agent
+from benchmarks.category_routing import LABELLED_QUERIES
+
+CONTEXT = ("Source: RBI Monetary Policy\nContent: The Reserve Bank of India kept the policy repo rate "
+           "unchanged at 6.50 per cent and retained its stance of withdrawal of accommodation. ")
+
+def prompts(count: int):
+    queries = [q for qs in LABELLED_QUERIES.values() for q in qs]
+    return [answering_agent.prompt_template.format(context=CONTEXT * (1 + i % 3), question=queries[i % len(queries)])
+            for i in range(count)]
+
+def run(provider, requests):
+    latencies, input_tokens, cached_tokens, prefill_tokens = [], [], [], []
+    for prompt in requests:
+        started = time.perf_counter()
+        _, usage = provider.generate(SYSTEM_PROMPT, prompt)
+        latencies.append((time.perf_counter() - started) * 1000)
+        input_tokens.append(usage.get("llm_input_tokens") or 0)
+        cached_tokens.append(usage.get("llm_cached_tokens") or 0)
+        prefill_tokens.append(usage.get("llm_prefill_tokens", np.nan))
+    return latencies, input_tokens, cached_tokens, prefill_tokens
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", default="fake")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.2, help="Simulated cost (fake provider)")
+    args = parser.parse_args()
+
+    requests = prompts(args.requests)
+    print(f"{'prefix cache':>12} {'p50 ms':>8} {'p95 ms':>8} {'input tok':>10} {'cached tok':>11} {'prefill tok':>12}")
+    for enabled in (False, True):
+        config.LLM_PREFIX_CACHE = enabled
+        if args.provider == "fake":
+            provider = FakeProvider(prefix_cache=enabled, prefill_ms_per_token=args.prefill_ms_per_token)
+        else:
+            provider = create_provider(args.provider)
+        latencies, input_tokens, cached_tokens, prefill_tokens = run(provider, requests)
+        print(f"{'on' if enabled else 'off':>12} {np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 95):>8.1f} "
+              f"{np.mean(input_tokens):>10.0f} {np.mean(cached_tokens):>11.0f} {np.nanmean(prefill_tokens):>12.0f}")
+
+if __name__ == "__main__":
+    main()
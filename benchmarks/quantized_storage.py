@@ -0,0 +1,67 @@
+"""
+Recall/memory trade-off report for the quantized vector storage modes.
+
+Usage (from the repository root):
+    python -m benchmarks.quantized_storage --size 100000
+    python -m benchmarks.quantized_storage --corpus recorded --size 50000 --rescore 1,4,8
+
+For each storage dtype, reduction and re-scoring factor it reports recall@k against
+exact float32 search, the bytes scanned per query (codes) versus the float32 baseline,
+and query latency.
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+from core.quantized_store import QuantizedSegmentStore
+from benchmarks.ann_recall import synthetic_corpus, recorded_corpus, exact_top_k
+from core.vector_index import normalize_rows
+
+CONFIGS = [
+    ("float16", "none"),
+    ("int8", "none"),
+    ("float16", "pca"),
+    ("int8", "pca"),
+    ("int8", "matryoshka"),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", choices=["synthetic", "recorded"], default="synthetic")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--reduced-dim", type=int, default=128)
+    parser.add_argument("--rescore", default="1,4", help="Comma-separated re-scoring factors")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    corpus = synthetic_corpus(args.size, args.dim, rng) if args.corpus == "synthetic" else recorded_corpus(args.size, rng)
+    queries = normalize_rows(corpus[rng.integers(0, len(corpus), args.queries)]
+                             + 0.1 * rng.standard_normal((args.queries, corpus.shape[1])).astype(np.float32))
+    truth = exact_top_k(corpus, queries, args.k)
+    ids = [str(i) for i in range(len(corpus))]
+    baseline_bytes = corpus.astype(np.float32).nbytes
+
+    print(f"{len(corpus):,} vectors x {corpus.shape[1]} dims, float32 baseline {baseline_bytes / 1e6:,.1f} MB")
+    print(f"{'dtype':>8} {'reduction':>10} {'rescore':>7} {'recall@' + str(args.k):>9} {'scan MB':>8} {'ratio':>6} {'p50 ms':>7}")
+
+    for dtype, reduction in CONFIGS:
+        for factor in (int(x) for x in args.rescore.split(",")):
+            store = QuantizedSegmentStore(tempfile.mkdtemp(prefix="quant_bench_"), dtype=dtype, reduction=reduction,
+                                          reduced_dim=args.reduced_dim, rescore_factor=factor)
+            store.upsert(ids, corpus)
+            latencies, hits = [], 0
+            for query, expected in zip(queries, truth):
+                t0 = time.perf_counter()
+                result = store.search(query, args.k)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                hits += len({int(doc_id) for doc_id, _ in result} & set(expected.tolist()))
+            code_bytes = store.memory_report()["code_bytes"]
+            print(f"{dtype:>8} {reduction:>10} {factor:>7} {hits / truth.size:>9.4f} {code_bytes / 1e6:>8.1f} "
+                  f"{baseline_bytes / code_bytes:>5.1f}x {np.percentile(latencies, 50):>7.2f}")
+            store.destroy()
+
+if __name__ == "__main__":
+    main()
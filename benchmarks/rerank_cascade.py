@@ -0,0 +1,84 @@
+"""
+Quality/latency sweep of the cascade reranker against scoring every candidate.
+
+Usage (from the repository root, needs indexed chunks):
+    python -m benchmarks.rerank_cascade
+    python -m benchmarks.rerank_cascade --first-stages cosine,lexical --first-stage-k 6,10,16 \\
+        --batches 0,4 --min-scores -3,0 --gaps 2,4,8
+
+Candidates are retrieved once per labelled finance question. The reference is the
+cross-encoder's top-k over all of them. Each cascade setting reports cross-encoder
+pairs and rerank latency per query, how often it stopped early, the mean number of
+chunks returned, whether its first chunk is the reference first chunk (hit@1), and how
+many of the reference top-3 it returns (recall@3). The score cache is disabled.
+"""
+import os
+os.environ["RERANK_CACHE_SIZE"] = "0"
+os.environ["RERANK_CACHE_DB"] = ""
+
+import argparse
+import itertools
+import time
+import numpy as np
+from core.config import config
+from agents.retrieval import retrieval_agent
+from agents.reranker import reranker_agent
+from benchmarks.category_routing import LABELLED_QUERIES
+
+def floats(text: str):
+    return [float(v) for v in text.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--first-stages", default=config.RERANK_FIRST_STAGE)
+    parser.add_argument("--first-stage-k", default=str(config.RERANK_FIRST_STAGE_K))
+    parser.add_argument("--batches", default=str(config.RERANK_BATCH))
+    parser.add_argument("--min-scores", default=str(config.RERANK_MIN_SCORE))
+    parser.add_argument("--gaps", default=str(config.RERANK_SCORE_GAP))
+    args = parser.parse_args()
+
+    queries = [q for qs in LABELLED_QUERIES.values() for q in qs]
+    candidates = {q: retrieval_agent.retrieve(q) for q in queries}
+    if not any(candidates.values()):
+        raise SystemExit("No chunks retrieved; index some documents first.")
+
+    config.RERANK_CASCADE = False
+    reranker_agent.rerank(queries[0], candidates[queries[0]][:2])  # load the model before timing
+    reference, latency = {}, []
+    for q in queries:
+        started = time.perf_counter()
+        reference[q] = [doc.id for doc in reranker_agent.rerank(q, candidates[q], args.top_k)]
+        latency.append((time.perf_counter() - started) * 1000)
+    pairs = np.mean([len(c) for c in candidates.values()])
+
+    print(f"{'first stage':>12} {'k1':>4} {'batch':>5} {'min':>6} {'gap':>5} {'pairs':>6} {'ms p50':>7} "
+          f"{'early':>6} {'mean k':>7} {'hit@1':>6} {'rec@3':>6}")
+    print(f"{'full':>12} {'-':>4} {'-':>5} {'-':>6} {'-':>5} {pairs:>6.1f} {np.median(latency):>7.1f} "
+          f"{0.0:>6.2f} {args.top_k:>7.2f} {1.0:>6.2f} {1.0:>6.2f}")
+
+    grid = itertools.product(args.first_stages.split(","), [int(v) for v in args.first_stage_k.split(",")],
+                             [int(v) for v in args.batches.split(",")], floats(args.min_scores), floats(args.gaps))
+    for first_stage, first_stage_k, batch, min_score, gap in grid:
+        config.RERANK_FIRST_STAGE, config.RERANK_FIRST_STAGE_K, config.RERANK_BATCH = first_stage, first_stage_k, batch
+        config.RERANK_MIN_SCORE, config.RERANK_SCORE_GAP = min_score, gap
+        pairs, latency, early, ks, hits, recall = [], [], [], [], [], []
+        for q in queries:
+            if not candidates[q]:
+                continue
+            started = time.perf_counter()
+            docs, info = reranker_agent.cascade(q, candidates[q], args.top_k)
+            latency.append((time.perf_counter() - started) * 1000)
+            ids = [doc.id for doc in docs]
+            pairs.append(info["pairs"])
+            early.append(info["early_exit"])
+            ks.append(info["k"])
+            hits.append(bool(ids) and ids[0] == reference[q][0])
+            top3 = reference[q][:3]
+            recall.append(len(set(top3) & set(ids)) / len(top3))
+        print(f"{first_stage:>12} {first_stage_k:>4} {batch:>5} {min_score:>6.1f} {gap:>5.1f} {np.mean(pairs):>6.1f} "
+              f"{np.median(latency):>7.1f} {np.mean(early):>6.2f} {np.mean(ks):>7.2f} "
+              f"{np.mean(hits):>6.2f} {np.mean(recall):>6.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Throughput versus latency of cross-encoder reranking under concurrent requests,
+with and without micro-batching.
+
+Usage (from the repository root):
+    python -m benchmarks.rerank_micro_batching
+    python -m benchmarks.rerank_micro_batching --concurrency 1,4,16 --wait-ms 1,3,10 --pairs 10
+
+Each simulated request reranks --pairs passages of varying length for one query, as
+RerankerAgent does after the cascade's first stage. "direct" calls CrossEncoder.predict
+from every request thread; "batched" goes through MicroBatchedCrossEncoder with the
+given wait window. It reports requests/sec, p50/p95 request latency and the mean
+number of pairs per model call.
+"""
+import argparse
+import threading
+import time
+import numpy as np
+from core.batching import MicroBatchedCrossEncoder
+from agents.reranker import load_cross_encoder
+from benchmarks.category_routing import LABELLED_QUERIES
+
+PASSAGE = ("The Reserve Bank of India kept the policy repo rate at 6.5 per cent. " * 8)
+
+def make_requests(count: int, pairs: int):
+    rng = np.random.default_rng(0)
+    queries = [q for qs in LABELLED_QUERIES.values() for q in qs]
+    return [
+        [(queries[i % len(queries)], PASSAGE[:int(rng.integers(120, len(PASSAGE)))]) for _ in range(pairs)]
+        for i in range(count)
+    ]
+
+def run(model, concurrency: int, requests):
+    latencies = []
+    lock = threading.Lock()
+    per_thread = [requests[i::concurrency] for i in range(concurrency)]
+
+    def client(batch):
+        for pairs in batch:
+            started = time.perf_counter()
+            model.predict(pairs)
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=client, args=(batch,)) for batch in per_thread]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return len(requests) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,2,4,8,16")
+    parser.add_argument("--wait-ms", default="1,3,10")
+    parser.add_argument("--pairs", type=int, default=10, help="Pairs per request")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per run")
+    parser.add_argument("--max-batch", type=int, default=128)
+    args = parser.parse_args()
+
+    model = load_cross_encoder()
+    if model is None:
+        raise SystemExit("Cross-encoder could not be loaded")
+    requests = make_requests(args.requests, args.pairs)
+    model.predict(requests[0])  # warm up
+
+    print(f"{'mode':>14} {'threads':>7} {'req/sec':>8} {'p50 ms':>8} {'p95 ms':>8} {'pairs/call':>10}")
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        rate, p50, p95 = run(model, concurrency, requests)
+        print(f"{'direct':>14} {concurrency:>7} {rate:>8.1f} {p50:>8.1f} {p95:>8.1f} {args.pairs:>10.1f}")
+        for wait_ms in (float(w) for w in args.wait_ms.split(",")):
+            batched = MicroBatchedCrossEncoder(model, args.max_batch, wait_ms)
+            rate, p50, p95 = run(batched, concurrency, requests)
+            print(f"{f'batched {wait_ms:g}ms':>14} {concurrency:>7} {rate:>8.1f} {p50:>8.1f} {p95:>8.1f} "
+                  f"{batched.stats()['mean_batch_size']:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Score-parity check and pairs/sec benchmark for the reranker backends.
+
+Usage (from the repository root):
+    python -m benchmarks.reranker_backends --pairs 2000
+
+Scores the same (query, chunk) pairs with the PyTorch CrossEncoder and the ONNX
+backend, both truncated to RERANKER_MAX_LENGTH tokens, and reports pairs/sec for
+each. Parity is measured per query: Spearman correlation of the two score lists and
+overlap of their top-5. Exits non-zero if the mean correlation falls below
+--min-spearman, or if the ONNX backend did not load (the production loader silently
+falls back to PyTorch, which would make the comparison trivial).
+"""
+import argparse
+import sys
+import time
+import numpy as np
+from core.config import config
+from agents.reranker import load_cross_encoder
+from core.onnx_models import OnnxCrossEncoder
+from benchmarks.category_routing import LABELLED_QUERIES
+from benchmarks.embedding_backends import load_corpus
+
+def measure(model, pairs):
+    model.predict(pairs[:8])  # warm-up
+    start = time.perf_counter()
+    scores = np.asarray(model.predict(pairs), dtype=np.float32)
+    return scores, len(pairs) / (time.perf_counter() - start)
+
+def ranks(values):
+    return np.argsort(np.argsort(values))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=1000, help="Number of (query, chunk) pairs to score")
+    parser.add_argument("--min-spearman", type=float, default=0.95, help="Parity threshold (mean per query)")
+    args = parser.parse_args()
+
+    config.INFERENCE_MODE = "local"
+    queries = [q for qs in LABELLED_QUERIES.values() for q in qs]
+    per_query = max(args.pairs // len(queries), 2)
+    texts = load_corpus(per_query * 4)
+    rng = np.random.default_rng(0)
+    pairs = [(q, texts[i]) for q in queries for i in rng.choice(len(texts), min(per_query, len(texts)), replace=False)]
+    print(f"Pairs: {len(pairs)} ({len(queries)} queries), max length {config.RERANKER_MAX_LENGTH} tokens")
+
+    onnx = load_cross_encoder("onnx")
+    if not isinstance(onnx, OnnxCrossEncoder):
+        print(f"ONNX backend did not load (got {type(onnx).__name__}, see the warning above); nothing to compare")
+        sys.exit(1)
+    pytorch = load_cross_encoder("pytorch")
+    if pytorch is None:
+        print("PyTorch CrossEncoder did not load (see the warning above); nothing to compare against")
+        sys.exit(1)
+    reference, reference_rate = measure(pytorch, pairs)
+    candidate, candidate_rate = measure(onnx, pairs)
+
+    spearman, overlap = [], []
+    for start in range(0, len(pairs), per_query):
+        ref, cand = reference[start:start + per_query], candidate[start:start + per_query]
+        spearman.append(np.corrcoef(ranks(ref), ranks(cand))[0, 1])
+        k = min(5, len(ref))
+        overlap.append(len(set(np.argsort(-ref)[:k]) & set(np.argsort(-cand)[:k])) / k)
+
+    print(f"pytorch: {reference_rate:8.1f} pairs/sec")
+    print(f"onnx:    {candidate_rate:8.1f} pairs/sec  ({candidate_rate / reference_rate:.2f}x)")
+    print(f"score difference: mean={np.abs(reference - candidate).mean():.4f} max={np.abs(reference - candidate).max():.4f}")
+    print(f"per-query Spearman: mean={np.mean(spearman):.4f} min={np.min(spearman):.4f}")
+    print(f"top-5 overlap: {np.mean(overlap):.3f}")
+
+    if np.mean(spearman) < args.min_spearman:
+        print(f"PARITY FAILED: mean Spearman {np.mean(spearman):.4f} < {args.min_spearman}")
+        sys.exit(1)
+    print("Parity OK")
+
+if __name__ == "__main__":
+    main()
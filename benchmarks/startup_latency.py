@@ -0,0 +1,65 @@
+"""
+Import time and first-request latency of the API, with and without the start-up warm-up.
+
+Usage (from the repository root):
+    python -m benchmarks.startup_latency
+    python -m benchmarks.startup_latency --runs 3 --query "What is the current repo rate?"
+
+Every run uses a fresh interpreter. It times `import api.main`, then the retrieval
+path of a query (embedding, vector and BM25 search, reranking; no LLM call) twice:
+"cold" loads models on demand inside the first request, "warm" runs the warm-up
+first, as the API does on start-up, and reports how long it took.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import numpy as np
+
+PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+import api.main
+from agents.retrieval import retrieval_agent
+from agents.reranker import reranker_agent
+from core.resources import warm_up, RESOURCES
+result = {"import": time.perf_counter() - started}
+
+if sys.argv[1] == "warm":
+    t0 = time.perf_counter()
+    warm_up.run()
+    result["warm_up"] = time.perf_counter() - t0
+
+query = sys.argv[2]
+for name in ("first_request", "second_request"):
+    t0 = time.perf_counter()
+    reranker_agent.rerank(query, retrieval_agent.retrieve(query))
+    result[name] = time.perf_counter() - t0
+result["loads"] = {name: r.seconds for name, r in RESOURCES.items() if r.seconds is not None}
+print("RESULT " + json.dumps(result))
+"""
+
+def probe(mode: str, query: str) -> dict:
+    output = subprocess.run([sys.executable, "-c", PROBE, mode, query], capture_output=True, text=True)
+    for line in output.stdout.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    raise SystemExit(f"Probe failed:\n{output.stderr[-2000:]}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--query", default="What are the latest RBI guidelines on digital lending?")
+    args = parser.parse_args()
+
+    print(f"{'mode':>5} {'import s':>9} {'warm-up s':>10} {'1st req s':>10} {'2nd req s':>10}")
+    for mode in ("cold", "warm"):
+        runs = [probe(mode, args.query) for _ in range(args.runs)]
+        median = {key: np.median([run.get(key, 0.0) for run in runs])
+                  for key in ("import", "warm_up", "first_request", "second_request")}
+        print(f"{mode:>5} {median['import']:>9.2f} {median['warm_up']:>10.2f} "
+              f"{median['first_request']:>10.2f} {median['second_request']:>10.2f}")
+        print("      loads: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in runs[-1]["loads"].items()))
+
+if __name__ == "__main__":
+    main()
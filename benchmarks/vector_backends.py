@@ -0,0 +1,137 @@
+"""
+Conformance checks and performance comparison for the vector store backends.
+
+Usage (from the repository root):
+    python -m benchmarks.vector_backends --size 50000
+    python -m benchmarks.vector_backends --backends chroma,numpy,faiss --corpus recorded --size 100000
+
+Part 1 runs the same small scenario against every backend (upsert/replace, metadata
+updates, filtered get/search/delete, compaction, and reopening from disk) and prints
+PASS/FAIL per check. Part 2 loads the same corpus into each backend and reports bulk
+insert throughput, query latency percentiles and recall@k against exact search.
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+from core.vector_backends import ChromaEngine, NumpyEngine
+from core.vector_index import normalize_rows
+from benchmarks.ann_recall import synthetic_corpus, recorded_corpus, exact_top_k
+
+BATCH = 5000
+
+def open_engine(kind: str, path: str):
+    if kind == "chroma":
+        return ChromaEngine(path)
+    return NumpyEngine(path, use_faiss=kind == "faiss")
+
+def reopen(kind: str, engine, path: str):
+    if isinstance(engine, NumpyEngine):
+        engine.snapshot_all()
+    return open_engine(kind, path)
+
+def conformance(kind: str, dim: int, rng) -> bool:
+    path = tempfile.mkdtemp(prefix=f"conformance_{kind}_")
+    engine = open_engine(kind, path)
+    collection = engine.open("finance_rag")
+    vectors = normalize_rows(rng.standard_normal((50, dim)).astype(np.float32))
+    ids = [f"c{i}" for i in range(50)]
+    metadatas = [{"source_type": "news" if i % 2 else "web", "scraped_at": 1000 + i} for i in range(50)]
+    results = []
+
+    def check(name, condition):
+        results.append(bool(condition))
+        print(f"  [{'PASS' if condition else 'FAIL'}] {name}")
+
+    collection.upsert(ids, [f"text {i}" for i in ids], metadatas, vectors)
+    check("count after upsert", collection.count() == 50)
+
+    hits = collection.search(vectors[:3], 5)
+    check("self is the top hit", [h[0][0].id for h in hits] == ids[:3] and all(abs(h[0][1] - 1) < 1e-3 for h in hits))
+    check("top-k length", all(len(h) == 5 for h in hits))
+
+    collection.upsert(["c0"], ["replaced"], [{"source_type": "web", "scraped_at": 1}], vectors[:1])
+    page = collection.get(ids=["c0"])
+    check("upsert replaces by id", collection.count() == 50 and page["documents"] == ["replaced"])
+
+    collection.update_metadata(["c1", "missing"], [{"last_retrieved_at": 5}, {"last_retrieved_at": 5}])
+    metadata = collection.get(ids=["c1"])["metadatas"][0]
+    check("metadata update merges", metadata.get("last_retrieved_at") == 5 and metadata.get("source_type") == "news")
+
+    news = collection.get(where={"source_type": "news"})
+    check("filtered get", len(news["ids"]) == 25)
+    hits = collection.search(vectors[:1], 10, where={"source_type": "news"})[0]
+    check("filtered search", hits and all(doc.metadata["source_type"] == "news" for doc, _ in hits))
+
+    page = collection.get(limit=20, offset=40, include_embeddings=True)
+    check("paged get with embeddings", len(page["ids"]) == 10 and len(page["embeddings"][0]) == dim)
+
+    collection.delete(ids=["c2", "c3"])
+    collection.delete(where={"scraped_at": {"$gte": 1045}})
+    remaining = set(collection.get()["ids"])
+    check("delete by id and filter", collection.count() == 43 and not {"c2", "c3", "c49"} & remaining)
+    check("deleted ids not searchable", "c2" not in {doc.id for doc, _ in collection.search(vectors[2:3], 50)[0]})
+
+    check("compaction keeps live chunks", collection.compact() == 43 and engine.open("finance_rag").count() == 43)
+
+    engine.open("finance_rag__2024_01").upsert(["p"], ["partition"], [{}], vectors[:1])
+    engine = reopen(kind, engine, path)
+    check("persisted across reopen", engine.open("finance_rag").count() == 43
+          and set(engine.list_collections()) >= {"finance_rag", "finance_rag__2024_01"})
+    engine.drop("finance_rag__2024_01")
+    check("drop collection", "finance_rag__2024_01" not in engine.list_collections())
+    return all(results)
+
+def performance(kind: str, corpus: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int):
+    collection = open_engine(kind, tempfile.mkdtemp(prefix=f"backend_bench_{kind}_")).open("bench")
+    ids = [str(i) for i in range(len(corpus))]
+
+    t0 = time.perf_counter()
+    for start in range(0, len(corpus), BATCH):
+        rows = slice(start, start + BATCH)
+        collection.upsert(ids[rows], [""] * len(ids[rows]), [{"n": i} for i in range(start, start + len(ids[rows]))],
+                          corpus[rows].tolist() if kind == "chroma" else corpus[rows])
+    build = time.perf_counter() - t0
+
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        result = collection.search([query], k)[0]
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits += len({int(doc.id) for doc, _ in result} & set(expected.tolist()))
+    p50, p95 = np.percentile(latencies, [50, 95])
+    print(f"{kind:>7} {len(corpus) / build:>12,.0f} {p50:>8.2f} {p95:>8.2f} {hits / truth.size:>9.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="chroma,numpy", help="Comma-separated: chroma, numpy, faiss")
+    parser.add_argument("--corpus", choices=["synthetic", "recorded"], default="synthetic")
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+    backends = args.backends.split(",")
+
+    rng = np.random.default_rng(7)
+    print("Conformance")
+    failed = []
+    for kind in backends:
+        print(f" {kind}")
+        if not conformance(kind, args.dim, rng):
+            failed.append(kind)
+
+    corpus = synthetic_corpus(args.size, args.dim, rng) if args.corpus == "synthetic" else recorded_corpus(args.size, rng)
+    queries = normalize_rows(corpus[rng.integers(0, len(corpus), args.queries)]
+                             + 0.1 * rng.standard_normal((args.queries, corpus.shape[1])).astype(np.float32))
+    truth = exact_top_k(corpus, queries, args.k)
+    print(f"\n{len(corpus):,} vectors x {corpus.shape[1]} dims")
+    print(f"{'backend':>7} {'inserts/sec':>12} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(args.k):>9}")
+    for kind in backends:
+        performance(kind, corpus, queries, truth, args.k)
+
+    if failed:
+        raise SystemExit(f"Conformance failures: {', '.join(failed)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+from concurrent.futures import Future
+from typing import Callable
+import numpy as np
+import threading
+import logging
+import queue
+import time
+
+logger = logging.getLogger(__name__)
+
+class DynamicBatcher:
+    """
+    Merges items submitted concurrently from many threads into one model call.
+
+    The first waiting request opens a batch; requests arriving within max_wait_ms are
+    added until max_batch_size items are collected. process(items) must return one
+    result per item, in order, and each caller gets back the slice for its own items.
+    """
+    def __init__(self, process: Callable[[list], list], max_batch_size: int = 64, max_wait_ms: float = 5,
+                 name: str = "batcher"):
+        self.process = process
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, items: list) -> Future:
+        future = Future()
+        if not items:
+            future.set_result([])
+        else:
+            self.queue.put((list(items), future))
+        return future
+
+    def __call__(self, items: list) -> list:
+        return self.submit(items).result()
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0}
+
+    def _collect(self):
+        requests = [self.queue.get()]
+        size = len(requests[0][0])
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            requests.append(request)
+            size += len(request[0])
+        return requests
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            items = [item for request_items, _ in requests for item in request_items]
+            try:
+                results = self.process(items)
+            except Exception as e:
+                logger.error(f"Batch of {len(items)} items failed: {e}")
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(items)
+            offset = 0
+            for request_items, future in requests:
+                future.set_result(results[offset:offset + len(request_items)])
+                offset += len(request_items)
+
+def predict_length_sorted(predict: Callable, pairs: list) -> np.ndarray:
+    """
+    Calls predict() with the pairs ordered by text length, so the model's internal
+    batches pad to similar lengths, and returns the scores in the original order.
+    """
+    order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+    scores = np.asarray(predict([pairs[i] for i in order]), dtype=np.float32)
+    result = np.empty(len(pairs), dtype=np.float32)
+    result[order] = scores
+    return result
+
+class MicroBatchedCrossEncoder:
+    """
+    Wraps a cross-encoder so that concurrent predict() calls from different requests
+    are merged, within max_wait_ms, into one length-sorted batch.
+    """
+    def __init__(self, model, max_batch_size: int = 128, max_wait_ms: float = 3):
+        self.model = model
+        self.batcher = DynamicBatcher(lambda pairs: predict_length_sorted(model.predict, pairs),
+                                      max_batch_size, max_wait_ms, "rerank-micro-batcher")
+
+    def predict(self, pairs) -> np.ndarray:
+        return np.asarray(self.batcher([tuple(pair) for pair in pairs]), dtype=np.float32)
+
+    def stats(self) -> dict:
+        return self.batcher.stats()
@@ -0,0 +1,333 @@
+from core.config import config
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List
+import numpy as np
+import unicodedata
+import json
+import threading
+import hashlib
+import logging
+import sqlite3
+import time
+import re
+
+logger = logging.getLogger(__name__)
+
+def normalize_query(text: str) -> str:
+    """
+    Cache key form of a query: Unicode-normalized, case-folded, whitespace collapsed.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+def cache_key(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class MemoryCache:
+    """
+    Thread-safe LRU cache with a per-entry time to live (ttl=0 never expires).
+    """
+    def __init__(self, max_entries: int, ttl: float = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (stored_at, value)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl and time.time() - entry[0] > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, value, stored_at: float = None):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (stored_at or time.time(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class SqliteCache:
+    """
+    Key-value table in a SQLite file, shared by every worker process on the host.
+    Values are bytes; expired rows are purged every few hundred writes, and the oldest
+    rows are dropped when max_rows (0 = unlimited) is exceeded. Errors are logged and
+    treated as misses, so a locked or broken cache file never fails a request.
+    """
+    PURGE_EVERY = 256
+
+    def __init__(self, path: str, table: str, ttl: float = 0, max_rows: int = 0):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.local = threading.local()
+        self.writes = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection().execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value BLOB, stored_at REAL)"
+        )
+        self._connection().execute(f"CREATE INDEX IF NOT EXISTS {table}_stored_at ON {table} (stored_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def get(self, key: str):
+        """Returns (value, stored_at), or None when missing or expired"""
+        try:
+            row = self._connection().execute(
+                f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read from {self.path} failed: {e}")
+            return None
+        if row is None or (self.ttl and time.time() - row[1] > self.ttl):
+            return None
+        return row[0], row[1]
+
+    def put(self, key: str, value: bytes):
+        try:
+            connection = self._connection()
+            connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+            self.writes += 1
+            if self.writes % self.PURGE_EVERY == 0:
+                self.purge()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write to {self.path} failed: {e}")
+
+    def purge(self):
+        connection = self._connection()
+        if self.ttl:
+            connection.execute(f"DELETE FROM {self.table} WHERE stored_at < ?", (time.time() - self.ttl,))
+        if self.max_rows:
+            connection.execute(
+                f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} "
+                f"ORDER BY stored_at DESC LIMIT -1 OFFSET ?)", (self.max_rows,)
+            )
+
+    def clear(self):
+        self._connection().execute(f"DELETE FROM {self.table}")
+
+class TieredCache:
+    """
+    An in-process MemoryCache in front of an optional SqliteCache shared between workers.
+    encode/decode convert values to and from bytes for the shared tier.
+    """
+    def __init__(self, name: str, max_entries: int, ttl: float, db_path: str = "",
+                 encode: Callable = None, decode: Callable = None, max_rows: int = 0):
+        self.name = name
+        self.memory = MemoryCache(max_entries, ttl)
+        self.shared = SqliteCache(db_path, name, ttl, max_rows) if db_path else None
+        self.encode = encode
+        self.decode = decode
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory.max_entries > 0 or self.shared is not None
+
+    def get(self, key: str):
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.shared is not None:
+            row = self.shared.get(key)
+            if row is not None:
+                value = self.decode(row[0])
+                self.memory.put(key, value, stored_at=row[1])
+                self.shared_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value):
+        self.memory.put(key, value)
+        if self.shared is not None:
+            self.shared.put(key, self.encode(value))
+
+    def clear(self):
+        self.memory.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "entries": len(self.memory),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+        }
+
+def embedding_model_key() -> str:
+    """Identifies the vectors a query embedding cache holds; changes when the model does"""
+    backend = config.EMBEDDING_BACKEND.lower()
+    if backend == "onnx" and config.EMBEDDING_QUANTIZE:
+        backend += "-int8"
+    return f"{config.EMBEDDING_MODEL_NAME}:{backend}"
+
+def reranker_model_key() -> str:
+    """Identifies the scores a rerank cache holds: model, backend, quantization and truncation all change them"""
+    backend = config.RERANKER_BACKEND.lower()
+    if backend == "onnx" and config.RERANKER_QUANTIZE:
+        backend += "-int8"
+    return f"{config.RERANKER_MODEL_NAME}:{backend}:{config.RERANKER_MAX_LENGTH}"
+
+class QueryEmbeddingCache:
+    """
+    Embeds each distinct query once. Retrieval, routing and any other query-side
+    component call embed_query() here instead of on the embedding function, so a query
+    is embedded at most once per request and popular queries are not embedded at all.
+    Queries are matched after normalize_query(); vectors are kept as float32.
+    """
+    def __init__(self, embedding_function: Callable = None):
+        self._embedding_function = embedding_function
+        self.cache = TieredCache(
+            "query_embeddings",
+            config.QUERY_EMBEDDING_CACHE_SIZE,
+            config.QUERY_EMBEDDING_CACHE_TTL,
+            config.QUERY_EMBEDDING_CACHE_DB,
+            encode=lambda vector: np.asarray(vector, dtype=np.float32).tobytes(),
+            decode=lambda data: np.frombuffer(data, dtype=np.float32),
+        )
+
+    @property
+    def embedding_function(self):
+        if self._embedding_function is not None:
+            return self._embedding_function
+        from core.database import db_service
+        return db_service.embedding_function
+
+    def embed_query(self, query: str) -> List[float]:
+        if not self.cache.enabled:
+            return self.embedding_function.embed_query(query)
+        key = cache_key(embedding_model_key(), normalize_query(query))
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = np.asarray(self.embedding_function.embed_query(query), dtype=np.float32)
+            self.cache.put(key, vector)
+        return vector.tolist()
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+class RerankScoreCache:
+    """
+    Cross-encoder scores keyed by reranker_model_key(), normalized query and a hash of the
+    chunk text (not its id, so a chunk whose page changed is scored again). Only pairs
+    missing from the cache are sent to the model.
+    """
+    def __init__(self):
+        self.cache = TieredCache(
+            "rerank_scores",
+            config.RERANK_CACHE_SIZE,
+            config.RERANK_CACHE_TTL,
+            config.RERANK_CACHE_DB,
+            encode=lambda score: np.float32(score).tobytes(),
+            decode=lambda data: float(np.frombuffer(data, dtype=np.float32)[0]),
+            max_rows=config.RERANK_CACHE_DB_MAX_ROWS,
+        )
+        self.pairs_scored = 0
+        self.pairs_cached = 0
+
+    def score(self, query: str, texts: List[str], predict: Callable) -> np.ndarray:
+        """
+        Scores of (query, text) pairs; predict(pairs) is called once, for the uncached pairs only.
+        """
+        if not self.cache.enabled:
+            self.pairs_scored += len(texts)
+            return np.asarray(predict([[query, text] for text in texts]), dtype=np.float32)
+
+        normalized = normalize_query(query)
+        model_key = reranker_model_key()
+        keys = [cache_key(model_key, normalized, content_hash(text)) for text in texts]
+        scores = np.zeros(len(texts), dtype=np.float32)
+        missing = []
+        for i, key in enumerate(keys):
+            score = self.cache.get(key)
+            if score is None:
+                missing.append(i)
+            else:
+                scores[i] = score
+        if missing:
+            predicted = predict([[query, texts[i]] for i in missing])
+            for i, score in zip(missing, predicted):
+                scores[i] = score
+                self.cache.put(keys[i], float(score))
+        self.pairs_scored += len(missing)
+        self.pairs_cached += len(texts) - len(missing)
+        return scores
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "pairs_scored": self.pairs_scored, "pairs_cached": self.pairs_cached}
+
+class ResponseCache:
+    """
+    LLM answers, persisted in SQLite so they survive restarts. A response is keyed by
+    provider and model, a hash of the system prompt, and a fingerprint of the request:
+    by default the exact prompt, or caller-provided parts such as the answer template
+    version, the normalized question and the ordered hashes of the context chunks.
+    Every provider in core.llm runs at temperature 0, so an identical request gets an
+    equivalent answer; a provider added without it must not use this cache.
+    """
+    def __init__(self):
+        self.cache = TieredCache(
+            "llm_responses",
+            config.RESPONSE_CACHE_SIZE,
+            config.RESPONSE_CACHE_TTL,
+            config.RESPONSE_CACHE_DB,
+            encode=lambda entry: json.dumps(entry).encode("utf-8"),
+            decode=lambda data: json.loads(data.decode("utf-8")),
+            max_rows=config.RESPONSE_CACHE_DB_MAX_ROWS,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache.enabled
+
+    def key(self, system_prompt: str, fingerprint: List[str]) -> str:
+        return cache_key(f"{config.LLM_PROVIDER}/{config.LLM_MODEL}", content_hash(system_prompt), *fingerprint)
+
+    def get(self, key: str):
+        """Returns (text, usage) or None"""
+        entry = self.cache.get(key)
+        return (entry["text"], entry["usage"]) if entry is not None else None
+
+    def put(self, key: str, text: str, usage: dict):
+        self.cache.put(key, {"text": text, "usage": usage})
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+query_embedding_cache = QueryEmbeddingCache()
+rerank_score_cache = RerankScoreCache()
+response_cache = ResponseCache()
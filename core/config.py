@@ -7,24 +7,151 @@ class Config:
     CHROMA_DB_DIR = os.getenv("CHROMA_DB_DIR", "./chroma_db")
     COLLECTION_NAME = os.getenv("COLLECTION_NAME", "finance_rag")
     
+    INDEX_PARTITIONING = os.getenv("INDEX_PARTITIONING", "none")  # none or month (one collection per scrape month)
+    RECENCY_MONTHS = int(os.getenv("RECENCY_MONTHS", "3"))  # partitions searched for "latest"-style queries
+    CATEGORY_PARTITIONING = os.getenv("CATEGORY_PARTITIONING", "false").lower() == "true"  # banking/markets/taxation/corporate
+    ROUTING_MARGIN = float(os.getenv("ROUTING_MARGIN", "0.05"))  # also search the runner-up category within this margin
+    DOMAIN_GUARD = os.getenv("DOMAIN_GUARD", "false").lower() == "true"  # refuse non-finance queries before searching; calibrate first
+    DOMAIN_GUARD_MARGIN = float(os.getenv("DOMAIN_GUARD_MARGIN", "0.15"))  # refuse when off-topic wins by more than this
+    DOMAIN_GUARD_LOG = os.getenv("DOMAIN_GUARD_LOG", "")  # decisions with the raw query, one JSON line each; empty = off
+    DOMAIN_GUARD_LOG_MAX_BYTES = int(os.getenv("DOMAIN_GUARD_LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # then rotated to .1
+    
+    # HNSW Settings (space, M and construction ef only apply to new or compacted collections)
+    CHROMA_HNSW_SPACE = os.getenv("CHROMA_HNSW_SPACE", "l2")  # l2, cosine or ip
+    CHROMA_HNSW_M = int(os.getenv("CHROMA_HNSW_M", "16"))
+    CHROMA_HNSW_CONSTRUCTION_EF = int(os.getenv("CHROMA_HNSW_CONSTRUCTION_EF", "100"))
+    CHROMA_HNSW_SEARCH_EF = int(os.getenv("CHROMA_HNSW_SEARCH_EF", "100"))  # Chroma's default; 10 loses recall
+    CHROMA_HNSW_OVERRIDES = os.getenv("CHROMA_HNSW_OVERRIDES", "")  # JSON: {"collection": {"search_ef": 64}}
+    
+    # Vector Storage Settings
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")  # chroma, numpy or faiss (in-process, snapshotted to disk)
+    NUMPY_STORE_DIR = os.getenv("NUMPY_STORE_DIR", "./vector_store")
+    VECTOR_SNAPSHOT_INTERVAL = int(os.getenv("VECTOR_SNAPSHOT_INTERVAL", "30"))  # seconds between snapshots of dirty collections
+    VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "chroma")  # chroma (HNSW), float16 or int8 (memory-mapped segments)
+    VECTOR_STORAGE_DIR = os.getenv("VECTOR_STORAGE_DIR", "./vector_segments")
+    VECTOR_REDUCTION = os.getenv("VECTOR_REDUCTION", "none")  # none, pca or matryoshka
+    VECTOR_REDUCED_DIM = int(os.getenv("VECTOR_REDUCED_DIM", "128"))
+    VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))  # candidates re-scored exactly = k * factor
+    
+    # Indexing Settings
+    INDEX_ASYNC = os.getenv("INDEX_ASYNC", "true").lower() == "true"
+    INDEX_SPOOL_DIR = os.getenv("INDEX_SPOOL_DIR", "./index_spool")
+    INDEX_WRITER_BATCH_SIZE = int(os.getenv("INDEX_WRITER_BATCH_SIZE", "512"))
+    INDEX_WRITER_FLUSH_MS = int(os.getenv("INDEX_WRITER_FLUSH_MS", "200"))
+    INDEX_WRITER_MAX_RETRIES = int(os.getenv("INDEX_WRITER_MAX_RETRIES", "5"))
+    INDEX_WRITER_RETRY_S = float(os.getenv("INDEX_WRITER_RETRY_S", "30"))  # requeue delay after a batch fails every retry; doubles
+    INDEX_WRITER_MODE = os.getenv("INDEX_WRITER_MODE", "local")  # local (thread per process) or service (one indexer process)
+    INDEX_SERVICE_ADDRESS = os.getenv("INDEX_SERVICE_ADDRESS", "./indexer.sock")  # Unix socket path (owner-only) or host:port
+    INDEX_SERVICE_AUTHKEY = os.getenv("INDEX_SERVICE_AUTHKEY", "")  # required in service mode; the protocol unpickles client data
+    INDEX_GENERATION_FILE = os.getenv("INDEX_GENERATION_FILE", "./index_generation.json")
+    INDEX_REFRESH_INTERVAL_MS = int(os.getenv("INDEX_REFRESH_INTERVAL_MS", "1000"))  # how often readers check for new writes
+    
+    # Index Lifecycle Settings (retention in days, 0 = keep forever)
+    RETENTION_DAYS_NEWS = int(os.getenv("RETENTION_DAYS_NEWS", "30"))
+    RETENTION_DAYS_REGULATORY = int(os.getenv("RETENTION_DAYS_REGULATORY", "0"))
+    RETENTION_DAYS_WEB = int(os.getenv("RETENTION_DAYS_WEB", "180"))
+    INDEX_MAX_CHUNKS = int(os.getenv("INDEX_MAX_CHUNKS", "200000"))  # 0 = unlimited
+    INDEX_MAINTENANCE_INTERVAL_MINUTES = int(os.getenv("INDEX_MAINTENANCE_INTERVAL_MINUTES", "0"))  # 0 = manual only
+    
     # LLM Settings
     OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
     LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
     LLM_MODEL = os.getenv("LLM_MODEL", "gemini-flash-latest")
+    LLM_PREFIX_CACHE = os.getenv("LLM_PREFIX_CACHE", "true").lower() == "true"  # cache the static system prompt
+    LLM_PREFIX_CACHE_TTL = int(os.getenv("LLM_PREFIX_CACHE_TTL", "3600"))  # seconds (Gemini cached content)
+    LLM_PREFIX_CACHE_MIN_TOKENS = int(os.getenv("LLM_PREFIX_CACHE_MIN_TOKENS", "1024"))  # Gemini's minimum cacheable size for the model
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # keep the model and its prompt cache loaded
+    LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))  # deadline for one answer, retries and fallback included
+    LLM_ATTEMPT_TIMEOUT_S = float(os.getenv("LLM_ATTEMPT_TIMEOUT_S", "30"))  # deadline for a single call
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))  # retries per provider after a failed call
+    LLM_RETRY_BASE_MS = float(os.getenv("LLM_RETRY_BASE_MS", "500"))  # backoff is random in [0, base * 2^attempt]
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # in-flight calls to the primary provider
+    LLM_FALLBACK_PROVIDER = os.getenv("LLM_FALLBACK_PROVIDER", "")  # e.g. ollama; empty disables fallback and hedging
+    LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "llama3.2")
+    LLM_FALLBACK_MAX_CONCURRENCY = int(os.getenv("LLM_FALLBACK_MAX_CONCURRENCY", "2"))  # a local model serves few at once
+    LLM_HEDGE_AFTER_S = float(os.getenv("LLM_HEDGE_AFTER_S", "10"))  # also ask the fallback if the primary is slower; 0 = only on errors
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))  # consecutive failures before a provider is skipped
+    LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "60"))  # how long it is skipped
     
     # Embedding Settings
     EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface")  # huggingface or onnx
+    ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "./onnx_models")
+    EMBEDDING_QUANTIZE = os.getenv("EMBEDDING_QUANTIZE", "true").lower() == "true"
+    EMBEDDING_NUM_THREADS = int(os.getenv("EMBEDDING_NUM_THREADS", "0"))  # 0 = let ONNX Runtime decide
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+    EMBEDDING_MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "8192"))
+    EMBEDDING_MAX_LENGTH = int(os.getenv("EMBEDDING_MAX_LENGTH", "256"))
+    
+    # Inference Server Settings
+    INFERENCE_MODE = os.getenv("INFERENCE_MODE", "local")  # local (models in every process) or sidecar (shared inference server)
+    INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET", "./inference.sock")
+    INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "64"))  # texts or pairs merged into one forward pass
+    INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))  # how long a batch waits for more requests
+    
+    # Start-up Settings
+    WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"  # load models in the background at start-up
+    WARMUP_RETRY_S = float(os.getenv("WARMUP_RETRY_S", "5"))  # first retry of a required resource that failed to load
+    WARMUP_RETRY_MAX_S = float(os.getenv("WARMUP_RETRY_MAX_S", "60"))  # backoff cap between retries
     
     # Search Settings
     SEARCH_RESULTS_LIMIT = int(os.getenv("SEARCH_RESULTS_LIMIT", "20"))
     
+    # Retrieval Settings
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # hybrid (BM25 + vector) or dense
+    HYBRID_DEPTH = int(os.getenv("HYBRID_DEPTH", "20"))  # candidates taken from each retriever
+    HYBRID_TOP_K = int(os.getenv("HYBRID_TOP_K", "24"))  # fused candidates passed to the reranker
+    RRF_K = int(os.getenv("RRF_K", "60"))
+    PERSISTENT_TOP_K_WITH_FRESH = int(os.getenv("PERSISTENT_TOP_K_WITH_FRESH", "10"))  # store top-k when fresh chunks exist
+    LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "./lexical_index.pkl")
+    LEXICAL_SAVE_INTERVAL = int(os.getenv("LEXICAL_SAVE_INTERVAL", "30"))
+    MMR_ENABLED = os.getenv("MMR_ENABLED", "true").lower() == "true"
+    MMR_TOP_K = int(os.getenv("MMR_TOP_K", "12"))  # candidates passed on to the reranker
+    MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))  # 1 = relevance only, 0 = diversity only
+    MMR_MAX_PER_SOURCE = int(os.getenv("MMR_MAX_PER_SOURCE", "3"))  # 0 = no cap
+    
+    # Cache Settings
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))  # 0 = in-process cache off
+    QUERY_EMBEDDING_CACHE_TTL = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "86400"))  # seconds, 0 = never expire
+    QUERY_EMBEDDING_CACHE_DB = os.getenv("QUERY_EMBEDDING_CACHE_DB", "")  # SQLite file shared by workers, empty = off
+    RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "50000"))  # (query, chunk) scores per process, 0 = off
+    RERANK_CACHE_TTL = int(os.getenv("RERANK_CACHE_TTL", "86400"))
+    RERANK_CACHE_DB = os.getenv("RERANK_CACHE_DB", "")
+    RERANK_CACHE_DB_MAX_ROWS = int(os.getenv("RERANK_CACHE_DB_MAX_ROWS", "1000000"))
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))  # LLM answers per process, 0 = off
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "21600"))  # seconds; answers include news, keep it short
+    RESPONSE_CACHE_DB = os.getenv("RESPONSE_CACHE_DB", "./llm_response_cache.sqlite")  # persistent tier, empty = off
+    RESPONSE_CACHE_DB_MAX_ROWS = int(os.getenv("RESPONSE_CACHE_DB_MAX_ROWS", "100000"))
+    
     # Reranker Settings
     RERANKER_MODEL_NAME = os.getenv("RERANKER_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", "pytorch")  # pytorch or onnx
+    RERANKER_QUANTIZE = os.getenv("RERANKER_QUANTIZE", "true").lower() == "true"
+    RERANKER_NUM_THREADS = int(os.getenv("RERANKER_NUM_THREADS", "0"))  # 0 = let ONNX Runtime decide
+    RERANKER_MAX_LENGTH = int(os.getenv("RERANKER_MAX_LENGTH", "256"))  # tokens per (query, chunk) pair
+    RERANKER_BATCH_SIZE = int(os.getenv("RERANKER_BATCH_SIZE", "32"))
+    RERANKER_MAX_BATCH_TOKENS = int(os.getenv("RERANKER_MAX_BATCH_TOKENS", "8192"))
+    RERANK_CASCADE = os.getenv("RERANK_CASCADE", "true").lower() == "true"
+    RERANK_FIRST_STAGE = os.getenv("RERANK_FIRST_STAGE", "cosine")  # cosine, lexical or none
+    RERANK_FIRST_STAGE_K = int(os.getenv("RERANK_FIRST_STAGE_K", "10"))  # candidates scored by the cross-encoder
+    RERANK_BATCH = int(os.getenv("RERANK_BATCH", "4"))  # pairs per cross-encoder call, 0 = all at once (no early exit)
+    RERANK_CONFIDENT_SCORE = float(os.getenv("RERANK_CONFIDENT_SCORE", "7.0"))  # cross-encoder logit
+    RERANK_MIN_K = int(os.getenv("RERANK_MIN_K", "2"))
+    RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE", "-3.0"))
+    RERANK_SCORE_GAP = float(os.getenv("RERANK_SCORE_GAP", "4.0"))
+    RERANK_MICRO_BATCH = os.getenv("RERANK_MICRO_BATCH", "true").lower() == "true"  # merge concurrent requests' pairs
+    RERANK_MICRO_BATCH_MAX = int(os.getenv("RERANK_MICRO_BATCH_MAX", "128"))
+    RERANK_MICRO_BATCH_WAIT_MS = float(os.getenv("RERANK_MICRO_BATCH_WAIT_MS", "3"))
+    
+    # Answering Settings
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))  # retrieved context in the prompt
+    ANSWER_MODE = os.getenv("ANSWER_MODE", "single")  # single, or sections: one concurrent LLM call per answer section
     
     # MongoDB Settings
     MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017/")
     MONGODB_DB_NAME = os.getenv("MONGODB_DB_NAME", "financerag")
+    MONGODB_TIMEOUT_MS = int(os.getenv("MONGODB_TIMEOUT_MS", "5000"))
     
     # Authentication Settings
     SECRET_KEY = os.getenv("SECRET_KEY", "financerag")
@@ -0,0 +1,127 @@
+from core.config import config
+from core.cache import query_embedding_cache
+from core.vector_index import normalize_rows
+from typing import List, Tuple
+import numpy as np
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# A sentence ends at . ! or ? followed by a capitalised word (so "Rs. 1.5 lakh" stays whole), or at a line break
+SENTENCE_END = re.compile(r"(?<!\bRs\.)(?<!\bMr\.)(?<!\bDr\.)(?<!\bNo\.)(?<=[.!?])\s+(?=[A-Z\"'(])|\n+")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Tokenizer-free token estimate: about four characters per token, the usual ratio of
+    the LLM tokenizers for English prose (figures and symbols run a little denser).
+    Good enough for budgeting; the LLM's own count is reported when it has one.
+    """
+    return (len(text) + 3) // 4
+
+def split_sentences(text: str, min_chars: int = 25) -> List[str]:
+    """
+    Splits on sentence punctuation and line breaks; pieces shorter than min_chars
+    (short headings, list markers) are merged into the previous sentence.
+    """
+    sentences = []
+    for piece in SENTENCE_END.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        if sentences and len(piece) < min_chars:
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return sentences
+
+def normalize_sentence(sentence: str) -> str:
+    return re.sub(r"\s+", " ", sentence).strip().lower()
+
+class ContextPacker:
+    """
+    Builds the prompt context from reranked chunks within CONTEXT_TOKEN_BUDGET tokens.
+
+    Sentences repeated across chunks (neighbouring chunks overlap, syndicated news) are
+    kept once. If the rest fits the budget it is used as is; otherwise sentences are
+    ranked by embedding similarity to the query and the best ones are kept, printed in
+    their original order under their source. If the sentences can't be embedded, the
+    first ones that fit the budget are kept instead, so the answer still gets a context.
+    """
+    def pack(self, query: str, docs: list, budget: int = None) -> Tuple[str, dict]:
+        budget = budget or config.CONTEXT_TOKEN_BUDGET
+        entries = []  # (doc index, sentence index, sentence, tokens)
+        seen, seen_text = set(), {}
+        duplicates = 0
+        for d, doc in enumerate(docs):
+            source = doc.metadata.get("source", doc.id)
+            for s, sentence in enumerate(split_sentences(doc.page_content)):
+                key = normalize_sentence(sentence)
+                # A fragment cut at a chunk boundary is a substring of the neighbour's sentence
+                if key in seen or key in seen_text.get(source, ""):
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                seen_text[source] = seen_text.get(source, "") + " " + key
+                entries.append((d, s, sentence, estimate_tokens(sentence)))
+
+        before = sum(estimate_tokens(doc.page_content) for doc in docs)
+        total = sum(tokens for *_, tokens in entries)
+        keep = list(range(len(entries)))
+        selection = "all"
+        if total > budget and entries:
+            try:
+                keep, selection = self._select(query, entries, budget), "similarity"
+            except Exception as e:
+                logger.warning(f"Context selection failed, truncating to the budget instead: {e}")
+                keep, selection = self._truncate(entries, budget), "truncated"
+
+        text = self._render(docs, [entries[i] for i in sorted(keep)])
+        stats = {
+            "context_tokens": estimate_tokens(text),
+            "context_tokens_before": before,
+            "sentences_kept": len(keep),
+            "sentences_total": len(entries) + duplicates,
+            "duplicates_removed": duplicates,
+            "budget": budget,
+            "selection": selection,
+        }
+        return text, stats
+
+    def _select(self, query: str, entries, budget: int) -> List[int]:
+        """Most query-similar sentences, best first, until the budget is used up"""
+        from core.database import db_service
+        vectors = normalize_rows(db_service.embedding_function.embed_documents([e[2] for e in entries]))
+        scores = vectors @ normalize_rows(query_embedding_cache.embed_query(query))
+        keep, used = [], 0
+        for i in np.argsort(-scores, kind="stable"):
+            tokens = entries[i][3]
+            if used + tokens > budget:
+                continue
+            keep.append(int(i))
+            used += tokens
+        return keep
+
+    def _truncate(self, entries, budget: int) -> List[int]:
+        """Sentences in reranked order until the budget is used up"""
+        keep, used = [], 0
+        for i, (*_, tokens) in enumerate(entries):
+            if used + tokens > budget:
+                break
+            keep.append(i)
+            used += tokens
+        return keep
+
+    def _render(self, docs: list, entries) -> str:
+        blocks = []
+        for d, doc in enumerate(docs):
+            kept = [(s, sentence) for doc_index, s, sentence, _ in entries if doc_index == d]
+            if not kept:
+                continue
+            parts = [kept[0][1]]
+            for (previous, _), (s, sentence) in zip(kept, kept[1:]):
+                parts.append(("... " if s > previous + 1 else "") + sentence)
+            blocks.append(f"Source: {doc.metadata.get('title', 'Unknown')}\nContent: {' '.join(parts)}")
+        return "\n\n".join(blocks)
+
+context_packer = ContextPacker()
@@ -1,26 +1,327 @@
-import chromadb
-from chromadb.config import Settings
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
+from langchain_core.documents import Document
 from core.config import config
+from core.embeddings import create_embedding_function
+from core.partitions import partition_name, parse_partition, period_of
+from core.vector_backends import ChromaEngine, VectorCollection, create_engine
+from core.resources import LazyResource
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+import threading
+import time
+import hashlib
+import logging
+import json
 import os
 
+logger = logging.getLogger(__name__)
+
+def chunk_id(doc: Document) -> str:
+    """
+    Deterministic id for a chunk, so re-indexing the same page upserts instead of duplicating.
+    """
+    source = doc.metadata.get("source", "")
+    return hashlib.sha1(f"{source}\n{doc.page_content}".encode("utf-8")).hexdigest()
+
+def clean_metadata(metadata: dict) -> dict:
+    """
+    Chroma only accepts str, int, float and bool metadata values.
+    """
+    cleaned = {}
+    for key, value in metadata.items():
+        if value is None:
+            continue
+        cleaned[key] = value if isinstance(value, (str, int, float, bool)) else str(value)
+    return cleaned
+
+def read_generation() -> dict:
+    """
+    Last state published by the indexer service: {"epoch", "sequence", "generation", "pid"}.
+    """
+    try:
+        return json.loads(Path(config.INDEX_GENERATION_FILE).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def write_generation(state: dict):
+    path = Path(config.INDEX_GENERATION_FILE)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps({**state, "pid": os.getpid()}))
+    tmp_path.replace(path)
+
+class ReadWriteLock:
+    """
+    Many concurrent readers or one writer; used so searches never see a view being swapped.
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.readers = 0
+
+    def acquire_read(self):
+        with self.condition:
+            self.readers += 1
+
+    def release_read(self):
+        with self.condition:
+            self.readers -= 1
+            if self.readers == 0:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        self.condition.acquire()
+        self.condition.wait_for(lambda: self.readers == 0)
+
+    def release_write(self):
+        self.condition.release()
+
 class DatabaseService:
     def __init__(self):
-        self.embedding_function = HuggingFaceEmbeddings(
-            model_name=config.EMBEDDING_MODEL_NAME
-        )
-        
-        self.vector_store = Chroma(
-            collection_name=config.COLLECTION_NAME,
-            embedding_function=self.embedding_function,
-            persist_directory=config.CHROMA_DB_DIR
+        # The embedding model and the store are opened on first use (or by the warm-up)
+        self._embedding_function = LazyResource(
+            "embeddings", create_embedding_function, warm=lambda embeddings: embeddings.embed_query("warm up")
         )
+        self._engine = LazyResource("vector_store", self._open_engine, warm=lambda _: self._warm_search())
+        # Serializes writes with maintenance jobs that rebuild collections
+        self.write_lock = threading.RLock()
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="partition-search")
+        self.view_lock = ReadWriteLock()
+        self.view_state = read_generation()  # published state this process's view includes
+        # (epoch, generation): a restarted indexer counts generations from zero again
+        self.generation = (self.view_state.get("epoch"), self.view_state.get("generation"))
+        self.generation_checked_at = time.monotonic()
+        self.partition_cache = {}
+
+    @property
+    def embedding_function(self):
+        return self._embedding_function.get()
+
+    @property
+    def engine(self):
+        return self._engine.get()
+
+    def _open_engine(self):
+        engine = create_engine()
+        engine.open(config.COLLECTION_NAME)
+        return engine
+
+    def _warm_search(self):
+        # Loads the base collection's index into memory
+        self.similarity_search_by_vector(self.embedding_function.embed_query("warm up"), 1)
+
+    def reload(self):
+        """
+        (Re)opens the collections, finishing any compaction that was interrupted before its rename.
+        """
+        if isinstance(self.engine, ChromaEngine):
+            self.engine.recover()
+        # Partition handles go stale when a maintenance job swaps collections
+        self.partition_cache = {}
+
+    def refresh_if_stale(self) -> dict:
+        """
+        Reopens the store when the indexer service has published writes since this process
+        last looked. Checked at most every INDEX_REFRESH_INTERVAL_MS.
+
+        Returns the published state ({"epoch", "sequence", ...}) this process's view includes,
+        so callers know which written batches they can already find in the store.
+        """
+        now = time.monotonic()
+        if now - self.generation_checked_at < config.INDEX_REFRESH_INTERVAL_MS / 1000:
+            return self.view_state
+        self.generation_checked_at = now
+        state = read_generation()
+        generation = (state.get("epoch"), state.get("generation"))
+        if state.get("pid") == os.getpid() or generation == self.generation:
+            self.view_state = state
+            return self.view_state
+        if not self._engine.loaded:
+            # Opening it later reads the latest state anyway
+            self.generation, self.view_state = generation, state
+            return self.view_state
+        self.view_lock.acquire_write()
+        try:
+            if generation != self.generation:  # else another thread refreshed first
+                self.engine.refresh()
+                self.reload()
+                self.generation = generation
+                logger.info(f"Refreshed vector store view to generation {state.get('generation')}")
+            self.view_state = state
+        finally:
+            self.view_lock.release_write()
+        return self.view_state
+
+    @property
+    def collection(self) -> VectorCollection:
+        """
+        The base (unpartitioned) collection.
+        """
+        return self.get_partition(config.COLLECTION_NAME)
+
+    def partition_for(self, metadata: dict) -> str:
+        """
+        Name of the collection a chunk belongs to under INDEX_PARTITIONING and CATEGORY_PARTITIONING.
+        """
+        period, category = None, None
+        if config.INDEX_PARTITIONING == "month":
+            period = period_of(metadata.get("scraped_at") or time.time())
+        if config.CATEGORY_PARTITIONING:
+            category = metadata.get("category")
+        return partition_name(config.COLLECTION_NAME, period, category)
+
+    def get_partition(self, name: str) -> VectorCollection:
+        collection = self.partition_cache.get(name)
+        if collection is None:
+            collection = self.engine.open(name)
+            self.partition_cache[name] = collection
+        return collection
+
+    def list_partitions(self, periods: List[str] = None, categories: List[str] = None) -> List[Tuple[str, dict]]:
+        """
+        (name, info) for every collection of this store, optionally restricted to the given
+        periods and categories. Collections without a period are skipped when periods are
+        given; uncategorized collections (e.g. chunks indexed before category tagging) are
+        always kept.
+        """
+        partitions = []
+        for name in self.engine.list_collections():
+            info = parse_partition(config.COLLECTION_NAME, name)
+            if info is None:
+                continue
+            if periods is not None and info["period"] not in periods:
+                continue
+            if categories is not None and info["category"] is not None and info["category"] not in categories:
+                continue
+            partitions.append((name, info))
+        return sorted(partitions)
+
+    def partition_collections(self, periods: List[str] = None, categories: List[str] = None) -> List[VectorCollection]:
+        return [self.get_partition(name) for name, _ in self.list_partitions(periods, categories)]
+
+    def drop_partition(self, name: str):
+        """
+        Drops a whole partition; constant time compared to deleting its chunks one by one.
+        """
+        with self.write_lock:
+            self.engine.drop(name)
+            self.partition_cache.pop(name, None)
+        logger.info(f"Dropped partition {name}")
+
+    def compact_partition(self, name: str) -> int:
+        """
+        Rebuilds one partition's index without its deleted entries; returns the live chunk count.
+        """
+        with self.write_lock:
+            return self.get_partition(name).compact()
+
+    def delete(self, ids: List[str]):
+        """
+        Deletes chunks by id from every partition.
+        """
+        with self.write_lock:
+            for collection in self.partition_collections():
+                collection.delete(ids=ids)
+
+    def update_metadata(self, updates: dict):
+        """
+        Merges {chunk id: partial metadata} into whichever partitions hold those chunks.
+        Chunks deleted in the meantime are silently skipped.
+        """
+        if not updates:
+            return
+        ids = list(updates)
+        with self.write_lock:
+            for collection in self.partition_collections():
+                collection.update_metadata(ids, [updates[doc_id] for doc_id in ids])
+
+    def upsert(self, ids: List[str], documents: List[Document], embeddings: List[List[float]]):
+        """
+        Writes pre-computed embeddings to the collection without embedding the text again.
+        """
+        if not ids:
+            return
+        groups = {}
+        for doc_id, doc, embedding in zip(ids, documents, embeddings):
+            groups.setdefault(self.partition_for(doc.metadata), []).append((doc_id, doc, embedding))
+
+        with self.write_lock:
+            for name, items in groups.items():
+                self.get_partition(name).upsert(
+                    ids=[doc_id for doc_id, _, _ in items],
+                    embeddings=[embedding for _, _, embedding in items],
+                    metadatas=[clean_metadata(doc.metadata) for _, doc, _ in items],
+                    documents=[doc.page_content for _, doc, _ in items]
+                )
+
+    def iter_partition(self, name: str, page_size: int = 5000):
+        """
+        Yields (id, text, metadata) for every chunk in one partition, page by page.
+        """
+        collection = self.get_partition(name)
+        offset = 0
+        while True:
+            page = collection.get(limit=page_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield from zip(page["ids"], page["documents"], page["metadatas"])
+            offset += len(page["ids"])
+
+    def iter_chunks(self, page_size: int = 5000):
+        """
+        Yields (id, text, metadata) for every chunk in every partition.
+        """
+        for name, _ in self.list_partitions():
+            yield from self.iter_partition(name, page_size)
+
+    def get_embeddings(self, ids: List[str]) -> dict:
+        """
+        {chunk id: stored embedding} for the given ids, looked up in every partition.
+        Ids that are not in the store are left out.
+        """
+        found = {}
+        self.view_lock.acquire_read()
+        try:
+            for collection in self.partition_collections():
+                missing = [doc_id for doc_id in ids if doc_id not in found]
+                if not missing:
+                    break
+                page = collection.get(ids=missing, include_embeddings=True)
+                found.update(zip(page["ids"], page["embeddings"]))
+        finally:
+            self.view_lock.release_read()
+        return found
+
+    def count(self) -> int:
+        return sum(collection.count() for collection in self.partition_collections())
+
+    def _search_collection(self, collection: VectorCollection, embedding: List[float], k: int) -> List[Tuple[Document, float]]:
+        return collection.search([embedding], k)[0]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int, periods: List[str] = None,
+                                    categories: List[str] = None) -> List[Tuple[Document, float]]:
+        """
+        Nearest-neighbour search in the persistent store, fanned out in parallel to the
+        partitions for the given periods and categories (all partitions if None).
+        Returns (document, cosine similarity) pairs, best first, with the chunk id on document.id.
+        """
+        self.refresh_if_stale()
+        self.view_lock.acquire_read()
+        try:
+            collections = self.partition_collections(periods, categories)
+            if not collections:
+                return []
+            if len(collections) == 1:
+                hits = self._search_collection(collections[0], embedding, k)
+            else:
+                futures = [self.executor.submit(self._search_collection, c, embedding, k) for c in collections]
+                hits = [hit for future in futures for hit in future.result()]
+        finally:
+            self.view_lock.release_read()
 
-    def get_vector_store(self):
-        return self.vector_store
-    
-    def get_retriever(self, k=10):
-        return self.vector_store.as_retriever(search_kwargs={"k": k})
+        # A chunk re-scraped in a later month can live in two partitions; keep the best copy
+        best = {}
+        for doc, score in hits:
+            if doc.id not in best or score > best[doc.id][1]:
+                best[doc.id] = (doc, score)
+        return sorted(best.values(), key=lambda x: x[1], reverse=True)[:k]
 
 db_service = DatabaseService()
@@ -4,28 +4,40 @@ from datetime import datetime
 from typing import Optional, List, Dict
 import logging
 from core.config import config
+from core.resources import LazyResource
 
 logger = logging.getLogger(__name__)
 
 class DatabaseAuthService:
     def __init__(self):
+        """Connects to MongoDB on first use, so the API starts even when it is down"""
+        self.mongo = LazyResource("mongodb", self._connect, required=config.ENABLE_AUTH)
+
+    def _connect(self):
         """Initialize MongoDB connection for authentication"""
         try:
-            self.client = MongoClient(config.MONGODB_URL)
-            self.db = self.client[config.MONGODB_DB_NAME]
-            self.users = self.db["users"]
-            self.query_history = self.db["query_history"]
+            client = MongoClient(config.MONGODB_URL, serverSelectionTimeoutMS=config.MONGODB_TIMEOUT_MS)
+            db = client[config.MONGODB_DB_NAME]
             
             # Create indexes
-            self.users.create_index("email", unique=True)
-            self.users.create_index("username", unique=True)
-            self.query_history.create_index("user_id")
-            self.query_history.create_index("timestamp")
+            db["users"].create_index("email", unique=True)
+            db["users"].create_index("username", unique=True)
+            db["query_history"].create_index("user_id")
+            db["query_history"].create_index("timestamp")
             
             logger.info("MongoDB authentication database initialized")
+            return db
         except Exception as e:
             logger.error(f"Failed to connect to MongoDB: {e}")
             raise
+
+    @property
+    def users(self):
+        return self.mongo.get()["users"]
+
+    @property
+    def query_history(self):
+        return self.mongo.get()["query_history"]
     
     # User Operations
     def create_user(self, email: str, username: str, hashed_password: str, 
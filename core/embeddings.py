@@ -0,0 +1,41 @@
+from core.config import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+def create_embedding_function(backend: str = None):
+    """
+    Builds the embedding function for the configured backend ("huggingface" or "onnx").
+    Falls back to the HuggingFace/PyTorch path if the ONNX backend cannot be loaded.
+    With INFERENCE_MODE=sidecar the model lives in the shared inference server instead,
+    unless its socket is not reachable.
+    """
+    backend = (backend or config.EMBEDDING_BACKEND).lower()
+
+    if config.INFERENCE_MODE == "sidecar":
+        from core.inference_server import RemoteEmbeddings, sidecar_available
+        if sidecar_available():
+            return RemoteEmbeddings()
+        logger.warning(f"Inference server not reachable at {config.INFERENCE_SOCKET}. Loading embeddings locally.")
+
+    if backend == "onnx":
+        try:
+            from core.onnx_models import OnnxEmbeddings
+            return OnnxEmbeddings(
+                model_name=config.EMBEDDING_MODEL_NAME,
+                cache_dir=config.ONNX_MODEL_DIR,
+                num_threads=config.EMBEDDING_NUM_THREADS,
+                batch_size=config.EMBEDDING_BATCH_SIZE,
+                max_batch_tokens=config.EMBEDDING_MAX_BATCH_TOKENS,
+                max_length=config.EMBEDDING_MAX_LENGTH,
+                quantize=config.EMBEDDING_QUANTIZE
+            )
+        except Exception as e:
+            logger.warning(f"Could not load ONNX embedding backend: {e}. Falling back to HuggingFace.")
+
+    # Imported here: sentence-transformers pulls in torch, which takes seconds
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=config.EMBEDDING_MODEL_NAME,
+        encode_kwargs={"batch_size": config.EMBEDDING_BATCH_SIZE}
+    )
@@ -0,0 +1,386 @@
+from core.database import db_service, write_generation
+from core.config import config
+from core.lexical import lexical_index
+from core.vector_index import EphemeralVectorIndex
+from langchain_core.documents import Document
+from multiprocessing.managers import BaseManager
+from pathlib import Path
+from typing import List, Tuple
+import numpy as np
+import threading
+import logging
+import atexit
+import queue
+import json
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+class BackgroundIndexWriter:
+    """
+    Persists embedded chunks to Chroma on a background thread.
+
+    Every submitted batch is first written to a spool file, so nothing is lost if the
+    process dies before the write lands; leftover spool files are replayed on start-up.
+    Until a chunk is persisted it stays searchable through search_pending(); a batch
+    that fails every retry stays pending and spooled, and is queued again after
+    INDEX_WRITER_RETRY_S, doubling on each failure.
+
+    Batches are numbered in submission order. With publish_generation (the indexer
+    service), every write saves the BM25 index, then publishes to INDEX_GENERATION_FILE
+    a generation counter, the number up to which every batch has been attempted, and
+    the batches among those still waiting for a retry, so other processes know when to
+    refresh and which of their pending copies they can drop.
+    """
+    def __init__(self, spool_dir: str = None, publish_generation: bool = False):
+        self.spool_dir = Path(spool_dir or config.INDEX_SPOOL_DIR)
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.queue = queue.Queue()
+        self.pending = {}  # chunk id -> (Document, embedding)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.publish_generation = publish_generation
+        self.epoch = time.time_ns()  # tells readers apart from a restarted writer
+        self.sequence = 0  # last batch number handed out
+        self.finished_sequence = 0  # every batch up to this number is written or waiting for a retry
+        self.queued_sequences = set()  # batches not attempted yet
+        self.failed_sequences = {}  # batch number -> failed attempts, for batches waiting for a retry
+        self.generation = 0  # successful writes
+        self.replay_through = 0  # last batch replayed from the spool at start-up
+        self.epoch_published = False
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        for spool_file in sorted(self.spool_dir.glob("*.json")):
+            logger.info(f"Replaying unpersisted index batch {spool_file.name}")
+            self._enqueue(spool_file, *self._read_spool(spool_file))
+        self.replay_through = self.sequence
+        self.thread = threading.Thread(target=self._run, name="index-writer", daemon=True)
+        self.thread.start()
+        if not self.replay_through:
+            self._publish_if_ready()  # new epoch: readers drop batches the previous writer took
+
+    def submit(self, ids: List[str], documents: List[Document], embeddings: List[List[float]]) -> int:
+        """
+        Queues a batch for persistence. Returns once the batch is spooled and searchable,
+        with the batch number (0 for an empty batch).
+        """
+        if not ids:
+            return 0
+        spool_file = self.spool_dir / f"{time.time_ns()}-{uuid.uuid4().hex}.json"
+        tmp_file = spool_file.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps({
+            "ids": ids,
+            "documents": [doc.page_content for doc in documents],
+            "metadatas": [doc.metadata for doc in documents],
+            "embeddings": [list(map(float, e)) for e in embeddings]
+        }))
+        tmp_file.replace(spool_file)  # atomic, so replay never sees a half-written batch
+        return self._enqueue(spool_file, ids, documents, embeddings)
+
+    def search_pending(self, query_embedding: List[float], k: int) -> List[Tuple[Document, float]]:
+        """
+        Exact cosine search over chunks that are queued but not yet in Chroma.
+        """
+        with self.lock:
+            items = list(self.pending.items())
+        if not items or k <= 0:
+            return []
+
+        index = EphemeralVectorIndex(
+            [doc_id for doc_id, _ in items],
+            [doc for _, (doc, _) in items],
+            [embedding for _, (_, embedding) in items]
+        )
+        return index.search(query_embedding, k)
+
+    def pending_embeddings(self, ids: List[str]) -> dict:
+        """{chunk id: embedding} for the given ids that are queued but not yet in Chroma"""
+        with self.lock:
+            return {doc_id: self.pending[doc_id][1] for doc_id in ids if doc_id in self.pending}
+
+    def flush(self, timeout: float = None):
+        """
+        Blocks until every queued batch has been persisted (or given up on).
+        """
+        if not self.thread or not self.thread.is_alive():
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                logger.warning(f"Index writer flush timed out with {self.queue.unfinished_tasks} batches queued")
+                return
+            time.sleep(0.05)
+
+    def _read_spool(self, spool_file: Path):
+        data = json.loads(spool_file.read_text())
+        documents = [
+            Document(page_content=text, metadata=metadata, id=doc_id)
+            for doc_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+        ]
+        return data["ids"], documents, data["embeddings"]
+
+    def _enqueue(self, spool_file, ids, documents, embeddings) -> int:
+        with self.lock:
+            for doc_id, doc, embedding in zip(ids, documents, embeddings):
+                doc.id = doc_id
+                self.pending[doc_id] = (doc, embedding)
+            self.sequence += 1
+            sequence = self.sequence
+            self.queued_sequences.add(sequence)
+        self.queue.put((sequence, spool_file, ids, documents, embeddings))
+        return sequence
+
+    def _collect(self):
+        """
+        Takes one batch, then greedily merges whatever else is queued into one bulk write.
+        """
+        batches = [self.queue.get()]
+        size = len(batches[0][2])
+        deadline = time.monotonic() + config.INDEX_WRITER_FLUSH_MS / 1000
+        while size < config.INDEX_WRITER_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batches.append(batch)
+            size += len(batch[2])
+        return batches
+
+    def _run(self):
+        while True:
+            batches = self._collect()
+            try:
+                self._write_batches(batches)
+            except Exception as e:
+                # Keep the thread alive; the batches are still spooled and get retried
+                logger.error(f"Index writer failed on {len(batches)} batches: {e}")
+                self._retry_later(batches)
+            finally:
+                for _ in batches:
+                    self.queue.task_done()
+
+    def _write_batches(self, batches):
+        # Chroma rejects duplicate ids within one upsert; the latest copy wins
+        merged = {}
+        for _, _, batch_ids, batch_docs, batch_embeddings in batches:
+            for doc_id, doc, embedding in zip(batch_ids, batch_docs, batch_embeddings):
+                merged[doc_id] = (doc, embedding)
+        ids = list(merged)
+        documents = [doc for doc, _ in merged.values()]
+        embeddings = [embedding for _, embedding in merged.values()]
+
+        if not self._write_with_retry(ids, documents, embeddings):
+            self._retry_later(batches)
+            return
+        self._add_lexical(ids, documents)
+        with self.lock:
+            for doc_id in ids:
+                self.pending.pop(doc_id, None)
+            for sequence, *_ in batches:
+                self.queued_sequences.discard(sequence)
+                self.failed_sequences.pop(sequence, None)
+            self.generation += 1
+            self._advance()
+        for _, spool_file, *_ in batches:
+            spool_file.unlink(missing_ok=True)
+        self._publish_if_ready()
+
+    def _retry_later(self, batches):
+        """
+        Failed batches stay pending and spooled, and are queued again with backoff. They
+        no longer hold back the published sequence: it lists them as still unwritten.
+        """
+        with self.lock:
+            for batch in batches:
+                sequence = batch[0]
+                if sequence not in self.queued_sequences and sequence not in self.failed_sequences:
+                    continue  # written before the error
+                self.queued_sequences.discard(sequence)
+                attempts = self.failed_sequences[sequence] = self.failed_sequences.get(sequence, 0) + 1
+                delay = min(config.INDEX_WRITER_RETRY_S * 2 ** (attempts - 1), 3600)
+                timer = threading.Timer(delay, self.queue.put, args=(batch,))
+                timer.daemon = True
+                timer.start()
+                logger.warning(f"Retrying index batch {sequence} in {delay:.0f}s (failed {attempts} times)")
+            self._advance()
+        if not self.epoch_published:
+            self._publish_if_ready()  # the replay may have ended with this batch
+
+    def _advance(self):
+        """Moves finished_sequence up to the batch before the first one not attempted yet"""
+        self.finished_sequence = min(self.queued_sequences) - 1 if self.queued_sequences else self.sequence
+
+    def _add_lexical(self, ids, documents):
+        """BM25 gets chunks only once they are in the vector store"""
+        try:
+            lexical_index.get().add(ids, documents)
+        except Exception as e:
+            logger.error(f"Adding {len(ids)} chunks to the lexical index failed: {e}")
+
+    def _write_with_retry(self, ids, documents, embeddings) -> bool:
+        delay = 0.5
+        for attempt in range(1, config.INDEX_WRITER_MAX_RETRIES + 1):
+            try:
+                db_service.upsert(ids, documents, embeddings)
+                logger.info(f"Persisted {len(ids)} chunks")
+                return True
+            except Exception as e:
+                logger.warning(f"Persisting {len(ids)} chunks failed (attempt {attempt}): {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+        # Spool files are kept and replayed on the next start-up
+        logger.error(f"Giving up on {len(ids)} chunks for now; they stay spooled in {self.spool_dir}")
+        return False
+
+    def _publish_if_ready(self):
+        """
+        Publishes only once every batch replayed from the spool has been attempted: on
+        seeing a new epoch, readers drop their copies of the previous writer's batches,
+        which the replay is writing.
+        """
+        with self.lock:
+            ready = self.finished_sequence >= self.replay_through
+        if self.publish_generation and ready:
+            self.publish()
+
+    def publish(self):
+        with self.lock:
+            state = {"epoch": self.epoch, "sequence": self.finished_sequence, "generation": self.generation,
+                     "unwritten": sorted(self.failed_sequences)}
+        # Workers reload the BM25 file when the generation changes, so it has to be current first
+        try:
+            lexical_index.get().save()
+        except Exception as e:
+            logger.error(f"Saving the lexical index failed: {e}")
+        write_generation(state)
+        self.epoch_published = True
+
+class IndexerClient(BaseManager):
+    """
+    Client side of the indexer service (core/indexer_service.py).
+    """
+
+IndexerClient.register("indexer")
+
+def service_address():
+    """
+    INDEX_SERVICE_ADDRESS as a (host, port) pair, or a Unix socket path.
+    """
+    address = config.INDEX_SERVICE_ADDRESS
+    if "/" not in address and ":" in address:
+        host, port = address.rsplit(":", 1)
+        return host, int(port)
+    return address
+
+def service_authkey() -> bytes:
+    """
+    INDEX_SERVICE_AUTHKEY, which has no default: the manager protocol unpickles what
+    clients send, so anyone holding the key can run code in the indexer.
+    """
+    if not config.INDEX_SERVICE_AUTHKEY:
+        raise RuntimeError("INDEX_WRITER_MODE=service needs INDEX_SERVICE_AUTHKEY set to a secret shared "
+                           "by the API workers and the indexer service")
+    return config.INDEX_SERVICE_AUTHKEY.encode()
+
+def connect_indexer():
+    client = IndexerClient(address=service_address(), authkey=service_authkey())
+    client.connect()
+    return client.indexer()
+
+class RemoteIndexWriter:
+    """
+    Hands batches to the single indexer process instead of writing to the store from
+    every API worker. Submitted chunks stay searchable here until the indexer publishes
+    that their batch is written and this process's store view has been refreshed past
+    it. If the indexer cannot be reached, the batch is written directly, as without the
+    service.
+    """
+    def __init__(self):
+        service_authkey()  # refuse to start without a key rather than fall back to direct writes
+        self.pending = {}  # (writer epoch, batch number) -> EphemeralVectorIndex
+        self.lock = threading.Lock()
+        self.proxy = None
+
+    def start(self):
+        pass
+
+    def _call(self, method: str, *args):
+        for attempt in range(2):
+            try:
+                with self.lock:
+                    if self.proxy is None:
+                        self.proxy = connect_indexer()
+                    proxy = self.proxy
+                return getattr(proxy, method)(*args)
+            except (ConnectionError, EOFError, OSError):
+                # The indexer may have restarted; reconnect once
+                with self.lock:
+                    self.proxy = None
+                if attempt:
+                    raise
+
+    def submit(self, ids: List[str], documents: List[Document], embeddings: List[List[float]]) -> int:
+        if not ids:
+            return 0
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        try:
+            epoch, sequence = self._call("submit", ids, [doc.page_content for doc in documents],
+                                         [doc.metadata for doc in documents], embeddings)
+        except Exception as e:
+            logger.warning(f"Indexer service unavailable ({e}); writing {len(ids)} chunks directly")
+            db_service.upsert(ids, documents, embeddings.tolist())
+            return 0
+        with self.lock:
+            self.pending[(epoch, sequence)] = EphemeralVectorIndex(ids, documents, embeddings)
+        return sequence
+
+    def search_pending(self, query_embedding: List[float], k: int) -> List[Tuple[Document, float]]:
+        # Only batches this process's store view already includes, not merely ones the
+        # indexer has written: the view catches up at most every INDEX_REFRESH_INTERVAL_MS
+        state = db_service.refresh_if_stale()
+        with self.lock:
+            unwritten = set(state.get("unwritten", []))
+            for epoch, sequence in list(self.pending):
+                # Written by the current indexer, or replayed from the spool by a newer one
+                if epoch < state.get("epoch", 0) or (epoch == state.get("epoch") and sequence <= state["sequence"]
+                                                     and sequence not in unwritten):
+                    del self.pending[(epoch, sequence)]
+            indexes = list(self.pending.values())
+        if not indexes or k <= 0:
+            return []
+
+        best = {}
+        for index in indexes:
+            for doc, score in index.search(query_embedding, k):
+                if doc.id not in best or score > best[doc.id][1]:
+                    best[doc.id] = (doc, score)
+        return sorted(best.values(), key=lambda x: x[1], reverse=True)[:k]
+
+    def pending_embeddings(self, ids: List[str]) -> dict:
+        with self.lock:
+            indexes = list(self.pending.values())
+        found = {}
+        for index in indexes:
+            found.update(index.embeddings_for(ids))
+        return found
+
+    def flush(self, timeout: float = None):
+        self._call("flush", timeout)
+
+    def record_access(self, ids: List[str]):
+        self._call("record_access", ids)
+
+    def run_maintenance(self, compact: bool = False):
+        return self._call("run_maintenance", compact)
+
+if config.INDEX_WRITER_MODE == "service":
+    index_writer = RemoteIndexWriter()
+else:
+    index_writer = BackgroundIndexWriter()
+    atexit.register(index_writer.flush, timeout=10)
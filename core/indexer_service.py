@@ -0,0 +1,84 @@
+from core.config import config
+
+config.INDEX_WRITER_MODE = "local"  # this process is the writer
+
+from core.index_writer import BackgroundIndexWriter, service_address, service_authkey
+from core.maintenance import index_maintenance
+from langchain_core.documents import Document
+from multiprocessing.managers import BaseManager
+from typing import List
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class IndexerService:
+    """
+    Single writer for the vector store (INDEX_WRITER_MODE=service).
+
+    API workers send embedded batches here through their IndexerClient proxy, and one
+    BackgroundIndexWriter merges them into bulk upserts with its spool and retry. Every
+    write publishes a generation counter to INDEX_GENERATION_FILE, which readers use to
+    reopen their view of the store and reload the BM25 index, which only this process
+    updates and saves. Retention and compaction run here as well, so no other process
+    ever writes. Start it with `python -m core.indexer_service`.
+    """
+    def __init__(self):
+        self.writer = BackgroundIndexWriter(publish_generation=True)
+
+    def start(self):
+        self.writer.start()  # publishes the new epoch once the spool replay is written
+        index_maintenance.start_scheduler()
+
+    def submit(self, ids: List[str], texts: List[str], metadatas: List[dict], embeddings):
+        """
+        Queues a batch; returns (writer epoch, batch number) once it is spooled.
+        """
+        documents = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        return self.writer.epoch, self.writer.submit(ids, documents, embeddings)
+
+    def flush(self, timeout: float = None):
+        self.writer.flush(timeout)
+
+    def record_access(self, ids: List[str]):
+        index_maintenance.record_access(ids)
+
+    def run_maintenance(self, compact: bool = False):
+        self.writer.flush()
+        result = index_maintenance.run(compact)
+        with self.writer.lock:
+            self.writer.generation += 1
+        self.writer.publish()
+        return result
+
+    def status(self) -> dict:
+        return {
+            "epoch": self.writer.epoch,
+            "queued_batches": self.writer.queue.unfinished_tasks,
+            "sequence": self.writer.sequence,
+            "finished_sequence": self.writer.finished_sequence,
+            "generation": self.writer.generation,
+        }
+
+class IndexerServer(BaseManager):
+    pass
+
+def serve():
+    authkey = service_authkey()
+    address = service_address()
+    if isinstance(address, str) and os.path.exists(address):
+        os.unlink(address)  # stale socket from a previous run
+    service = IndexerService()
+    service.start()
+    IndexerServer.register("indexer", callable=lambda: service)
+    umask = os.umask(0o177)  # the socket is created owner-only
+    try:
+        server = IndexerServer(address=address, authkey=authkey).get_server()
+    finally:
+        os.umask(umask)
+    logger.info(f"Indexer service listening on {config.INDEX_SERVICE_ADDRESS}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    serve()
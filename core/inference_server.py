@@ -0,0 +1,213 @@
+from core.config import config
+from core.batching import DynamicBatcher, predict_length_sorted
+from langchain_core.embeddings import Embeddings
+from typing import List
+import numpy as np
+import socketserver
+import threading
+import logging
+import socket
+import struct
+import os
+
+logger = logging.getLogger(__name__)
+
+# Wire format, all integers big-endian:
+#   request  = op (u8) | payload length (u32) | payload
+#   response = status (u8, 0 = ok) | payload length (u32) | payload (error text when status != 0)
+#   strings  = count (u32), then length (u32) + UTF-8 bytes per string
+#   EMBED    request: strings                -> response: rows (u32) | dim (u32) | float32 little-endian
+#   RERANK   request: query string + strings -> response: count (u32) | float32 little-endian
+OP_EMBED = 1
+OP_RERANK = 2
+HEADER = struct.Struct("!BI")
+U32 = struct.Struct("!I")
+
+def pack_strings(texts: List[str]) -> bytes:
+    parts = [U32.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(U32.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+def unpack_strings(payload: bytes, offset: int = 0):
+    (count,) = U32.unpack_from(payload, offset)
+    offset += U32.size
+    texts = []
+    for _ in range(count):
+        (length,) = U32.unpack_from(payload, offset)
+        offset += U32.size
+        texts.append(payload[offset:offset + length].decode("utf-8"))
+        offset += length
+    return texts, offset
+
+def pack_matrix(matrix: np.ndarray) -> bytes:
+    matrix = np.ascontiguousarray(matrix, dtype="<f4")
+    rows, dim = matrix.shape if matrix.ndim == 2 else (matrix.shape[0], 1)
+    return U32.pack(rows) + U32.pack(dim) + matrix.tobytes()
+
+def unpack_matrix(payload: bytes) -> np.ndarray:
+    rows, dim = U32.unpack_from(payload, 0)[0], U32.unpack_from(payload, U32.size)[0]
+    return np.frombuffer(payload, dtype="<f4", offset=2 * U32.size).reshape(rows, dim)
+
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ConnectionError("Inference socket closed")
+        received += n
+    return bytes(buffer)
+
+def send_frame(sock: socket.socket, code: int, payload: bytes):
+    sock.sendall(HEADER.pack(code, len(payload)) + payload)
+
+def recv_frame(sock: socket.socket):
+    code, length = HEADER.unpack(recv_exact(sock, HEADER.size))
+    return code, recv_exact(sock, length)
+
+# -- client ---------------------------------------------------------------------
+
+class InferenceClient:
+    """
+    Talks to the inference sidecar over its Unix socket; one connection per thread.
+    """
+    def __init__(self, socket_path: str = None):
+        self.socket_path = socket_path or config.INFERENCE_SOCKET
+        self.local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self.local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self.local.sock = sock
+        return sock
+
+    def _request(self, op: int, payload: bytes) -> bytes:
+        sock = self._connection()
+        try:
+            send_frame(sock, op, payload)
+            status, response = recv_frame(sock)
+        except OSError:
+            sock.close()
+            self.local.sock = None
+            raise
+        if status != 0:
+            raise RuntimeError(f"Inference server error: {response.decode('utf-8', errors='replace')}")
+        return response
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return unpack_matrix(self._request(OP_EMBED, pack_strings(texts)))
+
+    def score(self, query: str, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        return unpack_matrix(self._request(OP_RERANK, pack_strings([query]) + pack_strings(texts)))[:, 0]
+
+class RemoteEmbeddings(Embeddings):
+    """
+    Embeddings computed by the inference sidecar instead of a per-worker model.
+    """
+    def __init__(self, client: InferenceClient = None):
+        self.client = client or InferenceClient()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.embed([text])[0].tolist()
+
+class RemoteCrossEncoder:
+    """
+    Same predict() interface as sentence_transformers.CrossEncoder, scored by the sidecar.
+    """
+    def __init__(self, client: InferenceClient = None):
+        self.client = client or InferenceClient()
+
+    def predict(self, pairs) -> np.ndarray:
+        scores = np.zeros(len(pairs), dtype=np.float32)
+        by_query = {}
+        for i, (query, text) in enumerate(pairs):
+            by_query.setdefault(query, []).append((i, text))
+        for query, items in by_query.items():
+            scores[[i for i, _ in items]] = self.client.score(query, [text for _, text in items])
+        return scores
+
+def sidecar_available() -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(config.INFERENCE_SOCKET)
+        return True
+    except OSError:
+        return False
+
+# -- server ---------------------------------------------------------------------
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Hosts the embedding model and the cross-encoder for all API workers
+    (INFERENCE_MODE=sidecar). Each connection gets a thread; requests from all of
+    them are merged by one DynamicBatcher per model, so concurrent workers share
+    forward passes instead of each running their own small ones.
+    Start it with `python -m core.inference_server`.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, embeddings, cross_encoder):
+        self.embedder = DynamicBatcher(lambda texts: np.asarray(embeddings.embed_documents(texts), dtype=np.float32),
+                                       config.INFERENCE_MAX_BATCH, config.INFERENCE_MAX_WAIT_MS, "embed-batcher")
+        self.scorer = None
+        if cross_encoder is not None:
+            self.scorer = DynamicBatcher(lambda pairs: predict_length_sorted(cross_encoder.predict, pairs),
+                                         config.INFERENCE_MAX_BATCH, config.INFERENCE_MAX_WAIT_MS, "rerank-batcher")
+        super().__init__(socket_path, InferenceHandler)
+
+    def handle_request_payload(self, op: int, payload: bytes) -> bytes:
+        if op == OP_EMBED:
+            texts, _ = unpack_strings(payload)
+            return pack_matrix(self.embedder(texts))
+        if op == OP_RERANK:
+            if self.scorer is None:
+                raise RuntimeError("No cross-encoder loaded")
+            (query,), offset = unpack_strings(payload)
+            texts, _ = unpack_strings(payload, offset)
+            return pack_matrix(self.scorer([(query, text) for text in texts])[:, None])
+        raise ValueError(f"Unknown op {op}")
+
+class InferenceHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                op, payload = recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                send_frame(self.request, 0, self.server.handle_request_payload(op, payload))
+            except Exception as e:
+                send_frame(self.request, 1, str(e).encode("utf-8"))
+
+def serve():
+    config.INFERENCE_MODE = "local"  # this process hosts the models itself
+    from core.embeddings import create_embedding_function
+    from agents.reranker import load_cross_encoder
+
+    path = config.INFERENCE_SOCKET
+    if os.path.exists(path):
+        os.unlink(path)  # stale socket from a previous run
+    server = InferenceServer(path, create_embedding_function(), load_cross_encoder())
+    logger.info(f"Inference server listening on {path}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    serve()
@@ -0,0 +1,219 @@
+from langchain_core.documents import Document
+from core.database import db_service
+from core.config import config
+from core.resources import LazyResource
+from collections import Counter
+from pathlib import Path
+from typing import List, Tuple
+import threading
+import logging
+import atexit
+import pickle
+import heapq
+import math
+import time
+import re
+
+logger = logging.getLogger(__name__)
+
+# Keeps finance identifiers whole: "80c", "rbi/2023-24/12", "u/s", "6.50", "nifty50"
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[./\-][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "what which who how why when where does do can i you".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercases and splits text into BM25 terms. Compound identifiers are indexed
+    both whole and by their parts, so "RBI/2023-24/12" also matches "2023-24".
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if any(sep in token for sep in "./-"):
+            tokens.extend(part for part in re.split(r"[./\-]", token) if part and part not in STOPWORDS)
+    return tokens
+
+class LexicalIndex:
+    """
+    Incrementally updated BM25 (Okapi) index persisted as a pickle.
+
+    The pickle belongs to one process: chunks are added once they are written to the
+    vector store, by the process that wrote them. Several API workers writing their own
+    copies to the same LEXICAL_INDEX_PATH would overwrite each other's changes; run
+    them with the indexer service (INDEX_WRITER_MODE=service) instead. There the indexer
+    owns the file and saves it before publishing each generation, and workers keep a
+    read_only copy that reloads the file when the generation changes.
+
+    rank_bm25 recomputes its statistics over the whole corpus on construction, so this
+    keeps postings, document frequencies and lengths itself and scores only the postings
+    of the query terms.
+    """
+    def __init__(self, path: str = None, k1: float = 1.5, b: float = 0.75, read_only: bool = False):
+        self.path = Path(path or config.LEXICAL_INDEX_PATH)
+        self.read_only = read_only
+        self.generation = None  # (epoch, generation) of the indexer state a read_only copy was loaded at
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.RLock()
+        self.postings = {}  # term -> {chunk id: term frequency}
+        self.doc_lengths = {}  # chunk id -> number of terms
+        self.docs = {}  # chunk id -> (text, metadata)
+        self.total_length = 0
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, ids: List[str], documents: List[Document]):
+        with self.lock:
+            for doc_id, doc in zip(ids, documents):
+                if doc_id in self.doc_lengths:
+                    self._remove(doc_id)
+                terms = Counter(tokenize(doc.page_content))
+                for term, tf in terms.items():
+                    self.postings.setdefault(term, {})[doc_id] = tf
+                length = sum(terms.values())
+                self.doc_lengths[doc_id] = length
+                self.total_length += length
+                self.docs[doc_id] = (doc.page_content, dict(doc.metadata))
+            self.dirty = True
+
+    def remove(self, ids: List[str]):
+        with self.lock:
+            for doc_id in ids:
+                if doc_id in self.doc_lengths:
+                    self._remove(doc_id)
+            self.dirty = True
+
+    def _remove(self, doc_id: str):
+        text, _ = self.docs.pop(doc_id)
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """
+        Returns the top-k (document, BM25 score) pairs for the query.
+        """
+        if self.read_only:
+            self.reload_if_stale()
+        with self.lock:
+            n = len(self.doc_lengths)
+            if n == 0 or k <= 0:
+                return []
+            avg_length = self.total_length / n
+            scores = {}
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log((n - df + 0.5) / (df + 0.5) + 1.0)
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            top = heapq.nlargest(k, scores.items(), key=lambda x: x[1])
+            return [
+                (Document(page_content=self.docs[doc_id][0], metadata=dict(self.docs[doc_id][1]), id=doc_id), score)
+                for doc_id, score in top
+            ]
+
+    def reload_if_stale(self):
+        """
+        Reloads a read_only copy once this process's store view has moved to a new indexer
+        generation; the indexer saves the file before publishing one.
+        """
+        state = db_service.refresh_if_stale()
+        generation = (state.get("epoch"), state.get("generation"))
+        if generation == self.generation:
+            return
+        self.generation = generation  # other threads keep searching the old copy meanwhile
+        self.load()
+
+    def save(self):
+        if self.read_only:
+            return
+        with self.lock:
+            if not self.dirty:
+                return
+            state = (self.postings, self.doc_lengths, self.docs, self.total_length)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp_path.replace(self.path)
+            self.dirty = False
+        logger.info(f"Saved lexical index ({len(self)} chunks) to {self.path}")
+
+    def load(self) -> bool:
+        if not self.path.exists():
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                postings, doc_lengths, docs, total_length = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Could not load lexical index from {self.path}: {e}")
+            return False
+        with self.lock:
+            self.postings, self.doc_lengths, self.docs, self.total_length = postings, doc_lengths, docs, total_length
+            self.dirty = False
+        logger.info(f"Loaded lexical index ({len(self)} chunks) from {self.path}")
+        return True
+
+    def start_autosave(self, interval: float):
+        """
+        Saves the index every interval seconds when it has changed, and once more at exit.
+        """
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.save()
+                except Exception as e:
+                    logger.error(f"Saving lexical index failed: {e}")
+
+        threading.Thread(target=loop, name="lexical-autosave", daemon=True).start()
+        atexit.register(self.save)
+
+    def rebuild(self, chunks):
+        """
+        Rebuilds the index from (id, text, metadata) triples, e.g. a scan of the vector store.
+        """
+        with self.lock:
+            self.postings, self.doc_lengths, self.docs, self.total_length = {}, {}, {}, 0
+            for doc_id, text, metadata in chunks:
+                self.add([doc_id], [Document(page_content=text, metadata=metadata or {})])
+            self.dirty = True
+
+def open_lexical_index() -> LexicalIndex:
+    """
+    Loads the persisted index, or builds it from the vector store on first use. API
+    workers of the indexer service get a read-only copy of the indexer's file.
+    """
+    if config.INDEX_WRITER_MODE == "service":
+        index = LexicalIndex(read_only=True)
+        state = db_service.refresh_if_stale()
+        index.generation = (state.get("epoch"), state.get("generation"))
+        if not index.load():
+            logger.info("No lexical index file from the indexer yet; building a copy from the vector store")
+            index.rebuild(db_service.iter_chunks())
+        return index
+
+    index = LexicalIndex()
+    if not index.load():
+        logger.info("Building lexical index from the vector store")
+        index.rebuild(db_service.iter_chunks())
+        index.save()
+    index.start_autosave(config.LEXICAL_SAVE_INTERVAL)
+    return index
+
+# Loaded (or rebuilt from the vector store) on first use or by the start-up warm-up
+lexical_index = LazyResource("lexical_index", open_lexical_index)
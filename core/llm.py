@@ -1,23 +1,305 @@
-from langchain_community.llms import Ollama
 from core.config import config
+from core.resources import LazyResource
+from core.context import estimate_tokens
+from core.cache import response_cache
+from core.llm_gateway import LLMGateway, LLMUnavailableError
+from typing import List, Tuple
+import threading
+import hashlib
+import logging
+import time
 
-from langchain_google_genai import ChatGoogleGenerativeAI
+logger = logging.getLogger(__name__)
+
+# Static prefix of every answer prompt. Kept separate from the per-request context and
+# question so providers can cache it instead of re-processing it on every call.
+SYSTEM_PROMPT = """You are FinanceRAG — a domain-restricted financial AI assistant.
+
+Your responsibilities and restrictions are as follows:
+
+1. DOMAIN RESTRICTION
+   - You must answer ONLY finance-related queries.
+   - If the user asks anything outside finance, respond:
+     "I can answer only finance-related questions as I am FinanceRAG."
+   - Do not engage in personal, medical, entertainment, or unrelated topics.
+
+2. DEFAULT GEOGRAPHY: INDIA
+   - All answers MUST default to the Indian financial context:
+       * RBI, SEBI, IRDAI, MoF, GST, ITR, NBFC, banking rules
+       * Indian credit, collections, risk, lending, fintech
+       * Indian capital markets and macroeconomics
+   - Provide global/western/worldwide information only when the user explicitly asks.
+
+3. RAG-FIRST REQUIREMENT
+   - ALWAYS rely on retrieved documents first (vector search results, PDF chunks, websites).
+   - Cite retrieved chunks when used.
+   - If retrieval returns no relevant evidence, say:
+     "No relevant documents were retrieved; giving general financial knowledge."
+   - Never hallucinate circulars, regulatory numbers, or financial data.
+
+4. INCLUDE LATEST NEWS
+   - Whenever answering, also search for and include the **latest verified financial news** 
+     relevant to the user's question (e.g., RBI policy updates, SEBI circulars, market news).
+   - Summarize news crisply and clearly.
+   - Only include news that is actually relevant.
+
+5. FORMATTED OUTPUT (MANDATORY)
+   - Structure every answer using this format:
+
+     **A. Summary (2–4 bullet points)**  
+     **B. Detailed Explanation**  
+        - Concepts  
+        - Regulations  
+        - Examples (Indian context first)  
+     **C. Insights from Latest News**  
+     **D. Final Verdict / Personal Note / TL;DR (1–2 lines)**  
+
+   - Use clean bullet points, tables, and headings when needed.
+   - No long paragraphs. Be precise and analytical.
+
+6. STYLE RULES
+   - Professional, concise, factual.
+   - Clearly differentiate:
+       * Regulatory requirement
+       * Industry practice
+       * General knowledge
+   - Avoid emotional tone except in the final personal note.
+
+7. WHAT TO DO WHEN ANSWER ISN'T POSSIBLE
+   - If the query is unclear, ask a clarification.
+   - If the query is outside finance, politely refuse.
+   - If data/retrieval is missing, state assumptions explicitly.
+
+8. ABSOLUTELY NO HALLUCINATIONS
+   - Do not invent laws, circulars, statistics, or timelines.
+   - If unsure, say so directly.
+
+Your goal is to be:
+- Accurate  
+- India-default  
+- RAG-grounded  
+- Well-formatted  
+- News-aware  
+- Easy to read (TL;DR at end)
+
+Always follow this behavior with zero deviation."""
+
+def prefix_key(system_prompt: str, model: str = None) -> str:
+    return hashlib.sha256(f"{model or config.LLM_MODEL}\x00{system_prompt}".encode("utf-8")).hexdigest()
+
+def response_text(response) -> str:
+    """
+    Extracts the answer text from the different LLM response formats.
+    """
+    # Handle different response formats
+    if hasattr(response, 'content'):
+        content = response.content
+
+        # If content is a list (new Gemini format), extract text
+        if isinstance(content, list):
+            text_parts = []
+            for part in content:
+                if isinstance(part, dict) and part.get('type') == 'text':
+                    text_parts.append(part.get('text', ''))
+                elif isinstance(part, str):
+                    text_parts.append(part)
+            return '\n'.join(text_parts)
+
+        # If content is a string, return it directly
+        return content
+
+    # Fallback for other response types
+    return str(response)
+
+class LLMProvider:
+    """
+    One LLM backend. generate() takes the static system prefix and the per-request
+    prompt separately, so the provider can keep the prefix cached between calls.
+    Returns (response, usage); the response is whatever the underlying client returns.
+    """
+    name = "base"
+
+    def __init__(self, model: str = None):
+        self.model = model or config.LLM_MODEL
+        self.llm = None  # the plain LangChain model, for callers that build their own prompts
+        self.calls = 0
+        self.prefix_hits = 0
+
+    def generate(self, system_prompt: str, prompt: str) -> Tuple[object, dict]:
+        raise NotImplementedError
+
+    def invoke(self, prompt: str):
+        return self.generate("", prompt)[0]
+
+    def stats(self) -> dict:
+        return {"provider": self.name, "calls": self.calls, "prefix_cache_hits": self.prefix_hits}
+
+class GeminiProvider(LLMProvider):
+    """
+    Gemini with explicit context caching: the system prompt is stored once as cached
+    content (LLM_PREFIX_CACHE_TTL) and requests only send the context and question.
+    A prefix below the model's minimum cacheable size (LLM_PREFIX_CACHE_MIN_TOKENS)
+    is never sent to the cache API; the system prompt goes with each request. If
+    creating a cache fails otherwise (model without caching support), the prompt is
+    sent with each request too and creation is retried later.
+    """
+    name = "gemini"
+    RETRY_AFTER = 600
+
+    def __init__(self, model: str = None):
+        super().__init__(model)
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        self.chat_class = ChatGoogleGenerativeAI
+        self.llm = ChatGoogleGenerativeAI(model=self.model, google_api_key=config.GOOGLE_API_KEY, temperature=0)
+        self.lock = threading.Lock()
+        self.cached_llm = None
+        self.cached_key = None
+        self.cache_expires = 0.0
+        self.retry_at = 0.0
+        self.too_small = set()  # prefix keys below the minimum cacheable size
+
+    def _cached_llm(self, system_prompt: str):
+        if not config.LLM_PREFIX_CACHE or not system_prompt:
+            return None
+        key = prefix_key(system_prompt, self.model)
+        if key in self.too_small:
+            return None
+        with self.lock:
+            now = time.time()
+            if self.cached_key == key and now < self.cache_expires - 60:
+                return self.cached_llm
+            if estimate_tokens(system_prompt) < config.LLM_PREFIX_CACHE_MIN_TOKENS:
+                logger.info(f"System prompt (~{estimate_tokens(system_prompt)} tokens) is below Gemini's minimum "
+                            f"cacheable size of {config.LLM_PREFIX_CACHE_MIN_TOKENS}; not caching it")
+                self.too_small.add(key)
+                return None
+            if now < self.retry_at:
+                return None
+            try:
+                from google import genai
+                from google.genai import types
+                client = genai.Client(api_key=config.GOOGLE_API_KEY)
+                cache = client.caches.create(model=self.model, config=types.CreateCachedContentConfig(
+                    system_instruction=system_prompt,
+                    ttl=f"{config.LLM_PREFIX_CACHE_TTL}s",
+                    display_name="financerag-system-prompt"
+                ))
+            except Exception as e:
+                logger.warning(f"Gemini context cache unavailable ({e}); sending the system prompt with each request")
+                self.retry_at = now + self.RETRY_AFTER
+                return None
+            self.cached_llm = self.chat_class(model=self.model, google_api_key=config.GOOGLE_API_KEY,
+                                              temperature=0, cached_content=cache.name)
+            self.cached_key = key
+            self.cache_expires = now + config.LLM_PREFIX_CACHE_TTL
+            logger.info(f"Cached the system prompt as {cache.name}")
+            return self.cached_llm
+
+    def generate(self, system_prompt, prompt):
+        from langchain_core.messages import HumanMessage, SystemMessage
+        self.calls += 1
+        cached_llm = self._cached_llm(system_prompt)
+        if cached_llm is not None:
+            self.prefix_hits += 1
+            response = cached_llm.invoke([HumanMessage(content=prompt)])
+        else:
+            messages = ([SystemMessage(content=system_prompt)] if system_prompt else []) + [HumanMessage(content=prompt)]
+            response = self.llm.invoke(messages)
+
+        usage = {"prefix_cached": cached_llm is not None}
+        metadata = getattr(response, "usage_metadata", None)
+        if metadata:
+            usage["llm_input_tokens"] = metadata.get("input_tokens")
+            usage["llm_output_tokens"] = metadata.get("output_tokens")
+            usage["llm_cached_tokens"] = (metadata.get("input_token_details") or {}).get("cache_read")
+        return response, usage
+
+class OllamaProvider(LLMProvider):
+    """
+    Ollama keeps the KV cache of the previous prompt and reuses its longest common
+    prefix, as long as the model stays loaded. The system prompt is therefore always
+    sent first and byte-identical, and keep_alive (OLLAMA_KEEP_ALIVE) stops the model
+    from being unloaded between requests.
+    """
+    name = "ollama"
+
+    def __init__(self, model: str = None):
+        super().__init__(model)
+        from langchain_community.llms import Ollama
+        # Temperature 0 like Gemini: cached responses assume the answer is reproducible
+        self.llm = Ollama(base_url=config.OLLAMA_BASE_URL, model=self.model, keep_alive=config.OLLAMA_KEEP_ALIVE,
+                          temperature=0)
+
+    def generate(self, system_prompt, prompt):
+        self.calls += 1
+        text = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+        return self.llm.invoke(text), {"prefix_cached": None}  # reuse happens inside Ollama, unreported
+
+PROVIDERS = {"gemini": GeminiProvider, "ollama": OllamaProvider}
+
+def create_provider(name: str = None, model: str = None) -> LLMProvider:
+    name = (name or config.LLM_PROVIDER).lower()
+    return PROVIDERS.get(name, OllamaProvider)(model)
+
+def create_fallback_provider() -> LLMProvider:
+    return create_provider(config.LLM_FALLBACK_PROVIDER, config.LLM_FALLBACK_MODEL)
 
 class LLMService:
     def __init__(self):
-        if config.LLM_PROVIDER == "gemini":
-            self.llm = ChatGoogleGenerativeAI(
-                model=config.LLM_MODEL,
-                google_api_key=config.GOOGLE_API_KEY,
-                temperature=0
-            )
-        else:
-            self.llm = Ollama(
-                base_url=config.OLLAMA_BASE_URL,
-                model=config.LLM_MODEL
-            )
+        # The clients are created on first use; no dummy call is made, as that would cost a request
+        self.provider = LazyResource("llm", create_provider)
+        self.fallback = (LazyResource("llm_fallback", create_fallback_provider, required=False)
+                         if config.LLM_FALLBACK_PROVIDER else None)
+        self.gateway = LLMGateway(self.provider, self.fallback)
+
+    def get_provider(self) -> LLMProvider:
+        return self.provider.get()
 
     def get_llm(self):
-        return self.llm
+        return self.get_provider().llm
+
+    def cached_response(self, fingerprint: List[str], system_prompt: str = SYSTEM_PROMPT):
+        """(text, usage) of an earlier answer to the same request, or None"""
+        if not response_cache.enabled:
+            return None
+        return response_cache.get(response_cache.key(system_prompt, fingerprint))
+
+    def generate(self, prompt: str, system_prompt: str = SYSTEM_PROMPT, timeout: float = None,
+                 fingerprint: List[str] = None) -> Tuple[object, dict]:
+        """
+        Sends the static system prefix and the per-request prompt, letting the provider cache the prefix.
+        Goes through the gateway (deadline, retries, fallback); raises LLMUnavailableError if no
+        provider answered in time.
+
+        Answers are cached under fingerprint, or the exact prompt when none is given; a cached
+        answer is returned as text with usage["response_cached"] set. Answers from the fallback
+        provider are not cached.
+        """
+        return self.generate_all([prompt], system_prompt, timeout, [fingerprint])[0]
+
+    def generate_all(self, prompts: List[str], system_prompt: str = SYSTEM_PROMPT, timeout: float = None,
+                     fingerprints: List[List[str]] = None) -> List[Tuple[object, dict]]:
+        """
+        Like generate() for several prompts sharing the system prefix; the uncached ones run
+        concurrently, so the wall-clock time is that of the slowest call.
+        """
+        fingerprints = fingerprints or [None] * len(prompts)
+        keys = [response_cache.key(system_prompt, fingerprint or [prompt]) if response_cache.enabled else None
+                for prompt, fingerprint in zip(prompts, fingerprints)]
+        results = [None] * len(prompts)
+        for i, key in enumerate(keys):
+            cached = response_cache.get(key) if key is not None else None
+            if cached is not None:
+                text, usage = cached
+                results[i] = (text, {**usage, "response_cached": True})
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            answers = self.gateway.generate_all(system_prompt, [prompts[i] for i in missing], timeout)
+            for i, (response, usage) in zip(missing, answers):
+                if keys[i] is not None and not usage.get("fallback"):
+                    response_cache.put(keys[i], response_text(response), usage)
+                results[i] = (response, {**usage, "response_cached": False})
+        return results
 
 llm_service = LLMService()
@@ -0,0 +1,230 @@
+from core.config import config
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+import threading
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+class LLMUnavailableError(Exception):
+    """No provider produced an answer within the deadline."""
+
+class ProviderSlot:
+    """
+    A provider with its own concurrency limit, thread pool and circuit breaker: after
+    LLM_BREAKER_FAILURES consecutive failures it is skipped for LLM_BREAKER_COOLDOWN_S.
+
+    A call holds its slot until the provider thread actually returns, not until the
+    caller stops waiting, so calls abandoned on timeout still count against the limit
+    and cannot pile up, and they never hold up another provider.
+    """
+    def __init__(self, resource, max_concurrency: int):
+        self.resource = resource  # LazyResource of an LLMProvider
+        self.max_concurrency = max_concurrency
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"llm-{resource.name}")
+        self.semaphore = None  # created on the gateway's loop
+        self.in_flight = 0
+        self.failures = 0
+        self.open_until = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.wins = 0
+
+    @property
+    def name(self) -> str:
+        return self.resource.name
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+    def run(self, system_prompt: str, prompt: str):
+        """Executor job: loading the client is part of the call and of its timeout"""
+        provider = self.resource.get()
+        response, usage = provider.generate(system_prompt, prompt)
+        return response, {**usage, "provider": f"{provider.name}/{provider.model}"}
+
+    def release(self):
+        """Runs on the gateway loop when a provider thread returns"""
+        self.in_flight -= 1
+        self.semaphore.release()
+
+    def record(self, ok: bool):
+        if ok:
+            self.failures = 0
+            return
+        self.errors += 1
+        self.failures += 1
+        if self.failures >= config.LLM_BREAKER_FAILURES and self.available:
+            self.open_until = time.monotonic() + config.LLM_BREAKER_COOLDOWN_S
+            logger.warning(f"{self.name}: {self.failures} consecutive failures, skipping it for "
+                           f"{config.LLM_BREAKER_COOLDOWN_S}s")
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "errors": self.errors, "answered": self.wins,
+                "circuit_open": not self.available, "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency}
+
+class LLMGateway:
+    """
+    Runs LLM calls on its own asyncio event loop thread, so request threads and the
+    API's loop only wait on a future. Every call gets an overall deadline; attempts are
+    retried with jittered exponential backoff; each provider has a concurrency limit.
+    With a fallback provider, a primary call that has not answered after
+    LLM_HEDGE_AFTER_S is hedged with a fallback call (first answer wins), and primary
+    errors go straight to the fallback; the hedge starts no later than halfway to the
+    deadline. Provider clients are blocking, so attempts run in each provider's own
+    thread pool; an attempt that times out is abandoned, and its slot stays busy until
+    its thread returns. The caller never waits past the deadline.
+    """
+    def __init__(self, primary, fallback=None):
+        self.primary = ProviderSlot(primary, config.LLM_MAX_CONCURRENCY)
+        self.fallback = ProviderSlot(fallback, config.LLM_FALLBACK_MAX_CONCURRENCY) if fallback is not None else None
+        self.lock = threading.Lock()
+        self.loop = None
+        self.hedged = 0
+
+    def _ensure_loop(self):
+        with self.lock:
+            if self.loop is not None:
+                return self.loop
+            slots = [s for s in (self.primary, self.fallback) if s is not None]
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+
+            async def create_semaphores():
+                for slot in slots:
+                    slot.semaphore = asyncio.Semaphore(slot.max_concurrency)
+            asyncio.run_coroutine_threadsafe(create_semaphores(), loop).result()
+            self.loop = loop
+            return loop
+
+    async def _attempt(self, slot: ProviderSlot, system_prompt: str, prompt: str):
+        loop = asyncio.get_running_loop()
+        await slot.semaphore.acquire()
+        try:
+            future = slot.executor.submit(slot.run, system_prompt, prompt)
+        except BaseException:
+            slot.semaphore.release()
+            raise
+        slot.calls += 1
+        slot.in_flight += 1
+        # Released when the thread returns, even if this attempt has timed out by then
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(slot.release))
+        return await asyncio.wrap_future(future)
+
+    async def _call(self, slot: ProviderSlot, system_prompt: str, prompt: str, deadline: float):
+        """One provider, retried with full-jitter exponential backoff until the deadline"""
+        last_error = None
+        for attempt in range(config.LLM_MAX_RETRIES + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                # The timeout covers waiting for a free slot and loading the client too
+                response, usage = await asyncio.wait_for(self._attempt(slot, system_prompt, prompt),
+                                                         min(config.LLM_ATTEMPT_TIMEOUT_S, remaining))
+                slot.record(True)
+                return response, {**usage, "attempts": attempt + 1}
+            except Exception as e:
+                last_error = e if not isinstance(e, asyncio.TimeoutError) else TimeoutError("attempt timed out")
+                slot.record(False)
+                logger.warning(f"{slot.name} attempt {attempt + 1} failed: {last_error!r}")
+                if attempt == config.LLM_MAX_RETRIES or not slot.available:
+                    break
+                backoff = random.uniform(0, config.LLM_RETRY_BASE_MS / 1000 * 2 ** attempt)
+                await asyncio.sleep(min(backoff, max(deadline - time.monotonic(), 0)))
+        raise LLMUnavailableError(f"{slot.name}: {last_error!r}")
+
+    async def _generate(self, system_prompt: str, prompt: str, timeout: float):
+        deadline = time.monotonic() + timeout
+        fallback = self.fallback if self.fallback is not None and self.fallback.available else None
+        if not self.primary.available:
+            if fallback is None:
+                raise LLMUnavailableError(f"{self.primary.name} is failing and no fallback is available")
+            return await self._finish(fallback, self._call(fallback, system_prompt, prompt, deadline))
+
+        primary = asyncio.ensure_future(self._call(self.primary, system_prompt, prompt, deadline))
+        tasks = {primary: self.primary}
+        try:
+            if fallback is None:
+                return await self._finish(self.primary, primary)
+
+            # Hedge early enough for the fallback to answer within the deadline
+            hedge_after = min(config.LLM_HEDGE_AFTER_S, timeout / 2) if config.LLM_HEDGE_AFTER_S > 0 else None
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+            if done and primary.exception() is None:
+                return await self._finish(self.primary, primary)
+
+            # The primary failed, or is slow: race the fallback against it
+            errors = []
+            if done:
+                errors.append(primary.exception())
+                tasks.pop(primary)
+            else:
+                self.hedged += 1
+                logger.info(f"{self.primary.name} slower than {hedge_after}s; hedging with {fallback.name}")
+            tasks[asyncio.ensure_future(self._call(fallback, system_prompt, prompt, deadline))] = fallback
+            while tasks:
+                finished, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    slot = tasks.pop(task)
+                    if task.exception() is None:
+                        return await self._finish(slot, task)
+                    errors.append(task.exception())
+            raise LLMUnavailableError("; ".join(str(e) for e in errors))
+        finally:
+            # The losing call, or all of them when the caller's deadline hits
+            for task in tasks:
+                task.cancel()
+
+    async def _bounded(self, system_prompt: str, prompt: str, timeout: float):
+        """_generate under a hard deadline, whatever the retries and hedges are doing"""
+        try:
+            return await asyncio.wait_for(self._generate(system_prompt, prompt, timeout), timeout)
+        except asyncio.TimeoutError:
+            raise LLMUnavailableError(f"no provider answered within {timeout}s") from None
+
+    async def _finish(self, slot: ProviderSlot, call):
+        response, usage = await call
+        slot.wins += 1
+        return response, {**usage, "fallback": slot is self.fallback}
+
+    def generate(self, system_prompt: str, prompt: str, timeout: float = None) -> Tuple[object, dict]:
+        """
+        Blocking entry point for request threads. Raises LLMUnavailableError when no
+        provider answered within timeout (LLM_TIMEOUT_S by default).
+        """
+        loop = self._ensure_loop()
+        timeout = timeout or config.LLM_TIMEOUT_S
+        future = asyncio.run_coroutine_threadsafe(self._bounded(system_prompt, prompt, timeout), loop)
+        return future.result()
+
+    def generate_all(self, system_prompt: str, prompts: List[str], timeout: float = None) -> List[Tuple[object, dict]]:
+        """
+        Runs several prompts concurrently under the same deadline, each with its own retries
+        and fallback; raises LLMUnavailableError if any of them gets no answer.
+        """
+        loop = self._ensure_loop()
+        timeout = timeout or config.LLM_TIMEOUT_S
+
+        async def gather():
+            return await asyncio.gather(*(self._bounded(system_prompt, prompt, timeout) for prompt in prompts))
+        return asyncio.run_coroutine_threadsafe(gather(), loop).result()
+
+    async def agenerate(self, system_prompt: str, prompt: str, timeout: float = None) -> Tuple[object, dict]:
+        """Awaitable entry point for code running on another event loop (e.g. FastAPI handlers)"""
+        loop = self._ensure_loop()
+        timeout = timeout or config.LLM_TIMEOUT_S
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(self._bounded(system_prompt, prompt, timeout), loop)
+        )
+
+    def stats(self) -> dict:
+        providers = {self.primary.name: self.primary.stats()}
+        if self.fallback is not None:
+            providers[self.fallback.name] = self.fallback.stats()
+        return {"providers": providers, "hedged": self.hedged}
@@ -0,0 +1,189 @@
+from core.database import db_service
+from core.index_writer import index_writer
+from core.lexical import lexical_index
+from core.partitions import period_end
+from core.config import config
+from pathlib import Path
+from typing import List
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 5000
+SECONDS_PER_DAY = 86400
+
+class IndexMaintenance:
+    """
+    Lifecycle management for the vector store: TTL expiry per source type,
+    a size cap with least-recently-retrieved eviction, and HNSW compaction.
+    """
+    def __init__(self):
+        self.access_times = {}  # chunk id -> last retrieval time, flushed to metadata in batches
+        self.lock = threading.Lock()
+        self.scheduler = None
+
+    def retention_days(self, source_type: str) -> int:
+        return {
+            "news": config.RETENTION_DAYS_NEWS,
+            "regulatory": config.RETENTION_DAYS_REGULATORY,
+        }.get(source_type, config.RETENTION_DAYS_WEB)
+
+    def record_access(self, ids: List[str]):
+        if config.INDEX_WRITER_MODE == "service":
+            # Metadata writes belong to the indexer process
+            try:
+                index_writer.record_access(ids)
+            except Exception as e:
+                logger.warning(f"Could not forward retrieval times to the indexer: {e}")
+            return
+        now = int(time.time())
+        with self.lock:
+            for doc_id in ids:
+                if doc_id:
+                    self.access_times[doc_id] = now
+
+    def flush_access(self):
+        """
+        Writes buffered retrieval times into chunk metadata as last_retrieved_at.
+        """
+        with self.lock:
+            access_times, self.access_times = self.access_times, {}
+        db_service.update_metadata({doc_id: {"last_retrieved_at": ts} for doc_id, ts in access_times.items()})
+
+    def _scan(self):
+        for doc_id, _, metadata in db_service.iter_chunks(PAGE_SIZE):
+            yield doc_id, metadata
+
+    def _delete(self, ids: List[str]):
+        db_service.delete(ids)
+        lexical_index.get().remove(ids)
+
+    def drop_expired_partitions(self, now: int) -> List[str]:
+        """
+        Drops monthly partitions that are entirely past the longest retention.
+        Only possible when every source type has a finite retention.
+        """
+        retentions = [config.RETENTION_DAYS_NEWS, config.RETENTION_DAYS_REGULATORY, config.RETENTION_DAYS_WEB]
+        if min(retentions) <= 0:
+            return []
+        cutoff = now - max(retentions) * SECONDS_PER_DAY
+        dropped = []
+        for name, info in db_service.list_partitions():
+            if info["period"] and period_end(info["period"]) < cutoff:
+                ids = [doc_id for doc_id, _, _ in db_service.iter_partition(name, PAGE_SIZE)]
+                db_service.drop_partition(name)
+                lexical_index.get().remove(ids)
+                dropped.append(name)
+        return dropped
+
+    def enforce_retention(self):
+        """
+        Drops whole expired partitions, deletes chunks older than their source type's
+        retention and, if the store is still above INDEX_MAX_CHUNKS, the least recently
+        retrieved ones. Chunks indexed before scrape timestamps existed are stamped with
+        the current time.
+        """
+        self.flush_access()
+        now = int(time.time())
+        dropped = self.drop_expired_partitions(now)
+        expired, survivors, unstamped = [], [], []
+
+        for doc_id, metadata in self._scan():
+            metadata = metadata or {}
+            scraped_at = metadata.get("scraped_at")
+            if scraped_at is None:
+                unstamped.append(doc_id)
+                scraped_at = now
+            days = self.retention_days(metadata.get("source_type", "web"))
+            if days > 0 and now - scraped_at > days * SECONDS_PER_DAY:
+                expired.append(doc_id)
+            else:
+                survivors.append((metadata.get("last_retrieved_at", scraped_at), doc_id))
+
+        db_service.update_metadata({doc_id: {"scraped_at": now} for doc_id in unstamped})
+
+        evicted = []
+        if config.INDEX_MAX_CHUNKS and len(survivors) > config.INDEX_MAX_CHUNKS:
+            survivors.sort()
+            evicted = [doc_id for _, doc_id in survivors[:len(survivors) - config.INDEX_MAX_CHUNKS]]
+
+        self._delete(expired + evicted)
+        logger.info(f"Retention: dropped {len(dropped)} partitions, expired {len(expired)}, "
+                    f"evicted {len(evicted)}, stamped {len(unstamped)} chunks")
+        return {"dropped_partitions": dropped, "expired": len(expired),
+                "evicted": len(evicted), "stamped": len(unstamped)}
+
+    def compact(self):
+        started = time.time()
+        copied = {name: db_service.compact_partition(name) for name, _ in db_service.list_partitions()}
+        elapsed = time.time() - started
+        logger.info(f"Compacted {len(copied)} collections ({sum(copied.values())} chunks) in {elapsed:.1f}s")
+        return {"chunks": copied, "seconds": round(elapsed, 2)}
+
+    def stats(self):
+        """
+        Store size, age and source-type breakdown, plus memory and disk footprint estimates.
+        """
+        by_type = {}
+        oldest, newest = None, None
+        for _, metadata in self._scan():
+            metadata = metadata or {}
+            source_type = metadata.get("source_type", "unknown")
+            by_type[source_type] = by_type.get(source_type, 0) + 1
+            scraped_at = metadata.get("scraped_at")
+            if scraped_at is not None:
+                oldest = scraped_at if oldest is None else min(oldest, scraped_at)
+                newest = scraped_at if newest is None else max(newest, scraped_at)
+
+        partitions, memory = {}, {}
+        for name, _ in db_service.list_partitions():
+            memory[name] = db_service.get_partition(name).memory_report()
+            partitions[name] = memory[name]["chunks"]
+        store_dir = config.CHROMA_DB_DIR if config.VECTOR_BACKEND == "chroma" else config.NUMPY_STORE_DIR
+        disk_bytes = sum(f.stat().st_size for f in Path(store_dir).rglob("*") if f.is_file())
+
+        return {
+            "collection": config.COLLECTION_NAME,
+            "chunks": sum(partitions.values()),
+            "partitions": partitions,
+            "by_source_type": by_type,
+            "oldest_scraped_at": oldest,
+            "newest_scraped_at": newest,
+            "backend": config.VECTOR_BACKEND,
+            "memory": memory,
+            "disk_bytes": disk_bytes,
+            "max_chunks": config.INDEX_MAX_CHUNKS,
+        }
+
+    def run(self, compact: bool = False):
+        if config.INDEX_WRITER_MODE == "service":
+            return index_writer.run_maintenance(compact)
+        result = {"retention": self.enforce_retention()}
+        if compact:
+            result["compaction"] = self.compact()
+        return result
+
+    def start_scheduler(self):
+        """
+        Runs retention periodically when INDEX_MAINTENANCE_INTERVAL_MINUTES is set.
+        """
+        interval = config.INDEX_MAINTENANCE_INTERVAL_MINUTES * 60
+        if config.INDEX_WRITER_MODE == "service":
+            return  # scheduled in the indexer process
+        if interval <= 0 or (self.scheduler and self.scheduler.is_alive()):
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.run()
+                except Exception as e:
+                    logger.error(f"Scheduled index maintenance failed: {e}")
+
+        self.scheduler = threading.Thread(target=loop, name="index-maintenance", daemon=True)
+        self.scheduler.start()
+
+index_maintenance = IndexMaintenance()
@@ -0,0 +1,172 @@
+from langchain_core.embeddings import Embeddings
+from pathlib import Path
+from typing import List
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+def export_onnx_model(model_name: str, cache_dir: str, task: str = "feature-extraction", quantize: bool = True):
+    """
+    Exports a HuggingFace model to ONNX (optionally int8 dynamic-quantized) and caches it on disk.
+    Returns the model directory and the path of the .onnx file to load.
+    """
+    target_dir = Path(cache_dir) / model_name.replace("/", "__")
+    model_file = target_dir / ("model_quantized.onnx" if quantize else "model.onnx")
+    if model_file.exists():
+        return target_dir, model_file
+
+    # optimum is only needed for the one-off export, not at inference time
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    logger.info(f"Exporting {model_name} to ONNX in {target_dir}")
+    model_cls = ORTModelForSequenceClassification if task == "text-classification" else ORTModelForFeatureExtraction
+    model = model_cls.from_pretrained(model_name, export=True)
+    model.save_pretrained(target_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(target_dir)
+
+    if quantize:
+        logger.info(f"Quantizing {model_name} to int8")
+        quantizer = ORTQuantizer.from_pretrained(target_dir, file_name="model.onnx")
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=target_dir, quantization_config=qconfig)
+
+    return target_dir, model_file
+
+def create_session(model_file: Path, num_threads: int = 0):
+    """
+    Creates a CPU ONNX Runtime session. num_threads=0 lets ONNX Runtime pick.
+    """
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = num_threads
+    options.inter_op_num_threads = 1
+    return ort.InferenceSession(str(model_file), options, providers=["CPUExecutionProvider"])
+
+def length_bucketed_batches(lengths: List[int], batch_size: int, max_batch_tokens: int) -> List[List[int]]:
+    """
+    Groups item indices into batches of similar token length so padding stays small.
+    A batch is closed when it holds batch_size items or when its padded size
+    (longest item * items) would exceed max_batch_tokens.
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    batches = []
+    current, longest = [], 0
+    for idx in order:
+        padded_longest = max(longest, lengths[idx])
+        if current and (len(current) >= batch_size or padded_longest * (len(current) + 1) > max_batch_tokens):
+            batches.append(current)
+            current, padded_longest = [], lengths[idx]
+        current.append(idx)
+        longest = padded_longest
+    if current:
+        batches.append(current)
+    return batches
+
+def pad_batch(encodings: List[List[int]], pad_token_id: int):
+    """
+    Right-pads a list of token id lists into (input_ids, attention_mask) int64 arrays.
+    """
+    longest = max(len(ids) for ids in encodings)
+    input_ids = np.full((len(encodings), longest), pad_token_id, dtype=np.int64)
+    attention_mask = np.zeros((len(encodings), longest), dtype=np.int64)
+    for row, ids in enumerate(encodings):
+        input_ids[row, :len(ids)] = ids
+        attention_mask[row, :len(ids)] = 1
+    return input_ids, attention_mask
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence-transformers compatible embeddings served by ONNX Runtime on CPU.
+    Mean-pools the last hidden state and L2-normalizes, like all-MiniLM-L6-v2.
+    """
+    def __init__(self, model_name: str, cache_dir: str, num_threads: int = 0, batch_size: int = 32,
+                 max_batch_tokens: int = 8192, max_length: int = 256, quantize: bool = True):
+        from transformers import AutoTokenizer
+
+        model_dir, model_file = export_onnx_model(model_name, cache_dir, "feature-extraction", quantize)
+        self.session = create_session(model_file, num_threads)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_length = max_length
+        logger.info(f"Loaded ONNX embedding model from {model_file}")
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        encodings = self.tokenizer(list(texts), truncation=True, max_length=self.max_length)["input_ids"]
+        lengths = [len(ids) for ids in encodings]
+        output = None
+
+        for batch in length_bucketed_batches(lengths, self.batch_size, self.max_batch_tokens):
+            input_ids, attention_mask = pad_batch([encodings[i] for i in batch], self.tokenizer.pad_token_id)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(input_ids)
+            hidden = self.session.run(None, feeds)[0]
+
+            # Mean pooling over real tokens, then L2 normalization
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+            if output is None:
+                output = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            output[batch] = pooled
+
+        return output
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+class OnnxCrossEncoder:
+    """
+    sentence_transformers.CrossEncoder compatible scorer served by ONNX Runtime on CPU.
+    Pairs are truncated to max_length tokens (longest sequence first, which is the
+    passage for normal queries) and run in length-bucketed batches. predict() returns
+    the raw relevance logits, like the PyTorch ms-marco models.
+    """
+    def __init__(self, model_name: str, cache_dir: str, num_threads: int = 0, batch_size: int = 32,
+                 max_batch_tokens: int = 8192, max_length: int = 256, quantize: bool = True):
+        from transformers import AutoTokenizer
+
+        model_dir, model_file = export_onnx_model(model_name, cache_dir, "text-classification", quantize)
+        self.session = create_session(model_file, num_threads)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_length = max_length
+        logger.info(f"Loaded ONNX cross-encoder from {model_file}")
+
+    def predict(self, pairs) -> np.ndarray:
+        if not len(pairs):
+            return np.zeros(0, dtype=np.float32)
+
+        encoded = self.tokenizer([q for q, _ in pairs], [d for _, d in pairs],
+                                 truncation="longest_first", max_length=self.max_length)
+        encodings = encoded["input_ids"]
+        type_ids = encoded.get("token_type_ids")
+        lengths = [len(ids) for ids in encodings]
+        scores = np.empty(len(pairs), dtype=np.float32)
+
+        for batch in length_bucketed_batches(lengths, self.batch_size, self.max_batch_tokens):
+            input_ids, attention_mask = pad_batch([encodings[i] for i in batch], self.tokenizer.pad_token_id)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = (pad_batch([type_ids[i] for i in batch], 0)[0] if type_ids is not None
+                                           else np.zeros_like(input_ids))
+            logits = self.session.run(None, feeds)[0]
+            scores[batch] = logits[:, 0]
+
+        return scores
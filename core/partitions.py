@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+import re
+
+# Queries asking for the newest information only need the most recent partitions
+RECENCY_PATTERNS = [
+    (re.compile(r"\b(today|yesterday|this week|last week|breaking|right now)\b"), "week"),
+    (re.compile(r"\b(this month|last month)\b"), "month"),
+    (re.compile(r"\b(latest|recent|recently|newest|upcoming)\b"), "recent"),
+    # "current" alone is part of finance terms (current account, current ratio, current
+    # assets), so it only counts next to something that changes over time
+    (re.compile(r"\bcurrent\s+(?:[\w-]+\s+){0,2}?(rates?|prices?|yields?|quarter|month|year|week|status|levels?|"
+                r"trends?|news|situation|outlook|valuations?|inflation|policy|slabs?|limits?)\b"
+                r"|\bcurrently\s+(in|as of|at|trading|running)\b"), "recent"),
+    (re.compile(r"\b(this year|ytd|year to date)\b"), "year"),
+]
+
+def period_of(timestamp: float) -> str:
+    """
+    Monthly partition key ("2025_01") for a Unix timestamp, in UTC.
+    """
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y_%m")
+
+def period_end(period: str) -> float:
+    """
+    Unix timestamp at which a monthly partition stops receiving chunks.
+    """
+    year, month = (int(x) for x in period.split("_"))
+    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return datetime(year, month, 1, tzinfo=timezone.utc).timestamp()
+
+def recent_periods(months: int, now: float = None) -> List[str]:
+    """
+    The current month and the months - 1 before it.
+    """
+    current = datetime.fromtimestamp(now, tz=timezone.utc) if now else datetime.now(timezone.utc)
+    year, month = current.year, current.month
+    periods = []
+    for _ in range(max(months, 1)):
+        periods.append(f"{year:04d}_{month:02d}")
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return periods
+
+def recency_periods(query: str, recent_months: int, now: float = None) -> Optional[List[str]]:
+    """
+    Partitions a query needs to search, or None for all of them.
+    """
+    text = query.lower()
+    for pattern, kind in RECENCY_PATTERNS:
+        if pattern.search(text):
+            if kind == "week" or kind == "month":
+                return recent_periods(2, now)  # covers a week/month that straddles a month boundary
+            if kind == "year":
+                current = datetime.fromtimestamp(now, tz=timezone.utc) if now else datetime.now(timezone.utc)
+                return recent_periods(current.month, now)
+            return recent_periods(recent_months, now)
+    return None
+
+def partition_name(base: str, period: str = None, category: str = None) -> str:
+    """
+    Collection name for a partition: base, base__banking, base__2025_01 or base__banking__2025_01.
+    """
+    return "__".join(part for part in (base, category, period) if part)
+
+def parse_partition(base: str, name: str) -> Optional[dict]:
+    """
+    Returns {"category": ..., "period": ...} for a collection that belongs to base, or None.
+    The unpartitioned base collection has both set to None.
+    """
+    match = re.fullmatch(re.escape(base) + r"(?:__([a-z]+))?(?:__(\d{4}_\d{2}))?", name)
+    if not match or match.group(1) == "compact":
+        return None
+    return {"category": match.group(1), "period": match.group(2)}
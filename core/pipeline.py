@@ -1,4 +1,6 @@
 import logging
+from core.config import config
+from core.routing import domain_guard, DOMAIN_REFUSAL
 from agents.web_search import web_search_agent
 from agents.web_scraper import web_scraper_agent
 from agents.preprocessing import preprocessing_agent
@@ -14,6 +16,17 @@ class FinanceRAGPipeline:
     def run(self, query: str):
         logger.info(f"Starting pipeline for query: {query}")
         
+        # 0. Domain guard: refuse non-finance questions before searching and scraping
+        if config.DOMAIN_GUARD:
+            decision = domain_guard.check(query)
+            if not decision["accepted"]:
+                return {
+                    "answer": DOMAIN_REFUSAL,
+                    "sources": [],
+                    "evaluation": {"score": 0.0, "feedback": ["Query is outside the finance domain."]},
+                    "usage": {"domain_guard": decision}
+                }
+        
         # 1. Web Search
         search_results = web_search_agent.search_web(query)
         logger.info(f"Found {len(search_results)} search results")
@@ -33,16 +46,16 @@ class FinanceRAGPipeline:
         logger.info(f"Scraped and processed {len(all_docs)} chunks")
         
         # 3. Indexing
-        indexing_agent.index_documents(all_docs)
+        fresh_index = indexing_agent.index_documents(all_docs)
         
         # 4. Retrieval
-        retrieved_docs = retrieval_agent.retrieve(query)
+        retrieved_docs = retrieval_agent.retrieve(query, fresh_index=fresh_index)
         
         # 5. Reranking
         reranked_docs = reranker_agent.rerank(query, retrieved_docs)
         
         # 6. Answering
-        answer = answering_agent.generate_answer(query, reranked_docs)
+        answer, usage = answering_agent.answer(query, reranked_docs)
         
         # 7. Evaluation
         eval_result = evaluation_agent.evaluate(query, answer, reranked_docs)
@@ -50,7 +63,8 @@ class FinanceRAGPipeline:
         return {
             "answer": answer,
             "sources": [doc.metadata for doc in reranked_docs],
-            "evaluation": eval_result
+            "evaluation": eval_result,
+            "usage": usage
         }
 
 pipeline = FinanceRAGPipeline()
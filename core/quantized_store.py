@@ -0,0 +1,237 @@
+from core.vector_index import normalize_rows, top_k_indices
+from pathlib import Path
+from typing import List, Tuple
+import numpy as np
+import threading
+import logging
+import shutil
+import json
+import time
+
+logger = logging.getLogger(__name__)
+
+SCAN_BLOCK = 65536  # rows dequantized at a time, to bound the per-query working set
+
+class QuantizedSegmentStore:
+    """
+    Compact vector storage made of immutable, memory-mapped segments.
+
+    Each segment holds scalar-quantized codes (float16, or int8 with a per-vector scale),
+    optionally reduced to fewer dimensions by an uncentered PCA or Matryoshka-style
+    truncation, plus the float32 originals. Searches scan the small codes and re-score
+    only the best k * rescore_factor candidates against the originals, so the exact
+    vectors are paged in on demand. Segment files are opened with mmap, so several
+    worker processes share them through the page cache instead of each holding a copy.
+    """
+    def __init__(self, path: str, dtype: str = "int8", reduction: str = "none", reduced_dim: int = 128,
+                 rescore_factor: int = 4, max_segments: int = 16):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dtype = dtype
+        self.reduction = reduction
+        self.reduced_dim = reduced_dim
+        self.rescore_factor = rescore_factor
+        self.max_segments = max_segments
+        self.lock = threading.RLock()
+        self.segments = []
+        self.deleted = set()  # (segment name, id) tombstones
+        self.manifest_mtime = None
+        self._refresh()
+
+    # -- persistence ---------------------------------------------------------
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.path / "manifest.json"
+
+    def _refresh(self):
+        """
+        Reopens the segment list if another process (or a compaction) changed the manifest.
+        """
+        try:
+            mtime = self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self.manifest_mtime:
+            return
+        manifest = json.loads(self.manifest_path.read_text())
+        with self.lock:
+            self.segments = [self._open_segment(name) for name in manifest["segments"]]
+            self.deleted = {tuple(entry) for entry in manifest.get("deleted", [])}
+            for segment in self.segments:
+                for name, doc_id in self.deleted:
+                    if name == segment["name"]:
+                        segment["dead"][segment["row_of"][doc_id]] = True
+            self.manifest_mtime = mtime
+
+    def _write_manifest(self):
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({
+            "dtype": self.dtype,
+            "reduction": self.reduction,
+            "segments": [segment["name"] for segment in self.segments],
+            "deleted": sorted(list(entry) for entry in self.deleted),
+        }))
+        tmp_path.replace(self.manifest_path)
+        self.manifest_mtime = self.manifest_path.stat().st_mtime_ns
+
+    def _open_segment(self, name: str) -> dict:
+        base = self.path / name
+        ids = json.loads((base.with_suffix(".ids.json")).read_text())
+        segment = {
+            "name": name,
+            "ids": ids,
+            "row_of": {doc_id: row for row, doc_id in enumerate(ids)},
+            "dead": np.zeros(len(ids), dtype=bool),
+            "codes": np.load(base.with_suffix(".codes.npy"), mmap_mode="r"),
+            "full": np.load(base.with_suffix(".full.npy"), mmap_mode="r"),
+            "scale": None,
+            "projection": None,
+        }
+        if base.with_suffix(".scale.npy").exists():
+            segment["scale"] = np.load(base.with_suffix(".scale.npy"), mmap_mode="r")
+        if base.with_suffix(".proj.npy").exists():
+            segment["projection"] = np.load(base.with_suffix(".proj.npy"))
+        return segment
+
+    # -- encoding ------------------------------------------------------------
+
+    def _fit_projection(self, vectors: np.ndarray):
+        """
+        (reduced_dim, dim) projection, or None when no reduction applies to this segment.
+        """
+        dim = vectors.shape[1]
+        if self.reduction == "none" or self.reduced_dim >= dim:
+            return None
+        if self.reduction == "matryoshka":
+            return np.eye(dim, dtype=np.float32)[:self.reduced_dim]
+        if len(vectors) < self.reduced_dim:
+            return None  # too few rows to fit a PCA; keep full dimensionality for this segment
+        # Uncentered PCA keeps dot products approximately intact: q.v ~= (Pq).(Pv)
+        _, _, vt = np.linalg.svd(vectors, full_matrices=False)
+        return vt[:self.reduced_dim].astype(np.float32)
+
+    def _encode(self, vectors: np.ndarray, projection):
+        reduced = vectors if projection is None else vectors @ projection.T
+        if self.dtype == "float16":
+            return reduced.astype(np.float16), None
+        scale = np.clip(np.abs(reduced).max(axis=1), 1e-12, None) / 127.0
+        codes = np.round(reduced / scale[:, None]).astype(np.int8)
+        return codes, scale.astype(np.float32)
+
+    # -- writes --------------------------------------------------------------
+
+    def _write_segment(self, ids: List[str], vectors: np.ndarray) -> dict:
+        name = f"seg_{time.time_ns()}"
+        base = self.path / name
+        projection = self._fit_projection(vectors)
+        codes, scale = self._encode(vectors, projection)
+        np.save(base.with_suffix(".codes.npy"), codes)
+        np.save(base.with_suffix(".full.npy"), vectors.astype(np.float32))
+        if scale is not None:
+            np.save(base.with_suffix(".scale.npy"), scale)
+        if projection is not None:
+            np.save(base.with_suffix(".proj.npy"), projection)
+        base.with_suffix(".ids.json").write_text(json.dumps(list(ids)))
+        return self._open_segment(name)
+
+    def upsert(self, ids: List[str], embeddings):
+        """
+        Appends a segment; older copies of the same ids are tombstoned.
+        """
+        if not ids:
+            return
+        vectors = normalize_rows(embeddings)
+        with self.lock:
+            self._refresh()
+            self._tombstone(set(ids))
+            self.segments.append(self._write_segment(ids, vectors))
+            self._write_manifest()
+            if len(self.segments) > self.max_segments:
+                self.compact()
+
+    def _tombstone(self, ids: set):
+        for segment in self.segments:
+            for doc_id in ids:
+                row = segment["row_of"].get(doc_id)
+                if row is not None and not segment["dead"][row]:
+                    segment["dead"][row] = True
+                    self.deleted.add((segment["name"], doc_id))
+
+    def delete(self, ids: List[str]):
+        with self.lock:
+            self._refresh()
+            self._tombstone(set(ids))
+            self._write_manifest()
+
+    def compact(self):
+        """
+        Merges all segments into one, dropping tombstoned vectors and refitting the reduction.
+        """
+        with self.lock:
+            self._refresh()
+            ids, rows = [], []
+            for segment in self.segments:
+                keep = np.flatnonzero(~segment["dead"])
+                ids.extend(segment["ids"][i] for i in keep)
+                rows.append(np.asarray(segment["full"][keep]))
+            old = self.segments
+            self.segments = [self._write_segment(ids, np.concatenate(rows))] if ids else []
+            self.deleted = set()
+            self._write_manifest()
+            for segment in old:
+                for f in self.path.glob(segment["name"] + ".*"):
+                    f.unlink(missing_ok=True)
+        logger.info(f"Compacted vector segments in {self.path}: {len(ids)} vectors")
+
+    def destroy(self):
+        with self.lock:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.segments, self.deleted = [], set()
+
+    # -- reads ---------------------------------------------------------------
+
+    def __len__(self):
+        self._refresh()
+        return sum(len(segment["ids"]) for segment in self.segments) - len(self.deleted)
+
+    def search(self, query_embedding, k: int) -> List[Tuple[str, float]]:
+        """
+        Approximate scan over the quantized codes, then exact re-scoring of the best
+        k * rescore_factor candidates. Returns (id, cosine similarity), best first.
+        """
+        self._refresh()
+        query = normalize_rows(query_embedding)
+        with self.lock:
+            segments = list(self.segments)
+
+        candidates = []  # (segment, row indices)
+        for segment in segments:
+            reduced = query if segment["projection"] is None else segment["projection"] @ query
+            approx = np.empty(len(segment["ids"]), dtype=np.float32)
+            for start in range(0, len(approx), SCAN_BLOCK):
+                block = np.asarray(segment["codes"][start:start + SCAN_BLOCK], dtype=np.float32)
+                approx[start:start + SCAN_BLOCK] = block @ reduced
+            if segment["scale"] is not None:
+                approx *= segment["scale"]
+            approx[segment["dead"]] = -np.inf
+            rows = top_k_indices(approx, k * self.rescore_factor)
+            rows = rows[np.isfinite(approx[rows])]
+            if len(rows):
+                candidates.append((segment, np.sort(rows)))
+
+        if not candidates:
+            return []
+        ids = [segment["ids"][i] for segment, rows in candidates for i in rows]
+        exact = np.concatenate([np.asarray(segment["full"][rows]) @ query for segment, rows in candidates])
+        return [(ids[j], float(exact[j])) for j in top_k_indices(exact, k)]
+
+    def memory_report(self) -> dict:
+        """
+        Bytes scanned per query (codes) versus bytes only touched for re-scoring (originals).
+        """
+        self._refresh()
+        codes = sum(segment["codes"].nbytes + (segment["scale"].nbytes if segment["scale"] is not None else 0)
+                    for segment in self.segments)
+        full = sum(segment["full"].nbytes for segment in self.segments)
+        return {"vectors": len(self), "segments": len(self.segments), "code_bytes": codes, "full_bytes": full}
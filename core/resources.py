@@ -0,0 +1,116 @@
+from core.config import config
+from typing import Callable, Dict
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+RESOURCES: Dict[str, "LazyResource"] = {}
+
+class LazyResource:
+    """
+    A heavy object (model, client, index) built on first use, exactly once, from any thread.
+
+    A failed load is logged and retried on the next use, so e.g. a database that comes up
+    after the API still gets connected. Every resource is registered by name so the
+    warm-up can load it ahead of the first request and /ready can report on it.
+    """
+    def __init__(self, name: str, factory: Callable, warm: Callable = None, required: bool = True):
+        self.name = name
+        self.factory = factory
+        self.warm = warm  # called with the loaded object to run a dummy inference
+        self.required = required
+        self.lock = threading.Lock()
+        self.value = None
+        self.loaded = False
+        self.seconds = None
+        self.error = None
+        RESOURCES[name] = self
+
+    def get(self):
+        if self.loaded:
+            return self.value
+        with self.lock:
+            if not self.loaded:
+                started = time.perf_counter()
+                try:
+                    self.value = self.factory()
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                self.seconds = time.perf_counter() - started
+                self.error = None
+                self.loaded = True
+                logger.info(f"Loaded {self.name} in {self.seconds:.2f}s")
+        return self.value
+
+    def status(self) -> dict:
+        return {"loaded": self.loaded, "required": self.required, "seconds": self.seconds, "error": self.error}
+
+class WarmUp:
+    """
+    Loads every registered resource on a background thread and runs its dummy inference,
+    so the first real request doesn't pay for model loading. Required resources that
+    failed to load (a database not up yet, say) are retried on that thread with
+    exponential backoff until they load, so readiness recovers without a restart.
+    """
+    def __init__(self):
+        self.thread = None
+        self.started_at = None
+        self.finished_at = None
+
+    def run(self):
+        self.started_at = time.time()
+        for resource in list(RESOURCES.values()):
+            try:
+                value = resource.get()
+                if resource.warm is not None:
+                    resource.warm(value)
+            except Exception as e:
+                logger.warning(f"Warm-up of {resource.name} failed: {e}")
+        self.finished_at = time.time()
+        logger.info(f"Warm-up finished in {self.finished_at - self.started_at:.1f}s")
+
+    def retry_failed(self):
+        delay = config.WARMUP_RETRY_S
+        while True:
+            failed = [r for r in list(RESOURCES.values()) if r.required and not r.loaded]
+            if not failed:
+                return
+            time.sleep(delay)
+            for resource in failed:
+                try:
+                    value = resource.get()
+                    if resource.warm is not None:
+                        resource.warm(value)
+                except Exception as e:
+                    logger.warning(f"Retry of {resource.name} failed, next in {min(delay * 2, config.WARMUP_RETRY_MAX_S):.0f}s: {e}")
+            delay = min(delay * 2, config.WARMUP_RETRY_MAX_S)
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+
+        def run_and_retry():
+            self.run()
+            self.retry_failed()
+        self.thread = threading.Thread(target=run_and_retry, name="warm-up", daemon=True)
+        self.thread.start()
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def readiness(self) -> dict:
+        """
+        Ready once the warm-up has finished and every required resource is loaded.
+        Without WARMUP_ON_STARTUP resources load on demand, so the process is always ready.
+        """
+        resources = {name: resource.status() for name, resource in RESOURCES.items()}
+        ready = not config.WARMUP_ON_STARTUP or (
+            self.done and all(r["loaded"] for r in resources.values() if r["required"])
+        )
+        return {"ready": ready, "warm_up_done": self.done, "resources": resources}
+
+warm_up = WarmUp()
@@ -0,0 +1,212 @@
+from core.database import db_service
+from core.config import config
+from core.vector_index import normalize_rows
+from core.cache import query_embedding_cache
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+import threading
+import logging
+import json
+import time
+
+logger = logging.getLogger(__name__)
+
+# Same groups as the example questions in ui/app.py
+CATEGORY_SEEDS = {
+    "banking": [
+        "RBI monetary policy, repo rate, reverse repo and CRR decisions",
+        "bank loans, interest rates on home loans and fixed deposits",
+        "NEFT, RTGS, IMPS and UPI payments and digital banking",
+        "RBI guidelines for banks, NBFC lending, KYC and digital lending rules",
+        "credit cards, savings accounts, bank charges and customer grievances",
+        "non-performing assets, loan recovery, collections and credit risk in Indian banks",
+    ],
+    "markets": [
+        "stock market, Sensex and Nifty movements and share prices",
+        "SEBI regulations for investors, brokers and stock exchanges",
+        "mutual funds, SIP, NAV and asset management companies",
+        "IPO listings, grey market premium and public issue subscriptions",
+        "bonds, government securities, yields and the debt market",
+        "derivatives, futures and options trading and commodity markets",
+    ],
+    "taxation": [
+        "income tax slabs, old and new tax regime and ITR filing",
+        "GST rates, input tax credit, GST returns and e-invoicing",
+        "tax deductions under section 80C, 80D and HRA exemption",
+        "capital gains tax on shares, mutual funds and property",
+        "TDS, TCS, advance tax and income tax notices",
+        "union budget tax proposals and CBDT or CBIC circulars",
+    ],
+    "corporate": [
+        "Companies Act 2013, MCA filings and corporate governance",
+        "mergers, acquisitions, insolvency and the IBC process",
+        "SEBI listing obligations and disclosure requirements for listed companies",
+        "company quarterly results, revenue, profit and earnings",
+        "startups, venture capital funding and FDI rules",
+        "NBFC registration, corporate debt, CSR and board regulations",
+    ],
+}
+
+# Finance that borrows words from the off-topic groups below; the domain guard counts
+# it as finance alongside CATEGORY_SEEDS
+FINANCE_BOUNDARY_SEEDS = {
+    "personal_finance": [
+        "health insurance premiums, section 80D deductions and mediclaim claim settlement",
+        "life insurance, term plans and travel insurance policies",
+        "saving for a child's education, education loans and Sukanya Samriddhi",
+        "forex cards, foreign exchange rates and money for travel abroad",
+        "salary, household budget, retirement planning and pension schemes",
+        "cost of a wedding, buying a car or a house and personal loans",
+    ],
+}
+
+# Topics the domain guard refuses
+OFF_TOPIC_SEEDS = {
+    "sports": [
+        "cricket match scores, IPL teams and players",
+        "football, tennis and Olympic games results",
+        "fitness workouts, gym routines and yoga",
+    ],
+    "entertainment": [
+        "movies, Bollywood actors and web series recommendations",
+        "songs, music albums and concerts",
+        "celebrity gossip, TV shows and video games",
+    ],
+    "health": [
+        "symptoms of diseases, home remedies and how to treat a fever",
+        "diet plans, weight loss and healthy recipes",
+        "mental health, sleep problems and skin care",
+    ],
+    "everyday": [
+        "cooking recipes, restaurants and food",
+        "tourist places to see, sightseeing and weather forecasts",
+        "relationships, dating advice and handling children's tantrums",
+    ],
+    "general": [
+        "programming help, writing code and fixing software bugs",
+        "history, geography and science trivia questions",
+        "write a poem, tell a joke or help with school homework",
+    ],
+}
+
+# The refusal SYSTEM_PROMPT asks the LLM to give for non-finance questions
+DOMAIN_REFUSAL = "I can answer only finance-related questions as I am FinanceRAG."
+
+class CentroidClassifier:
+    """
+    Nearest-centroid classifier over sentence embeddings. Each label's centroid is the
+    normalized mean of its seed phrase embeddings, so classifying an already computed
+    embedding costs one small matrix product.
+    """
+    def __init__(self, seeds: Dict[str, List[str]], embedding_function=None):
+        self.seeds = seeds
+        self.labels = list(seeds)
+        self.embedding_function = embedding_function
+        self.centroids = None
+        self.lock = threading.Lock()
+
+    def _ensure_centroids(self):
+        if self.centroids is not None:
+            return
+        with self.lock:
+            if self.centroids is not None:
+                return
+            embedding_function = self.embedding_function or db_service.embedding_function
+            centroids = []
+            for label in self.labels:
+                vectors = normalize_rows(embedding_function.embed_documents(self.seeds[label]))
+                centroids.append(vectors.mean(axis=0))
+            self.centroids = normalize_rows(np.stack(centroids))
+
+    def scores(self, embeddings) -> np.ndarray:
+        """
+        Cosine similarity of each embedding (rows) to each label centroid (columns).
+        """
+        self._ensure_centroids()
+        return normalize_rows(np.atleast_2d(np.asarray(embeddings, dtype=np.float32))) @ self.centroids.T
+
+    def classify(self, embeddings) -> List[str]:
+        return [self.labels[i] for i in np.argmax(self.scores(embeddings), axis=1)]
+
+class CategoryRouter:
+    """
+    Routes a query to one category partition, or two when the top two are close.
+    """
+    def __init__(self, classifier: CentroidClassifier = None, margin: float = None):
+        self.classifier = classifier or CentroidClassifier(CATEGORY_SEEDS)
+        self.margin = config.ROUTING_MARGIN if margin is None else margin
+
+    def route(self, query_embedding) -> List[str]:
+        scores = self.classifier.scores(query_embedding)[0]
+        order = np.argsort(-scores)
+        categories = [self.classifier.labels[order[0]]]
+        if len(order) > 1 and scores[order[0]] - scores[order[1]] < self.margin:
+            categories.append(self.classifier.labels[order[1]])
+        logger.info(f"Routed query to {categories}")
+        return categories
+
+    def tag(self, embeddings) -> List[str]:
+        """
+        Category for each chunk embedding, stored as chunk metadata at indexing time.
+        """
+        if len(embeddings) == 0:
+            return []
+        return self.classifier.classify(embeddings)
+
+class DomainGuard:
+    """
+    Refuses non-finance questions before any search or scraping. The query embedding
+    (the one retrieval would compute anyway, from the query embedding cache) is compared
+    with the finance centroids (categories plus finance phrased in everyday words, such
+    as health insurance) and with off-topic centroids; the query is refused only when
+    the nearest off-topic centroid is closer than the nearest finance one by more than
+    DOMAIN_GUARD_MARGIN. A false refusal is silent, so the margin errs towards letting
+    queries through, and errors let the query through. With DOMAIN_GUARD_LOG set, each
+    decision is appended to it as a JSON line for tuning the margin; the file is rotated
+    to a single .1 backup at DOMAIN_GUARD_LOG_MAX_BYTES.
+    """
+    def __init__(self, margin: float = None, log_path: str = None):
+        finance_seeds = {**CATEGORY_SEEDS, **FINANCE_BOUNDARY_SEEDS}
+        self.classifier = CentroidClassifier({**finance_seeds, **OFF_TOPIC_SEEDS})
+        self.finance = np.array([label in finance_seeds for label in self.classifier.labels])
+        self.margin = config.DOMAIN_GUARD_MARGIN if margin is None else margin
+        self.log_path = config.DOMAIN_GUARD_LOG if log_path is None else log_path
+        self.log_lock = threading.Lock()
+
+    def check(self, query: str) -> dict:
+        started = time.perf_counter()
+        try:
+            scores = self.classifier.scores(query_embedding_cache.embed_query(query))[0]
+        except Exception as e:
+            logger.warning(f"Domain guard unavailable, letting the query through: {e}")
+            return {"accepted": True, "error": str(e)}
+        finance_score, off_topic_score = float(scores[self.finance].max()), float(scores[~self.finance].max())
+        decision = {
+            "accepted": off_topic_score - finance_score <= self.margin,
+            "finance_score": round(finance_score, 4),
+            "off_topic_score": round(off_topic_score, 4),
+            "nearest": self.classifier.labels[int(np.argmax(scores))],
+            "margin": self.margin,
+            "ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        if not decision["accepted"]:
+            logger.info(f"Domain guard refused the query (nearest: {decision['nearest']})")
+        self._log(query, decision)
+        return decision
+
+    def _log(self, query: str, decision: dict):
+        if not self.log_path:
+            return
+        try:
+            with self.log_lock:
+                path = Path(self.log_path)
+                if path.exists() and path.stat().st_size >= config.DOMAIN_GUARD_LOG_MAX_BYTES:
+                    path.replace(path.with_name(path.name + ".1"))
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"time": time.time(), "query": query, **decision}) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not log the domain guard decision: {e}")
+
+category_router = CategoryRouter()
+domain_guard = DomainGuard()
@@ -0,0 +1,657 @@
+from langchain_core.documents import Document
+from core.config import config
+from core.quantized_store import QuantizedSegmentStore
+from core.vector_index import normalize_rows, top_k_indices
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+import threading
+import logging
+import shutil
+import pickle
+import json
+import time
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 5000
+
+def hnsw_metadata(collection_name: str) -> dict:
+    """
+    HNSW settings for a collection: the global CHROMA_HNSW_* values, overridden per
+    collection by CHROMA_HNSW_OVERRIDES, e.g. '{"finance_rag": {"search_ef": 64}}'.
+    """
+    settings = {
+        "space": config.CHROMA_HNSW_SPACE,
+        "M": config.CHROMA_HNSW_M,
+        "construction_ef": config.CHROMA_HNSW_CONSTRUCTION_EF,
+        "search_ef": config.CHROMA_HNSW_SEARCH_EF,
+    }
+    overrides = json.loads(config.CHROMA_HNSW_OVERRIDES or "{}")
+    settings.update(overrides.get(collection_name, {}))
+    return {f"hnsw:{key}": value for key, value in settings.items()}
+
+def live_search_ef(collection):
+    """
+    The search ef a Chroma collection actually uses: Chroma 1.x keeps it in the
+    collection configuration and leaves the hnsw:search_ef metadata at its creation
+    value; older versions only have the metadata.
+    """
+    configuration = getattr(collection, "configuration", None)
+    hnsw = configuration.get("hnsw") if isinstance(configuration, dict) else None
+    if hnsw and "ef_search" in hnsw:
+        return hnsw["ef_search"]
+    return (collection.metadata or {}).get("hnsw:search_ef")
+
+def apply_search_ef(collection, search_ef: int):
+    """
+    Changes search ef on an existing Chroma collection, writing only when it differs
+    from the live value (every open calls this, readers included). A process that
+    already has the index loaded keeps searching with the old value until it reopens
+    the client (ChromaEngine.refresh). Space, M and construction ef are fixed at
+    creation time; changing them needs a rebuild (see VectorCollection.compact).
+    """
+    if live_search_ef(collection) == search_ef:
+        return
+    try:
+        collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+    except TypeError:
+        # Chroma before 1.0 has no configuration argument; HNSW settings are metadata
+        collection.modify(metadata={**(collection.metadata or {}), "hnsw:search_ef": search_ef})
+
+def matches_where(metadata: dict, where: dict) -> bool:
+    """
+    Evaluates a Chroma-style metadata filter: {"key": value}, {"key": {"$gte": 1}},
+    $eq/$ne/$gt/$gte/$lt/$lte/$in/$nin, combined with $and / $or.
+    """
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, c) for c in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_where(metadata, c) for c in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, operand in condition.items():
+            if op == "$eq" and value != operand:
+                return False
+            if op == "$ne" and value == operand:
+                return False
+            if op == "$in" and value not in operand:
+                return False
+            if op == "$nin" and value in operand:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > operand:
+                    return False
+                if op == "$gte" and not value >= operand:
+                    return False
+                if op == "$lt" and not value < operand:
+                    return False
+                if op == "$lte" and not value <= operand:
+                    return False
+    return True
+
+class VectorCollection:
+    """
+    One collection (partition) of chunks in a vector store backend.
+    Embeddings are unit-normalized, and search scores are cosine similarities.
+    """
+    name = None
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def add(self, ids: List[str], documents: List[str], metadatas: List[dict], embeddings):
+        """Inserts new chunks."""
+        raise NotImplementedError
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[dict], embeddings):
+        """Inserts chunks, replacing any with the same id."""
+        raise NotImplementedError
+
+    def update_metadata(self, ids: List[str], metadatas: List[dict]):
+        """Merges partial metadata into existing chunks; unknown ids are ignored."""
+        raise NotImplementedError
+
+    def delete(self, ids: List[str] = None, where: dict = None):
+        raise NotImplementedError
+
+    def get(self, ids: List[str] = None, where: dict = None, limit: int = None, offset: int = 0,
+            include_embeddings: bool = False) -> dict:
+        """Returns {"ids", "documents", "metadatas"} (and "embeddings" if requested)."""
+        raise NotImplementedError
+
+    def search(self, query_embeddings, k: int, where: dict = None) -> List[List[Tuple[Document, float]]]:
+        """Batched top-k search: one (document, similarity) list per query, best first."""
+        raise NotImplementedError
+
+    def compact(self) -> int:
+        """Rebuilds the index without deleted entries; returns the number of live chunks."""
+        raise NotImplementedError
+
+    def memory_report(self) -> dict:
+        raise NotImplementedError
+
+class VectorEngine:
+    """
+    A vector store backend holding named collections.
+    """
+    def list_collections(self) -> List[str]:
+        raise NotImplementedError
+
+    def open(self, name: str) -> VectorCollection:
+        raise NotImplementedError
+
+    def drop(self, name: str):
+        raise NotImplementedError
+
+    def refresh(self):
+        """
+        Drops cached views so writes made by another process become visible.
+        """
+
+# -- Chroma -------------------------------------------------------------------
+
+class ChromaCollection(VectorCollection):
+    """
+    A Chroma collection. With VECTOR_STORAGE=float16|int8, searches go to a quantized
+    memory-mapped copy of the vectors instead of Chroma's HNSW index.
+    """
+    def __init__(self, engine, name: str):
+        self.engine = engine
+        self.name = name
+        self.lock = threading.RLock()
+        self.segments = None
+        self._open()
+
+    def _open(self):
+        metadata = hnsw_metadata(self.name)
+        self.collection = self.engine.client.get_or_create_collection(self.name, metadata=metadata)
+        try:
+            apply_search_ef(self.collection, metadata["hnsw:search_ef"])
+        except Exception as e:
+            logger.warning(f"Could not set HNSW search ef on {self.name}: {e}")
+
+        if config.VECTOR_STORAGE != "chroma":
+            self.segments = QuantizedSegmentStore(
+                Path(config.VECTOR_STORAGE_DIR) / self.name,
+                dtype=config.VECTOR_STORAGE,
+                reduction=config.VECTOR_REDUCTION,
+                reduced_dim=config.VECTOR_REDUCED_DIM,
+                rescore_factor=config.VECTOR_RESCORE_FACTOR
+            )
+            if len(self.segments) == 0 and self.collection.count() > 0:
+                logger.info(f"Building quantized vector segments for {self.name}")
+                page = self.collection.get(include=["embeddings"])
+                self.segments.upsert(page["ids"], page["embeddings"])
+
+    @property
+    def metadata(self) -> dict:
+        return self.collection.metadata or {}
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def add(self, ids, documents, metadatas, embeddings):
+        metadatas = [metadata or None for metadata in metadatas]  # Chroma rejects empty dicts
+        with self.lock:
+            self.collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+            if self.segments is not None:
+                self.segments.upsert(ids, embeddings)
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        metadatas = [metadata or None for metadata in metadatas]
+        with self.lock:
+            self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+            if self.segments is not None:
+                self.segments.upsert(ids, embeddings)
+
+    def update_metadata(self, ids, metadatas):
+        with self.lock:
+            updates = dict(zip(ids, metadatas))
+            for start in range(0, len(ids), PAGE_SIZE):
+                existing = self.collection.get(ids=ids[start:start + PAGE_SIZE], include=[])["ids"]
+                if existing:
+                    self.collection.update(ids=existing, metadatas=[updates[doc_id] for doc_id in existing])
+
+    def delete(self, ids=None, where=None):
+        with self.lock:
+            if where is not None:
+                ids = list(set(ids or []) | set(self.collection.get(where=where, include=[])["ids"]))
+            for start in range(0, len(ids or []), PAGE_SIZE):
+                self.collection.delete(ids=ids[start:start + PAGE_SIZE])
+            if self.segments is not None and ids:
+                self.segments.delete(ids)
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include_embeddings=False):
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        result = self.collection.get(ids=ids, where=where, limit=limit, offset=offset or None, include=include)
+        page = {"ids": result["ids"], "documents": result["documents"], "metadatas": result["metadatas"]}
+        if include_embeddings:
+            page["embeddings"] = result["embeddings"]
+        return page
+
+    def distance_to_similarity(self, distance: float) -> float:
+        space = self.metadata.get("hnsw:space", "l2")
+        if space == "l2":
+            return 1.0 - distance / 2.0  # Chroma reports squared L2
+        return 1.0 - distance
+
+    def search(self, query_embeddings, k, where=None):
+        query_embeddings = [list(map(float, q)) for q in query_embeddings]
+        if k <= 0 or not query_embeddings:
+            return [[] for _ in query_embeddings]
+
+        if self.segments is not None and where is None:
+            return [self._search_segments(q, k) for q in query_embeddings]
+
+        count = self.collection.count()
+        if count == 0:
+            return [[] for _ in query_embeddings]
+        result = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=min(k, count),
+            where=where,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [
+                (Document(page_content=text, metadata=metadata or {}, id=doc_id), self.distance_to_similarity(distance))
+                for doc_id, text, metadata, distance in zip(ids, texts, metadatas, distances)
+            ]
+            for ids, texts, metadatas, distances in zip(
+                result["ids"], result["documents"], result["metadatas"], result["distances"]
+            )
+        ]
+
+    def _search_segments(self, query_embedding, k):
+        """
+        Searches the quantized segments, then loads the winning chunks' text from Chroma.
+        """
+        hits = self.segments.search(query_embedding, k)
+        if not hits:
+            return []
+        page = self.collection.get(ids=[doc_id for doc_id, _ in hits], include=["documents", "metadatas"])
+        found = {doc_id: (text, metadata) for doc_id, text, metadata in zip(page["ids"], page["documents"], page["metadatas"])}
+        return [
+            (Document(page_content=found[doc_id][0], metadata=found[doc_id][1] or {}, id=doc_id), score)
+            for doc_id, score in hits if doc_id in found
+        ]
+
+    def compact(self):
+        """
+        Rebuilds the HNSW index by copying live chunks into a fresh collection.
+        Chroma never reclaims graph slots of deleted elements, so this is what actually shrinks it.
+        The rebuilt collection picks up the currently configured HNSW settings.
+        """
+        staging = self.name + "__compact"
+        client = self.engine.client
+        with self.lock:
+            try:
+                client.delete_collection(staging)
+            except Exception:
+                pass
+            target = client.create_collection(staging, metadata={**self.metadata, **hnsw_metadata(self.name)})
+
+            copied, offset = 0, 0
+            while True:
+                page = self.collection.get(include=["embeddings", "metadatas", "documents"], limit=PAGE_SIZE, offset=offset)
+                if not page["ids"]:
+                    break
+                target.add(ids=page["ids"], embeddings=page["embeddings"],
+                           metadatas=page["metadatas"], documents=page["documents"])
+                copied += len(page["ids"])
+                offset += len(page["ids"])
+
+            # If we crash between these two steps, ChromaEngine.recover() finishes the rename
+            client.delete_collection(self.name)
+            target.modify(name=self.name)
+            self._open()
+            if self.segments is not None:
+                self.segments.compact()
+        return copied
+
+    def memory_report(self):
+        count = self.count()
+        links = int(self.metadata.get("hnsw:M", 16)) * 2
+        sample = self.collection.get(limit=1, include=["embeddings"])["embeddings"]
+        dim = len(sample[0]) if sample is not None and len(sample) else 0
+        report = {
+            "engine": "chroma",
+            "chunks": count,
+            # float32 vectors + level-0 neighbour links (4 bytes each) + ~ids/labels overhead
+            "estimated_index_bytes": count * (dim * 4 + links * 4 + 64),
+        }
+        if self.segments is not None:
+            report["quantized_segments"] = self.segments.memory_report()
+        return report
+
+class ChromaEngine(VectorEngine):
+    def __init__(self, path: str):
+        import chromadb
+        self.path = path
+        self.client = chromadb.PersistentClient(path=path)
+        self.recover()
+
+    def refresh(self):
+        # A client keeps the HNSW index it loaded; only a new system re-reads it from disk
+        import chromadb
+        from chromadb.api.client import SharedSystemClient
+        SharedSystemClient.clear_system_cache()
+        self.client = chromadb.PersistentClient(path=self.path)
+
+    def recover(self):
+        """
+        Finishes any compaction that was interrupted between dropping and renaming.
+        """
+        names = set(self.list_collections())
+        for staging in [n for n in names if n.endswith("__compact")]:
+            original = staging[:-len("__compact")]
+            if original not in names:
+                logger.warning(f"Recovering interrupted compaction of {original}")
+                self.client.get_collection(staging).modify(name=original)
+
+    def list_collections(self):
+        return [getattr(c, "name", c) for c in self.client.list_collections()]
+
+    def open(self, name):
+        return ChromaCollection(self, name)
+
+    def drop(self, name):
+        self.client.delete_collection(name)
+        shutil.rmtree(Path(config.VECTOR_STORAGE_DIR) / name, ignore_errors=True)
+
+# -- In-process NumPy / FAISS -------------------------------------------------
+
+class NumpyCollection(VectorCollection):
+    """
+    In-process collection: vectors in a float32 matrix (exact search with one matrix
+    product, or a FAISS inner-product index when faiss is installed), text and
+    metadata in memory. Persisted as snapshots: each one is written to its own
+    directory, and snapshot.json is switched to it last with an atomic rename, so a
+    reader never sees vectors and records from different snapshots. Other processes
+    pick up a newer snapshot on their next read; the previous snapshot is kept for
+    readers still loading it.
+    """
+    def __init__(self, path: Path, use_faiss: bool = False):
+        self.path = Path(path)
+        self.name = self.path.name
+        self.lock = threading.RLock()
+        self.use_faiss = use_faiss
+        self.ids, self.documents, self.metadatas = [], [], []
+        self.row_of = {}
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.faiss_index = None
+        self.dirty = False
+        self.snapshot_mtime = None
+        self._load()
+
+    # -- snapshots -----------------------------------------------------------
+
+    @property
+    def marker(self) -> Path:
+        return self.path / "snapshot.json"
+
+    def _load(self):
+        try:
+            mtime = self.marker.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        with self.lock:
+            if mtime == self.snapshot_mtime or self.dirty:
+                return
+            # Snapshots from before versioned directories live in the collection directory
+            directory = self.path / json.loads(self.marker.read_text()).get("version", "")
+            with open(directory / "records.pkl", "rb") as f:
+                self.ids, self.documents, self.metadatas = pickle.load(f)
+            self.vectors = np.load(directory / "vectors.npy")
+            self.alive = np.ones(len(self.ids), dtype=bool)
+            self.row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+            self.faiss_index = None
+            self.snapshot_mtime = mtime
+
+    def snapshot(self):
+        """
+        Writes live chunks to disk (dropping deleted rows) if anything changed.
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+            self._compact_rows()
+            version = f"snapshot-{time.time_ns()}"
+            directory = self.path / version
+            directory.mkdir(parents=True)
+            np.save(directory / "vectors.npy", self.vectors)
+            with open(directory / "records.pkl", "wb") as f:
+                pickle.dump((self.ids, self.documents, self.metadatas), f, protocol=pickle.HIGHEST_PROTOCOL)
+            marker_tmp = self.path / "snapshot.json.tmp"
+            marker_tmp.write_text(json.dumps({"version": version, "count": len(self.ids), "saved_at": time.time()}))
+            marker_tmp.replace(self.marker)
+            self.snapshot_mtime = self.marker.stat().st_mtime_ns
+            self.dirty = False
+            self._remove_old_snapshots()
+
+    def _remove_old_snapshots(self):
+        """Removes all but the current and the previous snapshot, and the pre-versioning files"""
+        versions = sorted(p.name for p in self.path.glob("snapshot-*") if p.is_dir())
+        for name in versions[:-2]:
+            shutil.rmtree(self.path / name, ignore_errors=True)
+        for name in ("vectors.npy", "records.pkl"):
+            (self.path / name).unlink(missing_ok=True)
+
+    def _compact_rows(self):
+        keep = np.flatnonzero(self.alive)
+        if len(keep) == len(self.alive):
+            return
+        self.ids = [self.ids[i] for i in keep]
+        self.documents = [self.documents[i] for i in keep]
+        self.metadatas = [self.metadatas[i] for i in keep]
+        self.vectors = self.vectors[keep]
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self.faiss_index = None
+
+    # -- writes --------------------------------------------------------------
+
+    def count(self):
+        self._load()
+        return int(self.alive.sum())
+
+    def add(self, ids, documents, metadatas, embeddings):
+        with self.lock:
+            duplicates = [doc_id for doc_id in ids if doc_id in self.row_of and self.alive[self.row_of[doc_id]]]
+            if duplicates:
+                raise ValueError(f"Ids already exist in {self.name}: {duplicates[:5]}")
+            self.upsert(ids, documents, metadatas, embeddings)
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        if not ids:
+            return
+        vectors = normalize_rows(embeddings)
+        with self.lock:
+            self._load()
+            self._delete_rows(ids)
+            start = len(self.ids)
+            self.ids.extend(ids)
+            self.documents.extend(documents)
+            self.metadatas.extend(dict(m or {}) for m in metadatas)
+            self.vectors = vectors if not len(self.vectors) else np.vstack([self.vectors, vectors])
+            self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+            for offset, doc_id in enumerate(ids):
+                self.row_of[doc_id] = start + offset
+            if self.faiss_index is not None:
+                self.faiss_index.add_with_ids(vectors, np.arange(start, start + len(ids), dtype=np.int64))
+            self.dirty = True
+
+    def update_metadata(self, ids, metadatas):
+        with self.lock:
+            self._load()
+            for doc_id, metadata in zip(ids, metadatas):
+                row = self.row_of.get(doc_id)
+                if row is not None and self.alive[row]:
+                    self.metadatas[row] = {**self.metadatas[row], **metadata}
+            self.dirty = True
+
+    def _delete_rows(self, ids):
+        rows = [self.row_of.pop(doc_id) for doc_id in ids if doc_id in self.row_of]
+        if rows:
+            self.alive[rows] = False
+            if self.faiss_index is not None:
+                self.faiss_index.remove_ids(np.asarray(rows, dtype=np.int64))
+
+    def delete(self, ids=None, where=None):
+        with self.lock:
+            self._load()
+            ids = list(ids or [])
+            if where is not None:
+                ids += [doc_id for doc_id, row in self.row_of.items() if matches_where(self.metadatas[row], where)]
+            self._delete_rows(ids)
+            self.dirty = True
+
+    # -- reads ---------------------------------------------------------------
+
+    def _rows(self, ids=None, where=None):
+        if ids is not None:
+            rows = [self.row_of[doc_id] for doc_id in ids if doc_id in self.row_of]
+        else:
+            rows = np.flatnonzero(self.alive).tolist()
+        if where:
+            rows = [row for row in rows if matches_where(self.metadatas[row], where)]
+        return rows
+
+    def get(self, ids=None, where=None, limit=None, offset=0, include_embeddings=False):
+        self._load()
+        with self.lock:
+            rows = self._rows(ids, where)[offset or 0:]
+            if limit is not None:
+                rows = rows[:limit]
+            page = {
+                "ids": [self.ids[row] for row in rows],
+                "documents": [self.documents[row] for row in rows],
+                "metadatas": [dict(self.metadatas[row]) for row in rows],
+            }
+            if include_embeddings:
+                page["embeddings"] = self.vectors[rows].tolist()
+            return page
+
+    def _faiss(self):
+        if self.faiss_index is None:
+            import faiss
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.vectors.shape[1]))
+            live = np.flatnonzero(self.alive)
+            index.add_with_ids(self.vectors[live], live.astype(np.int64))
+            self.faiss_index = index
+        return self.faiss_index
+
+    def search(self, query_embeddings, k, where=None):
+        self._load()
+        queries = normalize_rows(np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)))
+        with self.lock:
+            if k <= 0 or not self.alive.any():
+                return [[] for _ in queries]
+
+            if self.use_faiss and where is None:
+                scores, rows = self._faiss().search(queries, min(k, int(self.alive.sum())))
+                ranked = [[(int(r), float(s)) for r, s in zip(row, score) if r >= 0] for row, score in zip(rows, scores)]
+            else:
+                mask = self.alive.copy()
+                if where:
+                    mask[np.flatnonzero(mask)] = [matches_where(self.metadatas[r], where) for r in np.flatnonzero(mask)]
+                scores = queries @ self.vectors.T
+                scores[:, ~mask] = -np.inf
+                ranked = []
+                for row_scores in scores:
+                    top = top_k_indices(row_scores, min(k, int(mask.sum())))
+                    ranked.append([(int(r), float(row_scores[r])) for r in top])
+
+            return [
+                [
+                    (Document(page_content=self.documents[r], metadata=dict(self.metadatas[r]), id=self.ids[r]), score)
+                    for r, score in hits
+                ]
+                for hits in ranked
+            ]
+
+    def compact(self):
+        with self.lock:
+            self.dirty = True
+            self.snapshot()
+            return len(self.ids)
+
+    def memory_report(self):
+        self._load()
+        return {
+            "engine": "faiss" if self.use_faiss else "numpy",
+            "chunks": self.count(),
+            "rows": len(self.ids),
+            "vector_bytes": int(self.vectors.nbytes),
+        }
+
+class NumpyEngine(VectorEngine):
+    """
+    Collections stored as snapshot directories under one root. Dirty collections are
+    snapshotted every VECTOR_SNAPSHOT_INTERVAL seconds and at exit.
+    """
+    def __init__(self, root: str, use_faiss: bool = False):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.use_faiss = use_faiss
+        self.collections: Dict[str, NumpyCollection] = {}
+        self.lock = threading.Lock()
+        if use_faiss:
+            import faiss  # fail early if the engine was requested but faiss is missing
+        self._start_snapshots()
+
+    def _start_snapshots(self):
+        import atexit
+
+        def loop():
+            while True:
+                time.sleep(config.VECTOR_SNAPSHOT_INTERVAL)
+                self.snapshot_all()
+
+        threading.Thread(target=loop, name="vector-snapshots", daemon=True).start()
+        atexit.register(self.snapshot_all)
+
+    def snapshot_all(self):
+        for collection in list(self.collections.values()):
+            try:
+                collection.snapshot()
+            except Exception as e:
+                logger.error(f"Snapshot of {collection.name} failed: {e}")
+
+    def list_collections(self):
+        names = {p.name for p in self.root.iterdir() if (p / "snapshot.json").exists()}
+        return sorted(names | set(self.collections))
+
+    def open(self, name):
+        with self.lock:
+            if name not in self.collections:
+                self.collections[name] = NumpyCollection(self.root / name, self.use_faiss)
+            return self.collections[name]
+
+    def drop(self, name):
+        with self.lock:
+            self.collections.pop(name, None)
+            shutil.rmtree(self.root / name, ignore_errors=True)
+
+def create_engine(kind: str = None) -> VectorEngine:
+    """
+    Builds the vector store backend selected by VECTOR_BACKEND: chroma, numpy or faiss.
+    """
+    kind = (kind or config.VECTOR_BACKEND).lower()
+    if kind == "chroma":
+        return ChromaEngine(config.CHROMA_DB_DIR)
+    if kind in ("numpy", "faiss"):
+        return NumpyEngine(config.NUMPY_STORE_DIR, use_faiss=kind == "faiss")
+    raise ValueError(f"Unknown VECTOR_BACKEND: {kind}")
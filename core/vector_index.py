@@ -0,0 +1,84 @@
+from langchain_core.documents import Document
+from typing import List, Tuple
+import numpy as np
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return matrix / np.clip(np.linalg.norm(matrix, axis=-1, keepdims=True), 1e-12, None)
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first, without sorting the whole array.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+def mmr_select(query_embedding, embeddings, k: int, lambda_mult: float = 0.7, groups: List[str] = None,
+               max_per_group: int = 0) -> List[int]:
+    """
+    Maximal marginal relevance: picks k rows, each maximising
+    lambda * sim(query, row) - (1 - lambda) * max sim(row, already picked).
+    With groups (e.g. each chunk's source URL), at most max_per_group rows are picked per
+    group while other candidates remain; the rest of k is then filled without the cap.
+    One matrix product up front, then one vector update per pick. Returns row indices in
+    pick order.
+    """
+    vectors = normalize_rows(embeddings)
+    n = len(vectors)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    relevance = vectors @ normalize_rows(query_embedding)
+    similarity = vectors @ vectors.T
+    redundancy = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    capped = np.zeros(n, dtype=bool)
+    groups = np.asarray(groups, dtype=object) if groups is not None and max_per_group > 0 else None
+    counts = {}
+
+    selected = []
+    while len(selected) < k:
+        candidates = available & ~capped
+        if not candidates.any():
+            candidates = available  # every remaining group is at its cap
+        scores = np.where(candidates, lambda_mult * relevance - (1 - lambda_mult) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+        if groups is not None:
+            group = groups[best]
+            counts[group] = counts.get(group, 0) + 1
+            if counts[group] >= max_per_group:
+                capped |= groups == group
+    return selected
+
+class EphemeralVectorIndex:
+    """
+    Exact in-memory cosine index over a small set of chunks, typically the pages
+    scraped for the current request. A search is a single matrix-vector product,
+    so its cost depends only on the number of fresh chunks, not on the vector store.
+    """
+    def __init__(self, ids: List[str], documents: List[Document], embeddings):
+        self.ids = list(ids)
+        self.documents = documents
+        self.matrix = normalize_rows(embeddings) if len(self.ids) else np.zeros((0, 0), dtype=np.float32)
+        self.row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        for doc_id, doc in zip(self.ids, self.documents):
+            doc.id = doc_id
+
+    def __len__(self):
+        return len(self.ids)
+
+    def embeddings_for(self, ids: List[str]) -> dict:
+        """{chunk id: normalized vector} for the given ids held by this index"""
+        return {doc_id: self.matrix[self.row_of[doc_id]] for doc_id in ids if doc_id in self.row_of}
+
+    def search(self, query_embedding, k: int) -> List[Tuple[Document, float]]:
+        if not self.ids:
+            return []
+        scores = self.matrix @ normalize_rows(query_embedding)
+        return [(self.documents[i], float(scores[i])) for i in top_k_indices(scores, k)]
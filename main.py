@@ -1,4 +1,5 @@
 from core.pipeline import pipeline
+from core.llm import LLMUnavailableError
 import logging
 
 # Configure logging
@@ -6,6 +7,10 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(level
 
 if __name__ == "__main__":
     # Test run
-    result = pipeline.run("What is the current repo rate in India?")
-    print("\nAnswer:", result["answer"])
-    print("\nEvaluation:", result["evaluation"])
+    try:
+        result = pipeline.run("What is the current repo rate in India?")
+    except LLMUnavailableError:
+        print("\nThe language model is unavailable right now, please retry shortly.")
+    else:
+        print("\nAnswer:", result["answer"])
+        print("\nEvaluation:", result["evaluation"])
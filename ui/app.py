@@ -393,6 +393,8 @@ if ask_button:
             if e.response.status_code == 401:
                 st.error("❌ Session expired. Please login again.")
                 logout_user()
+            elif e.response.status_code == 503:
+                st.error("⏳ The language model is unavailable right now, please retry shortly.")
             else:
                 st.error(f"❌ Server error: {e}")
         except requests.exceptions.ConnectionError: